@@ -11,6 +11,8 @@ from dotenv import load_dotenv
 from pathlib import Path
 import uuid
 
+import staged_import
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
@@ -103,16 +105,13 @@ async def load_original_data():
     print("=" * 80)
     print(f"\n26 Günlük Tüketim Kaydı (Ekran görüntülerinden)")
     
-    # Mevcut verileri temizle
-    await db.daily_consumption.delete_many({})
-    
-    # Orijinal verileri yükle
+    # Orijinal verileri yükle (yalnızca değişen kayıtlar yazılır, olmayanlar silinir)
     for record in ORIGINAL_DAILY_CONSUMPTION:
         record['id'] = str(uuid.uuid4())
         record['notes'] = f"{record['machine']} - Orijinal veri"
-        await db.daily_consumption.insert_one(record)
+    result = await staged_import.load(db, "daily_consumption", ORIGINAL_DAILY_CONSUMPTION)
     
-    print(f"\n✅ {len(ORIGINAL_DAILY_CONSUMPTION)} kayıt yüklendi!")
+    print(f"\n✅ {len(ORIGINAL_DAILY_CONSUMPTION)} kayıt: {staged_import.summary(result)}")
     
     # Toplamları hesapla
     total_petkim = sum(r['petkim'] for r in ORIGINAL_DAILY_CONSUMPTION)
@@ -0,0 +1,123 @@
+"""
+İmzalı oturum anahtarları (JWT, HS256)
+Giriş başarılı olunca kullanıcı kimliği, rolü ve anahtar sürümü (tokenVersion)
+imzalanarak istemciye verilir; yazma uç noktaları rolü bu anahtardan okur.
+
+Doğrulanmış anahtarlar süreç içi bir LRU önbellekte tutulur: tekrar gelen
+anahtar için imza yeniden kontrol edilmez ve MongoDB'ye gidilmez. İptal,
+kullanıcı başına tokenVersion sayacıyla yapılır: sayaç artırılınca eski
+sürümlü anahtarlar geçersiz olur. Kullanıcıların güncel sürümleri bellekte
+tutulur ve users sürüm sayacı değiştiyse en fazla VERSION_REFRESH_SECONDS
+aralıkla yeniden okunur (diğer süreçlerdeki iptaller bu süre içinde görünür).
+Bellekte olmayan kullanıcı yalnızca kendi id'siyle okunur; bulunamazsa (silinmiş
+kullanıcı) anahtar reddedilir.
+
+Ayarlar: JWT_SECRET (zorunlu; tüm süreçler aynı anahtarla imzalar ve doğrular),
+JWT_TTL_HOURS.
+"""
+import os
+import time
+from collections import OrderedDict
+
+import jwt
+
+import collection_versions
+
+ALGORITHM = "HS256"
+TOKEN_TTL_SECONDS = int(float(os.environ.get("JWT_TTL_HOURS", 12)) * 3600)
+VERSION_REFRESH_SECONDS = 5
+
+SECRET = os.environ.get("JWT_SECRET")
+if not SECRET:
+    raise RuntimeError("JWT_SECRET tanımlı değil; oturum anahtarları için ortak bir gizli anahtar gerekli")
+
+
+class InvalidToken(Exception):
+    """Anahtar geçersiz, süresi dolmuş veya iptal edilmiş"""
+
+
+def issue(user):
+    """Kullanıcı belgesi için imzalı anahtar ve bitiş zamanı (unix saniye)"""
+    now = int(time.time())
+    expires = now + TOKEN_TTL_SECONDS
+    token = jwt.encode({
+        "sub": user["id"],
+        "username": user["username"],
+        "role": user.get("role", "viewer"),
+        "ver": user.get("tokenVersion", 0),
+        "iat": now,
+        "exp": expires,
+    }, SECRET, algorithm=ALGORITHM)
+    return token, expires
+
+
+class TokenVerifier:
+    """Doğrulanmış anahtarların LRU önbelleği ve kullanıcı anahtar sürümleri"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.versions = {}
+        self.users_version = None
+        self.refreshed_at = None
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate_versions(self):
+        """Sonraki doğrulamada kullanıcı sürümlerini yeniden oku (bu süreçteki iptaller için)"""
+        self.refreshed_at = None
+
+    async def _refresh_versions(self, db):
+        now = time.monotonic()
+        if self.refreshed_at is not None and now - self.refreshed_at < VERSION_REFRESH_SECONDS:
+            return
+        self.refreshed_at = now
+        (users_version,) = await collection_versions.get_versions(db, ["users"])
+        if users_version == self.users_version and self.versions:
+            return
+        docs = await db.users.find({}, {"_id": 0, "id": 1, "tokenVersion": 1}).to_list(None)
+        self.versions = {doc["id"]: doc.get("tokenVersion", 0) for doc in docs if "id" in doc}
+        self.users_version = users_version
+
+    def _decode(self, token):
+        claims = self.entries.get(token)
+        if claims is not None:
+            self.entries.move_to_end(token)
+            self.hits += 1
+            return claims
+        self.misses += 1
+        try:
+            claims = jwt.decode(token, SECRET, algorithms=[ALGORITHM], options={"require": ["sub", "exp", "ver"]})
+        except jwt.PyJWTError as e:
+            raise InvalidToken(str(e)) from e
+        self.entries[token] = claims
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return claims
+
+    async def verify(self, db, token):
+        """Anahtarın bilgileri (sub, username, role); geçersizse InvalidToken"""
+        claims = self._decode(token)
+        if claims["exp"] <= time.time():
+            self.entries.pop(token, None)
+            raise InvalidToken("Oturum süresi doldu")
+        await self._refresh_versions(db)
+        if claims["sub"] not in self.versions:
+            # Başka süreçte yeni oluşturulmuş (veya girişte id atanmış) kullanıcı olabilir
+            user = await db.users.find_one({"id": claims["sub"]}, {"_id": 0, "tokenVersion": 1})
+            if user is None:
+                self.entries.pop(token, None)
+                raise InvalidToken("Kullanıcı bulunamadı")
+            self.versions[claims["sub"]] = user.get("tokenVersion", 0)
+        if self.versions.get(claims["sub"]) != claims["ver"]:
+            self.entries.pop(token, None)
+            raise InvalidToken("Oturum sonlandırıldı")
+        return claims
+
+    def stats(self):
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+async def revoke(db, user_id):
+    """Kullanıcının tüm anahtarlarını geçersiz kıl (tokenVersion artırılır)"""
+    return await db.users.update_one({"id": user_id}, {"$inc": {"tokenVersion": 1}})
@@ -0,0 +1,131 @@
+"""
+Okuma uç noktalarının yanıt kodlama süresi: eski yol / orjson
+Eski yol: response_model doğrulaması + jsonable_encoder + json.dumps (FastAPI varsayılanı)
+Yeni yol: veritabanından gelen belgelerin doğrudan orjson ile yazılması
+Ayrıca gzip / brotli sıkıştırma boyutu ve süresi ölçülür. Veritabanı gerekmez,
+sentetik satırlar kullanılır.
+
+Kullanım: python bench_serialization.py [satır_sayısı] [tekrar]
+"""
+import gzip
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from typing import List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+# server.py içe aktarılırken bağlantı kurulmaz; ayarlar yoksa varsayılanlar kullanılır
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench")
+
+import cost_engine  # noqa: E402
+from server import ProductionOut  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MACHINES = ["Makine 1", "Makine 2"]
+THICKNESSES = ["1 mm", "2 mm", "3 mm", "5 mm"]
+COLORS = [("Doğal", "Şeffaf"), ("Beyaz", "Renkli"), ("Sarı", "Renkli")]
+
+
+def _production(i):
+    color, category = random.choice(COLORS)
+    return {
+        "id": str(uuid.uuid4()),
+        "date": f"2025-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+        "machine": random.choice(MACHINES),
+        "thickness": random.choice(THICKNESSES),
+        "width": str(random.choice([100, 120, 150, 200])),
+        "length": str(random.choice([100, 200, 300])),
+        "m2": round(random.uniform(50, 600), 2),
+        "quantity": random.randint(1, 40),
+        "masuraType": f"MASURA {random.choice([100, 120, 150, 200])}",
+        "color": color,
+        "colorCategory": category,
+        "created_at": "2025-01-01T00:00:00+00:00",
+    }
+
+
+def _cost_row(production):
+    row = {field: production.get(field) for field in cost_engine.ROW_FIELDS}
+    for key in cost_engine.ROUNDED_COLUMNS:
+        row[key] = round(random.uniform(0, 5000), 2)
+    return row
+
+
+def _stock_row(production):
+    return {
+        "type": "Normal",
+        **{field: production[field] for field in ("thickness", "width", "length", "color", "colorCategory", "m2")},
+        "quantity": production["quantity"],
+    }
+
+
+def _legacy_dumps(content):
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def legacy_production(docs):
+    """response_model=List[ProductionOut] ile FastAPI'nin eski yolu"""
+    adapter = TypeAdapter(List[ProductionOut])
+    validated = adapter.validate_python(docs)
+    return _legacy_dumps(adapter.dump_python(validated, mode="json", exclude_unset=True))
+
+
+def legacy_plain(docs):
+    """response_model olmayan uç noktalarda eski yol"""
+    return _legacy_dumps(jsonable_encoder(docs))
+
+
+def fast(docs):
+    return orjson.dumps(docs, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _timed(func, arg, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    random.seed(1)
+    productions = [_production(i) for i in range(count)]
+    routes = [
+        ("/api/production", productions, legacy_production),
+        ("/api/cost-analysis", [_cost_row(p) for p in productions], legacy_plain),
+        ("/api/stock", [_stock_row(p) for p in productions], legacy_plain),
+    ]
+
+    print(f"📊 {count} satır, en iyi {repeat} ölçüm (ms)")
+    print(f"{'uç nokta':<22}{'eski':>10}{'orjson':>10}{'hız':>8}{'boyut KB':>11}{'gzip KB':>10}{'gzip ms':>9}{'br KB':>8}{'br ms':>8}")
+    for route, docs, legacy in routes:
+        legacy_ms, legacy_body = _timed(legacy, docs, repeat)
+        fast_ms, body = _timed(fast, docs, repeat)
+        assert json.loads(legacy_body) == json.loads(body), route
+
+        gzip_ms, gzipped = _timed(lambda data: gzip.compress(data, compresslevel=6), body, repeat)
+        line = (f"{route:<22}{legacy_ms:>10.1f}{fast_ms:>10.1f}{legacy_ms / fast_ms:>7.1f}x"
+                f"{len(body) / 1024:>11.0f}{len(gzipped) / 1024:>10.0f}{gzip_ms:>9.1f}")
+        if brotli is not None:
+            br_ms, compressed = _timed(lambda data: brotli.compress(data, quality=4), body, repeat)
+            line += f"{len(compressed) / 1024:>8.0f}{br_ms:>8.1f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Toplu yazma (bulk) işlemleri
+Bir koleksiyona yönelik eklemeler, güncellemeler ve silmeler tek istekte yürütülür;
+türetilmiş durumlar (stok, maliyet bölümleri, sürüm sayaçları) satır başına değil
+toplu iş başına bir kez güncellenir.
+
+Eklemeler tek insert_many ile yazılır. Güncellemeler ve silmeler, tekil yazma uç
+noktaları gibi find_one_and_update / find_one_and_delete ile yapılır: her işlemin
+eski hali yazmayla aynı atomik adımda okunur, bu yüzden araya giren başka bir yazma
+türetilmiş durumlara bildirilen farkları bozmaz.
+
+İşlemler ekleme, güncelleme, silme sırasıyla yürütülür. Sıralı (ordered) işte ilk
+hatada (veya bulunamayan belgede) durulur ve sonraki işlemler "skipped" döner;
+sırasız işte hatalı işlemler dışındakilerin tümü uygulanır. Türetilmiş durumlara
+yalnızca uygulanan işlemlerin değişiklikleri bildirilir.
+"""
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from derived_state import record_changes
+
+MAX_BULK_ITEMS = 1000
+
+
+def _plan(inserts, updates, deletes):
+    """Sonuç satırları ve yürütme listesi [(sonuç, veri)] - veri ekleme için belge, güncelleme için alanlar"""
+    results = []
+    for index, doc in enumerate(inserts):
+        results.append(({"op": "insert", "index": index, "id": doc["id"]}, doc))
+    for index, (doc_id, data) in enumerate(updates):
+        data = {k: v for k, v in data.items() if k not in ("id", "_id")}
+        results.append(({"op": "update", "index": index, "id": doc_id}, data))
+    for index, doc_id in enumerate(deletes):
+        results.append(({"op": "delete", "index": index, "id": doc_id}, None))
+    return results
+
+
+async def _insert(db, collection, items, ordered):
+    """Eklemeler tek insert_many ile; {sıra: hata mesajı} döner"""
+    if not items:
+        return {}
+    try:
+        await db[collection].insert_many([dict(doc) for _, doc in items], ordered=ordered)
+    except BulkWriteError as e:
+        return {error["index"]: error.get("errmsg", "") for error in e.details.get("writeErrors", [])}
+    return {}
+
+
+async def _apply(db, collection, result, data):
+    """Güncelleme / silme; (eski, yeni) değişikliği veya bulunamazsa None"""
+    if result["op"] == "update":
+        before = await db[collection].find_one_and_update(
+            {"id": result["id"]}, {"$set": data}, projection={"_id": 0})
+        return None if before is None else (before, {**before, **data})
+    before = await db[collection].find_one_and_delete({"id": result["id"]}, projection={"_id": 0})
+    return None if before is None else (before, None)
+
+
+async def execute(db, collection, inserts=(), updates=(), deletes=(), ordered=True):
+    """
+    inserts: [belge] (id atanmış), updates: [(id, alanlar)], deletes: [id].
+    {"inserted", "updated", "deleted", "results"} döner; results her işlem için
+    {op, index, id, status} - status: ok, notFound, error (error alanıyla), skipped.
+    """
+    plan = _plan(inserts, updates, deletes)
+    insert_items = [item for item in plan if item[0]["op"] == "insert"]
+    changes = []
+    stopped = False
+    try:
+        failed = await _insert(db, collection, insert_items, ordered)
+        stop = min(failed) if ordered and failed else None
+        for position, (result, doc) in enumerate(insert_items):
+            if position in failed:
+                result.update(status="error", error=failed[position])
+            elif stop is not None and position > stop:
+                result["status"] = "skipped"
+            else:
+                result["status"] = "ok"
+                changes.append((None, doc))
+        stopped = stop is not None
+
+        for result, data in plan[len(insert_items):]:
+            if stopped:
+                result["status"] = "skipped"
+                continue
+            try:
+                change = await _apply(db, collection, result, data)
+            except PyMongoError as e:
+                result.update(status="error", error=str(e))
+                stopped = ordered
+                continue
+            if change is None:
+                result["status"] = "notFound"
+                stopped = ordered
+            else:
+                result["status"] = "ok"
+                changes.append(change)
+    finally:
+        # Türetilmiş durumlar toplu iş başına bir kez güncellenir
+        await record_changes(db, collection, changes)
+
+    results = [result for result, _ in plan]
+
+    def count(op):
+        return sum(1 for result in results if result["op"] == op and result["status"] == "ok")
+
+    return {
+        "inserted": count("insert"),
+        "updated": count("update"),
+        "deleted": count("delete"),
+        "results": results,
+    }
@@ -2,6 +2,7 @@
 Üretim verilerinden günlük tüketimi hesapla
 Her tarih + makine kombinasyonu için toplam m²'ye göre hammadde tüketimi
 """
+import argparse
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
@@ -9,6 +10,8 @@ from dotenv import load_dotenv
 from pathlib import Path
 import uuid
 
+import staged_import
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
@@ -16,7 +19,7 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
-async def calculate_consumption():
+async def calculate_consumption(replace=False):
     print("📉 Üretimden günlük tüketim hesaplanıyor...")
     
     # Tüm üretimleri al
@@ -68,11 +71,10 @@ async def calculate_consumption():
         
         consumptions.append(consumption)
     
-    # Mevcut günlük tüketimi sil ve yenilerini ekle
-    await db.daily_consumption.delete_many({})
-    await db.daily_consumption.insert_many(consumptions)
+    # Yalnızca değişen günlük tüketim kayıtları yazılır (--swap ile toptan değiştirilir)
+    result = await staged_import.load(db, "daily_consumption", consumptions, replace)
     
-    print(f"   ✅ {len(consumptions)} günlük tüketim kaydı oluşturuldu")
+    print(f"   ✅ {len(consumptions)} günlük tüketim kaydı: {staged_import.summary(result)}")
     
     # Toplam tüketimi göster
     total_petkim = sum(c['petkim'] for c in consumptions)
@@ -94,11 +96,15 @@ async def calculate_consumption():
     client.close()
 
 async def main():
+    parser = argparse.ArgumentParser(description="Üretim verilerinden günlük tüketimi hesapla")
+    parser.add_argument("--swap", action="store_true", help="Koleksiyonu farkla güncellemek yerine toptan değiştir")
+    args = parser.parse_args()
+
     print("=" * 70)
     print("🔄 GÜNLÜK TÜKETİM HESAPLANMASI (Üretimden)")
     print("=" * 70)
     
-    await calculate_consumption()
+    await calculate_consumption(args.swap)
     
     print("\n" + "=" * 70)
     print("✅ GÜNLÜK TÜKETİM BAŞARIYLA HESAPLANDI!")
@@ -2,13 +2,17 @@
 Hammadde girişlerini hesaplanan tüketimden oluştur
 Tüketimden %30 fazla giriş yap ki stoklar pozitif olsun
 """
+import argparse
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
 from pathlib import Path
 import uuid
-from datetime import datetime
+
+import exchange_rate_history
+import staged_import
+from derived_state import record_change
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -17,7 +21,7 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
-async def create_material_entries():
+async def create_material_entries(replace=False):
     print("🧪 Hammadde girişleri hesaplanıyor...")
     
     # Toplam tüketimi hesapla
@@ -164,35 +168,39 @@ async def create_material_entries():
         'invoiceNo': 'RNK-2025-001'
     })
     
-    # Veritabanına kaydet
-    await db.materials.delete_many({})
-    await db.materials.insert_many(materials)
+    # Veritabanına kaydet (yalnızca değişen girişler yazılır)
+    result = await staged_import.load(db, "materials", materials, replace)
     
-    print(f"\n   ✅ {len(materials)} hammadde giriş kaydı oluşturuldu")
+    print(f"\n   ✅ {len(materials)} hammadde giriş kaydı: {staged_import.summary(result)}")
     
     print(f"\n   📦 Hammadde Girişleri:")
     for mat in materials:
         print(f"      {mat['material']}: {mat['quantity']} {mat['currency']}")
     
-    # Döviz kurları ekle
+    # Döviz kurları hammadde girişlerinin ilk tarihinden geçerli olarak kur geçmişine
+    # eklenir (maliyet analizi kuru geçmişten okur; güncel kur belgesi append ile güncellenir)
     exchange = {
         'usd': 34.75,
         'eur': 37.82,
-        'lastUpdated': datetime.utcnow().isoformat()
+        'date': min(m['date'] for m in materials)
     }
     
-    await db.exchange_rates.delete_many({})
-    await db.exchange_rates.insert_one(exchange)
+    before, after = await exchange_rate_history.append(db, exchange['usd'], exchange['eur'], exchange['date'])
+    await record_change(db, "exchange_rates", before=before, after=after)
     print(f"\n   ✅ Döviz kurları eklendi: USD={exchange['usd']}, EUR={exchange['eur']}")
     
     client.close()
 
 async def main():
+    parser = argparse.ArgumentParser(description="Hammadde girişlerini hesaplanan tüketimden oluştur")
+    parser.add_argument("--swap", action="store_true", help="Koleksiyonları farkla güncellemek yerine toptan değiştir")
+    args = parser.parse_args()
+
     print("=" * 70)
     print("🔄 HAMMADDE GİRİŞLERİ HESAPLANMASI")
     print("=" * 70)
     
-    await create_material_entries()
+    await create_material_entries(args.swap)
     
     print("\n" + "=" * 70)
     print("✅ HAMMADDE GİRİŞLERİ BAŞARIYLA OLUŞTURULDU!")
@@ -0,0 +1,67 @@
+"""
+Koleksiyon sürüm sayaçları (collection_versions)
+Her yazma işlemi ilgili koleksiyonun sayacını $inc ile artırır. Önbellekler
+sonuçlarını bu sayaçlarla anahtarlar; sayaç değiştiyse sonuç yeniden hesaplanır.
+Sayaçlar MongoDB'de tutulduğu için birden fazla worker aynı sürümü görür.
+"""
+from collections import OrderedDict
+
+from pymongo import UpdateOne
+
+VERSIONS_COLLECTION = "collection_versions"
+
+
+async def bump(db, *collections):
+    """Koleksiyonların sürüm sayaçlarını artır"""
+    if not collections:
+        return
+    await db[VERSIONS_COLLECTION].bulk_write(
+        [UpdateOne({"_id": name}, {"$inc": {"version": 1}}, upsert=True) for name in set(collections)],
+        ordered=False,
+    )
+
+
+async def get_versions(db, collections):
+    """Sürümleri verilen sırayla döndür (hiç yazılmamış koleksiyon için 0)"""
+    docs = await db[VERSIONS_COLLECTION].find({"_id": {"$in": list(collections)}}).to_list(None)
+    versions = {doc["_id"]: doc.get("version", 0) for doc in docs}
+    return tuple(versions.get(name, 0) for name in collections)
+
+
+class VersionedCache:
+    """
+    Koleksiyon sürümlerine bağlı, süreç içi sonuç önbelleği.
+    Bağımlı koleksiyonlardan herhangi birinin sürümü değişince kayıt geçersiz olur.
+    """
+
+    def __init__(self, collections, max_entries=64):
+        self.collections = tuple(collections)
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_compute(self, db, key, compute):
+        versions = await get_versions(db, self.collections)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == versions:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[1]
+
+        self.misses += 1
+        value = await compute()
+        self.entries[key] = (versions, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / total, 4) if total else 0,
+            "entries": len(self.entries),
+        }
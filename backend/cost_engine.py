@@ -0,0 +1,268 @@
+"""
+Maliyet analizi hesaplama motoru (sütun bazlı, NumPy)
+Üretim satırlarına hammadde tüketimini dağıtır ve maliyetlendirir:
+- Petkim, Estol, Talk → aynı tarih + makinedeki ürünler arasında m²'ye göre
+- Gaz → o günün tüm makinelerindeki ürünler arasında m²'ye göre
+- Masura → satırın masura tipinin birim fiyatı × adet
+
+Hesaplama iki aşamalıdır: allocate() miktarları dağıtır, price() fiyatlandırır.
+Toplamalar belge sırasıyla yapılır ve yuvarlama Python round() ile yapılır; böylece
+sonuç eski satır satır döngüyle birebir aynıdır. Eski kodun tamsayı 0 döndürdüğü
+durumlar (eşleşen tüketim / fiyat yoksa) *_int maskeleriyle korunur.
+"""
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+MATERIAL_KEYS = ("petkim", "estol", "talk", "gaz")
+
+
+def _number(value, kind=float):
+    """Sayıya çevrilemeyen değer (eski kayıtlardaki metin veya None) 0 sayılır"""
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return kind(0)
+
+
+def _codes(values):
+    """Değerleri 0..n-1 kodlarına çevir (None da ayrı bir değer sayılır)"""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+    return codes, len(uniques)
+
+
+def _group_sum(codes, size, values):
+    """Belge sırasıyla grup toplamı (Python döngüsündeki += ile aynı sıra)"""
+    totals = np.zeros(size, dtype=np.float64)
+    np.add.at(totals, codes, values)
+    return totals
+
+
+def _int_zero(values, int_mask):
+    """Tamsayı 0 olan yerleri +0.0 yap (Python'da int 0 işlemlere +0.0 olarak girer)"""
+    return np.where(int_mask, 0.0, values)
+
+
+def _safe_ratio(part, total):
+    """total > 0 ise part / total, değilse 0 (ve tamsayı 0 maskesi)"""
+    positive = total > 0
+    ratio = np.divide(part, total, out=np.zeros_like(part), where=positive)
+    return ratio, ~positive
+
+
+def exchange_rates_from(document):
+    """exchange_rates belgesinden (usd, eur); belge yoksa 1"""
+    usd_rate = float(document.get('usd', 1)) if document else 1
+    eur_rate = float(document.get('eur', 1)) if document else 1
+    return usd_rate, eur_rate
+
+
+def to_tl(price, currency, usd_rate, eur_rate):
+    if currency == 'USD':
+        return price * usd_rate
+    if currency == 'EUR':
+        return price * eur_rate
+    return price
+
+
+def material_quotes(materials):
+    """
+    Hammadde fiyatları kendi para biriminde: ({petkim/estol/talk/gaz: (fiyat, birim) veya None},
+    {MASURA ADI: (fiyat, birim)}). Aynı hammaddenin son kaydı geçerlidir; masura
+    adları büyük harf/boşluksuz eşleşir.
+    """
+    quotes = {key: None for key in MATERIAL_KEYS}
+    masura_quotes = {}
+    for mat in materials:
+        name = mat.get('material', '').upper()
+        quote = (_number(mat.get('unitPrice', 0)), mat.get('currency', 'TL'))
+
+        if 'PETK' in name or 'PETKİM' in name:
+            quotes['petkim'] = quote
+        elif 'ESTOL' in name:
+            quotes['estol'] = quote
+        elif 'TALK' in name:
+            quotes['talk'] = quote
+        elif 'GAZ' in name:
+            quotes['gaz'] = quote
+        elif 'MASURA' in name:
+            masura_quotes[mat.get('material', '')] = quote
+
+    # Aynı adı veren ilk masura kaydı eşleşir
+    normalized = {}
+    for masura_name, masura_quote in masura_quotes.items():
+        normalized.setdefault(masura_name.upper().strip(), masura_quote)
+    return quotes, normalized
+
+
+def material_prices(materials, usd_rate, eur_rate):
+    """Hammadde birim fiyatları (TL): ({petkim/estol/talk/gaz: fiyat veya None}, {MASURA ADI: fiyat})"""
+    quotes, masura_quotes = material_quotes(materials)
+    prices = {
+        key: None if quote is None else to_tl(quote[0], quote[1], usd_rate, eur_rate)
+        for key, quote in quotes.items()
+    }
+    masura_prices = {
+        name: to_tl(quote[0], quote[1], usd_rate, eur_rate) for name, quote in masura_quotes.items()
+    }
+    return prices, masura_prices
+
+
+def allocate(productions, consumptions):
+    """Günlük tüketimi üretim satırlarına dağıt; satır sırasıyla sütunlar döner"""
+    n = len(productions)
+    dates = [prod.get('date') for prod in productions]
+    keys = [f"{date}_{prod.get('machine')}" for date, prod in zip(dates, productions)]
+    m2 = np.array([_number(prod.get('m2', 0)) for prod in productions], dtype=np.float64)
+    quantity = np.array([_number(prod.get('quantity', 0), int) for prod in productions], dtype=np.int64)
+
+    cons_dates = [cons.get('date') for cons in consumptions]
+    cons_keys = [f"{date}_{cons.get('machine')}" for date, cons in zip(cons_dates, consumptions)]
+    cons_values = {
+        key: np.array([_number(cons.get(key, 0)) for cons in consumptions], dtype=np.float64)
+        for key in MATERIAL_KEYS
+    }
+
+    # Üretim ve tüketim için ortak tarih+makine ve tarih kodları
+    key_codes, key_count = _codes(keys + cons_keys)
+    date_codes, date_count = _codes(dates + cons_dates)
+    prod_keys, cons_key_codes = key_codes[:n], key_codes[n:]
+    prod_dates, cons_date_codes = date_codes[:n], date_codes[n:]
+
+    # Petkim, Estol, Talk → tarih + makine; Gaz → tarih
+    has_cons = np.zeros(key_count, dtype=bool)
+    has_cons[cons_key_codes] = True
+    has_gaz = np.zeros(date_count, dtype=bool)
+    has_gaz[cons_date_codes] = True
+    machine_totals = {
+        key: _group_sum(cons_key_codes, key_count, cons_values[key])
+        for key in ("petkim", "estol", "talk")
+    }
+    gaz_by_date = _group_sum(cons_date_codes, date_count, cons_values["gaz"])
+
+    # m² payları
+    ratio, ratio_int = _safe_ratio(m2, _group_sum(prod_keys, key_count, m2)[prod_keys])
+    gaz_ratio, gaz_ratio_int = _safe_ratio(m2, _group_sum(prod_dates, date_count, m2)[prod_dates])
+
+    columns = {"m2": m2, "quantity": quantity}
+    no_cons = ~has_cons[prod_keys]
+    for key in ("petkim", "estol", "talk"):
+        columns[f"{key}_int"] = no_cons & ratio_int
+        columns[key] = _int_zero(machine_totals[key][prod_keys] * ratio, columns[f"{key}_int"])
+    columns["gaz_int"] = ~has_gaz[prod_dates] & gaz_ratio_int
+    columns["gaz"] = _int_zero(gaz_by_date[prod_dates] * gaz_ratio, columns["gaz_int"])
+    return columns
+
+
+def masura_unit_prices(productions, masura_prices):
+    """Her satırın masura birim fiyatı ve fiyatın bulunup bulunmadığı"""
+    types = [prod.get('masuraType', '') for prod in productions]
+    codes, uniques = pd.factorize(np.asarray(types, dtype=object), use_na_sentinel=False)
+    lookup = [masura_prices.get(value.upper().strip()) for value in uniques]
+    found = np.array([price is not None for price in lookup], dtype=bool)
+    unit = np.array([price if price is not None else 0.0 for price in lookup], dtype=np.float64)
+    return unit[codes], found[codes]
+
+
+def price(columns, prices, masura_unit, masura_found):
+    """Dağıtılmış miktarları fiyatlandır (fiyatlar skaler veya satır bazlı dizi olabilir)"""
+    material_cost = None
+    material_int = None
+    for key in MATERIAL_KEYS:
+        unit = prices[key]
+        term_int = columns[f"{key}_int"] & (unit is None)
+        term = _int_zero(columns[key] * (0.0 if unit is None else unit), term_int)
+        material_cost = term if material_cost is None else material_cost + term
+        material_int = term_int if material_int is None else material_int & term_int
+
+    quantity = columns["quantity"].astype(np.float64)
+    m2 = columns["m2"]
+    masura_int = ~masura_found
+    masura_cost = _int_zero(quantity * masura_unit, masura_int)
+    total_int = material_int & masura_int
+    total_cost = _int_zero(material_cost + masura_cost, total_int)
+
+    unit_cost, unit_int = _safe_ratio(total_cost, quantity)
+    m2_cost, m2_cost_int = _safe_ratio(total_cost, m2)
+    return {
+        "materialCost": material_cost, "materialCost_int": material_int,
+        "masuraCost": masura_cost, "masuraCost_int": masura_int,
+        "totalCost": total_cost, "totalCost_int": total_int,
+        "unitCost": unit_cost, "unitCost_int": unit_int,
+        "m2Cost": m2_cost, "m2Cost_int": m2_cost_int,
+    }
+
+
+def _rounded(values, int_mask):
+    """Python round() ile yuvarla; eski kodun tamsayı 0 ürettiği yerlerde 0"""
+    return [0 if is_int else round(value, 2) for value, is_int in zip(values.tolist(), int_mask.tolist())]
+
+
+ROUNDED_COLUMNS = ("petkim", "estol", "talk", "gaz", "materialCost", "masuraCost", "totalCost", "unitCost", "m2Cost")
+
+# Maliyet analizi satırının alanları (yanıttaki sırayla)
+ROW_FIELDS = ("id", "date", "machine", "thickness", "width", "length", "m2", "quantity", "masuraType", "color") + ROUNDED_COLUMNS
+
+
+def build_rows(productions, columns, costs, sort=True):
+    """Sütunlardan maliyet analizi satırlarını oluştur (sort=True ise en yeni tarih önce)"""
+    merged = {**columns, **costs}
+    rounded = {key: _rounded(merged[key], merged[f"{key}_int"]) for key in ROUNDED_COLUMNS}
+    m2 = [round(value, 2) for value in columns["m2"].tolist()]
+    quantity = columns["quantity"].tolist()
+
+    rows = []
+    for i, prod in enumerate(productions):
+        rows.append({
+            'id': prod.get('id', ''),
+            'date': prod.get('date'),
+            'machine': prod.get('machine'),
+            'thickness': prod.get('thickness', ''),
+            'width': _number(prod.get('width', 0), int),
+            'length': _number(prod.get('length', 0), int),
+            'm2': m2[i],
+            'quantity': quantity[i],
+            'masuraType': prod.get('masuraType', ''),
+            'color': prod.get('color', ''),
+            'petkim': rounded['petkim'][i],
+            'estol': rounded['estol'][i],
+            'talk': rounded['talk'][i],
+            'gaz': rounded['gaz'][i],
+            'materialCost': rounded['materialCost'][i],
+            'masuraCost': rounded['masuraCost'][i],
+            'totalCost': rounded['totalCost'][i],
+            'unitCost': rounded['unitCost'][i],
+            'm2Cost': rounded['m2Cost'][i],
+        })
+
+    # Tarihe göre sırala (en yeni önce, eşit tarihlerde kayıt sırası korunur)
+    if sort:
+        rows.sort(key=lambda row: row['date'], reverse=True)
+    return rows
+
+
+def price_table(materials, exchange_rates):
+    """Hammadde ve döviz kurlarından (fiyatlar, masura fiyatları)"""
+    usd_rate, eur_rate = exchange_rates_from(exchange_rates)
+    return material_prices(materials, usd_rate, eur_rate)
+
+
+def price_signature(table):
+    """Fiyat tablosunun özeti; değişmediyse yeniden fiyatlandırma gerekmez"""
+    return hashlib.sha1(json.dumps(table, sort_keys=True).encode()).hexdigest()
+
+
+def price_rows(productions, columns, table, sort=True):
+    """Dağıtılmış miktarları fiyat tablosuyla fiyatlandırıp satırları oluştur"""
+    prices, masura_prices = table
+    masura_unit, masura_found = masura_unit_prices(productions, masura_prices)
+    costs = price(columns, prices, masura_unit, masura_found)
+    return build_rows(productions, columns, costs, sort=sort)
+
+
+def compute_cost_analysis(productions, consumptions, materials, exchange_rates):
+    """Üretim satırı bazında maliyet analizi"""
+    columns = allocate(productions, consumptions)
+    return price_rows(productions, columns, price_table(materials, exchange_rates))
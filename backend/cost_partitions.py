@@ -0,0 +1,392 @@
+"""
+Maliyet analizi bölümleri (cost_partitions)
+Maliyet analizi satırları (tarih, makine) bölümleri halinde saklanır. Bir üretim
+veya günlük tüketim kaydı değişince yalnızca o günün bölümleri yeniden hesaplanır
+(gaz o günün tüm makinelerine dağıtıldığı için gün bir bütün olarak hesaplanır).
+
+Hammadde fiyatı veya döviz kuru değişince dağıtım tekrarlanmaz: saklanan miktar
+sütunları yeni fiyat tablosuyla yeniden fiyatlandırılır. Dövizli fiyatlar bölüm
+tarihinde geçerli kurla (exchange_rate_history) TL'ye çevrilir. Her bölüm hangi
+fiyat tablosuyla fiyatlandığını (priceSignature) saklar; okuma sırasında tablo
+değişmişse bölüm yeniden fiyatlandırılır.
+
+Her bölümün kalınlık/en/metre/renk kırılımındaki toplamları cost_rollups
+koleksiyonunda tutulur ve bölümle birlikte güncellenir.
+
+Kullanım:
+    python cost_partitions.py rebuild    # Tüm bölümleri sıfırdan hesapla
+"""
+import argparse
+import asyncio
+
+import numpy as np
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+import cost_engine
+import exchange_rate_history
+from pagination import decode_cursor, encode_cursor
+import cost_rollups
+
+PARTITIONS_COLLECTION = "cost_partitions"
+STATE_COLLECTION = "cost_partitions_state"
+
+# Bölümleri etkileyen koleksiyonlar
+ALLOCATION_SOURCES = ("productions", "daily_consumption")
+PRICE_SOURCES = ("materials", "exchange_rates")
+
+# Bölüm satırlarında saklanan üretim alanları
+PRODUCTION_FIELDS = ("id", "date", "machine", "thickness", "width", "length", "masuraType", "color")
+INT_COLUMNS = ("petkim_int", "estol_int", "talk_int", "gaz_int")
+
+# Bölüm yapısı değişince artırılır; eski yapıdaki bölümler yeniden oluşturulur
+# (2: maliyet özetleri - cost_rollups)
+BUILD_VERSION = 2
+
+
+async def _next_ticket(db):
+    """
+    Yeniden hesaplama bileti. Bilet yazma işleminden sonra alınır; daha büyük
+    bilet daha yeni veriyi görmüştür, bu yüzden eski biletli hesaplama yenisinin
+    üzerine yazamaz.
+    """
+    doc = await db[STATE_COLLECTION].find_one_and_update(
+        {"_id": "ticket"}, {"$inc": {"value": 1}},
+        upsert=True, return_document=ReturnDocument.AFTER,
+    )
+    return doc["value"]
+
+
+class PriceTables:
+    """
+    Tarihe göre fiyat tablosu: dövizli hammadde fiyatları o tarihte geçerli kurla
+    TL'ye çevrilir. Aynı kur dönemindeki günler aynı tabloyu ve imzayı paylaşır.
+    """
+
+    def __init__(self, materials, history):
+        self.materials = materials
+        self.history = history
+        self.tables = {}
+
+    def for_day(self, day):
+        """(fiyat tablosu, imza)"""
+        index = self.history.index_on(day)
+        if index not in self.tables:
+            rate = self.history.rate_on(day)
+            table = cost_engine.price_table(self.materials, rate)
+            self.tables[index] = (table, cost_engine.price_signature(table))
+        return self.tables[index]
+
+
+async def current_prices(db):
+    materials = await db.materials.find({}, {"_id": 0}).to_list(None)
+    return PriceTables(materials, await exchange_rate_history.load(db))
+
+
+def _slice_columns(columns, indices):
+    return {key: values[indices] for key, values in columns.items()}
+
+
+def _columns_to_doc(columns):
+    return {key: values.tolist() for key, values in columns.items()}
+
+
+def _columns_from_doc(stored):
+    columns = {}
+    for key, values in stored.items():
+        if key in INT_COLUMNS:
+            columns[key] = np.array(values, dtype=bool)
+        elif key == "quantity":
+            columns[key] = np.array(values, dtype=np.int64)
+        else:
+            columns[key] = np.array(values, dtype=np.float64)
+    return columns
+
+
+def _reprice(doc, prices):
+    """Saklanan miktar sütunlarını bölüm tarihinin fiyat tablosuyla fiyatlandır"""
+    table, signature = prices.for_day(doc["date"])
+    columns = _columns_from_doc(doc["columns"])
+    doc["rows"] = cost_engine.price_rows(doc["productions"], columns, table, sort=False)
+    doc["priceSignature"] = signature
+    return doc
+
+
+async def recompute_day(db, day, ticket, prices):
+    """Bir günün tüm (tarih, makine) bölümlerini yeniden hesapla"""
+    productions = await db.productions.find({"date": day}, {"_id": 0}).to_list(None)
+    consumptions = await db.daily_consumption.find({"date": day}, {"_id": 0}).to_list(None)
+
+    columns = cost_engine.allocate(productions, consumptions)
+    by_machine = {}
+    for index, prod in enumerate(productions):
+        by_machine.setdefault(prod.get("machine"), []).append(index)
+
+    for machine, indices in by_machine.items():
+        indices = np.array(indices)
+        partition_prods = [{field: productions[i].get(field) for field in PRODUCTION_FIELDS if field in productions[i]}
+                           for i in indices]
+        doc = _reprice({
+            "date": day,
+            "machine": machine,
+            "ticket": ticket,
+            "seq": indices.tolist(),
+            "productions": partition_prods,
+            "columns": _columns_to_doc(_slice_columns(columns, indices)),
+        }, prices)
+        try:
+            await db[PARTITIONS_COLLECTION].replace_one(
+                {"date": day, "machine": machine, "ticket": {"$lte": ticket}}, doc, upsert=True
+            )
+        except DuplicateKeyError:
+            # Daha yeni bir hesaplama bu bölümü zaten yazdı
+            continue
+        await cost_rollups.write_partition(db, doc)
+
+    # O gün artık üretimi olmayan makinelerin bölümlerini sil
+    await _delete_partitions(db, {"date": day, "machine": {"$nin": list(by_machine)}, "ticket": {"$lte": ticket}})
+
+
+async def _delete_partitions(db, query):
+    await db[PARTITIONS_COLLECTION].delete_many(query)
+    await cost_rollups.delete_partitions(db, query)
+
+
+async def recompute_days(db, days):
+    if not days:
+        return
+    ticket = await _next_ticket(db)
+    prices = await current_prices(db)
+    for day in days:
+        await recompute_day(db, day, ticket, prices)
+
+
+async def reprice_stale(db, prices=None):
+    """Fiyat tablosu değişmiş bölümleri miktar dağıtımını tekrarlamadan yeniden fiyatlandır"""
+    prices = prices or await current_prices(db)
+    stale_ids = [
+        doc["_id"]
+        async for doc in db[PARTITIONS_COLLECTION].find({}, {"date": 1, "priceSignature": 1})
+        if doc.get("priceSignature") != prices.for_day(doc["date"])[1]
+    ]
+    if not stale_ids:
+        return
+
+    updates = []
+    rollup_updates = []
+    async for doc in db[PARTITIONS_COLLECTION].find({"_id": {"$in": stale_ids}}):
+        _reprice(doc, prices)
+        # Bu arada bölüm yeniden hesaplandıysa dokunma
+        updates.append(UpdateOne(
+            {"_id": doc["_id"], "ticket": doc["ticket"]},
+            {"$set": {"rows": doc["rows"], "priceSignature": doc["priceSignature"]}},
+        ))
+        rollup_updates.append(cost_rollups.reprice_update(doc))
+    if updates:
+        await db[PARTITIONS_COLLECTION].bulk_write(updates, ordered=False)
+        await db[cost_rollups.ROLLUP_COLLECTION].bulk_write(rollup_updates, ordered=False)
+
+
+async def rebuild(db):
+    """Tüm bölümleri sıfırdan hesapla"""
+    days = await db.productions.distinct("date")
+    ticket = await _next_ticket(db)
+    prices = await current_prices(db)
+    await _delete_partitions(db, {"date": {"$nin": days}, "ticket": {"$lte": ticket}})
+    for day in days:
+        await recompute_day(db, day, ticket, prices)
+    await db[STATE_COLLECTION].update_one({"_id": "built"}, {"$set": {"value": BUILD_VERSION}}, upsert=True)
+
+
+async def ensure_built(db):
+    """Bölümler hiç oluşturulmamışsa veya eski bir yapıdaysa yeniden oluştur"""
+    if await db[STATE_COLLECTION].count_documents({"_id": "built", "value": BUILD_VERSION}, limit=1) == 0:
+        await rebuild(db)
+
+
+async def ensure_current(db):
+    """Bölümleri (ve özetlerini) güncel fiyat tablosuyla hazır hale getir"""
+    await ensure_built(db)
+    await reprice_stale(db)
+
+
+async def _day_rows(db, query=None, descending=True):
+    """
+    Bölümleri gün gün oku: (tarih, [(sıra, satır), ...]) - gün içinde kayıt sırası.
+    Fiyat tablosu değişmiş bölümler okunurken yeniden fiyatlandırılır.
+    """
+    await ensure_built(db)
+    prices = await current_prices(db)
+
+    day_rows = []
+    current_day = None
+    stale = False
+    async for doc in db[PARTITIONS_COLLECTION].find(query or {}).sort("date", -1 if descending else 1):
+        if doc.get("priceSignature") != prices.for_day(doc["date"])[1]:
+            _reprice(doc, prices)
+            stale = True
+        if day_rows and doc["date"] != current_day:
+            yield current_day, sorted(day_rows, key=lambda item: item[0])
+            day_rows = []
+        current_day = doc["date"]
+        day_rows.extend(zip(doc["seq"], doc["rows"]))
+    if day_rows:
+        yield current_day, sorted(day_rows, key=lambda item: item[0])
+    # Okuma yarıda bırakılırsa kalan eski bölümler bir sonraki okumada fiyatlanır
+    if stale:
+        await reprice_stale(db, prices)
+
+
+async def iter_rows(db, query=None, descending=True):
+    """Saklanan bölümlerin satırlarını gün gün üret (bellekte en fazla bir günün satırları)"""
+    async for _, day_rows in _day_rows(db, query, descending):
+        for _, row in day_rows:
+            yield row
+
+
+async def read_rows(db, query=None):
+    """Saklanan bölümlerin satırları (en yeni tarih önce, gün içinde kayıt sırası)"""
+    return [row async for row in iter_rows(db, query)]
+
+
+def date_range_query(date_from=None, date_to=None):
+    """Bölüm sorgusu için (başlangıç ve bitiş dahil) tarih aralığı"""
+    query = {}
+    if date_from or date_to:
+        query["date"] = {}
+        if date_from:
+            query["date"]["$gte"] = date_from
+        if date_to:
+            query["date"]["$lte"] = date_to
+    return query
+
+
+async def load_columns(db, query=None):
+    """Bölümlerdeki üretim satırları ve dağıtılmış miktar sütunları (tek dizide birleştirilmiş)"""
+    await ensure_built(db)
+    productions = []
+    stored = {}
+    async for doc in db[PARTITIONS_COLLECTION].find(query or {}, {"productions": 1, "columns": 1}):
+        productions.extend(doc["productions"])
+        for key, values in doc["columns"].items():
+            stored.setdefault(key, []).extend(values)
+    return productions, _columns_from_doc(stored)
+
+
+# Sıralanabilir alanlar (başına "-" eklenirse azalan)
+SORT_FIELDS = ("date", "machine", "m2", "quantity", "petkim", "estol", "talk", "gaz",
+               "materialCost", "masuraCost", "totalCost", "unitCost", "m2Cost")
+# Satır bazında süzülen alanlar (tarih ve makine bölüm sorgusuyla süzülür)
+ROW_FILTERS = ("thickness", "color", "masuraType")
+
+
+def parse_sort(sort):
+    """'-totalCost' -> ('totalCost', True); geçersiz alan için ValueError"""
+    descending = sort.startswith("-")
+    field = sort.lstrip("-")
+    if field not in SORT_FIELDS:
+        raise ValueError(f"Geçersiz sıralama alanı: {field}")
+    return field, descending
+
+
+def _sort_key(field, descending, day, seq, row):
+    """
+    Satırın sıralama anahtarı. Azalan sıralamada anahtar ters çevrildiği için
+    kayıt sırası negatif tutulur; eşit değerlerde gün içi kayıt sırası korunur.
+    """
+    order = -seq if descending else seq
+    if field == "date":
+        return [day, order]
+    value = row.get(field)
+    value = str(value or "") if field == "machine" else (value or 0)
+    return [value, day, order]
+
+
+async def query_rows(db, date_from=None, date_to=None, machine=None, filters=None,
+                     sort="-date", limit=None, cursor=None):
+    """
+    Süzülmüş, sıralanmış ve sayfalanmış maliyet satırları: (satırlar, sonraki_imleç).
+
+    Tarih aralığı ve makine yalnızca okunan bölümleri daraltır; dağıtım her zaman
+    günün tamamıyla yapılmış olduğu için toplamlar süzmeden etkilenmez. Tarihe göre
+    sıralamada bölümler sırayla okunur ve sayfa dolunca okuma durur.
+    """
+    field, descending = parse_sort(sort)
+    after = decode_cursor(cursor) if cursor else None
+    if after is not None and len(after) != (2 if field == "date" else 3):
+        raise ValueError("Geçersiz imleç")
+    filters = {key: value for key, value in (filters or {}).items() if value is not None}
+
+    query = date_range_query(date_from, date_to)
+    if machine is not None:
+        query["machine"] = machine
+    if after and field == "date":
+        # İmleçten önceki günler hiç okunmaz
+        query.setdefault("date", {})["$lte" if descending else "$gte"] = after[0]
+
+    def is_after(key):
+        if after is None:
+            return True
+        return key < after if descending else key > after
+
+    keyed = []
+    days = _day_rows(db, query, descending)
+    try:
+        async for day, day_rows in days:
+            for seq, row in day_rows:
+                if any(str(row.get(name, "")) != value for name, value in filters.items()):
+                    continue
+                key = _sort_key(field, descending, day, seq, row)
+                if is_after(key):
+                    keyed.append((key, row))
+            # Tarih sıralamasında satırlar zaten sıralı gelir; sayfa dolduysa dur
+            if field == "date" and limit is not None and len(keyed) > limit:
+                break
+    finally:
+        await days.aclose()
+
+    keyed.sort(key=lambda item: item[0], reverse=descending)
+    if limit is None or len(keyed) <= limit:
+        return [row for _, row in keyed], None
+    page = keyed[:limit]
+    return [row for _, row in page], encode_cursor(page[-1][0])
+
+
+def _changed_days(changes):
+    return {doc.get("date") for change in changes for doc in change if doc is not None}
+
+
+async def apply_changes(db, collection, changes):
+    if collection in ALLOCATION_SOURCES:
+        await recompute_days(db, _changed_days(changes))
+    elif collection in PRICE_SOURCES:
+        await reprice_stale(db)
+
+
+async def main():
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from dotenv import load_dotenv
+    from pathlib import Path
+    import os
+
+    import indexes
+
+    parser = argparse.ArgumentParser(description="Maliyet analizi bölümlerini yeniden hesapla")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    try:
+        await indexes.apply(db, [*ALLOCATION_SOURCES, PARTITIONS_COLLECTION, cost_rollups.ROLLUP_COLLECTION])
+        await rebuild(db)
+        count = await db[PARTITIONS_COLLECTION].count_documents({})
+        print(f"✅ {count} maliyet bölümü yeniden hesaplandı")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+"""
+Maliyet özet küpü (cost_rollups)
+Her (tarih, makine) maliyet bölümü için kalınlık × en × metre × renk kırılımında
+toplamlar saklanır: materialCost, masuraCost, totalCost, m2, quantity, count.
+Bölüm yeniden hesaplandığında veya yeniden fiyatlandığında özeti de aynı bilet
+koşuluyla güncellenir; /api/cost-analysis/rollup bu özetleri istenen boyutlara
+göre gruplayarak döner (satır satır maliyet analizi okunmaz).
+"""
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+ROLLUP_COLLECTION = "cost_rollups"
+
+# Özet hücresinin kırılım alanları ve toplanan değerler
+CELL_DIMENSIONS = ("thickness", "width", "length", "color")
+MEASURES = ("materialCost", "masuraCost", "totalCost", "m2", "quantity", "count")
+
+# groupBy ile seçilebilen boyutlar (month = tarihin YYYY-MM kısmı)
+GROUP_DIMENSIONS = ("date", "month", "machine") + CELL_DIMENSIONS
+
+
+def cells_from_rows(rows):
+    """Bölüm satırlarını (kalınlık, en, metre, renk) hücrelerinde topla"""
+    cells = {}
+    for row in rows:
+        key = tuple(row.get(dimension) for dimension in CELL_DIMENSIONS)
+        cell = cells.get(key)
+        if cell is None:
+            cell = cells[key] = dict(zip(CELL_DIMENSIONS, key), **{measure: 0 for measure in MEASURES})
+        for measure in MEASURES[:-1]:
+            cell[measure] += row.get(measure, 0)
+        cell["count"] += 1
+    for cell in cells.values():
+        for measure in ("materialCost", "masuraCost", "totalCost", "m2"):
+            cell[measure] = round(cell[measure], 2)
+    return list(cells.values())
+
+
+async def write_partition(db, partition):
+    """Bölümün özetini yaz; daha yeni biletli bir özet varsa dokunma"""
+    doc = {
+        "date": partition["date"],
+        "machine": partition["machine"],
+        "ticket": partition["ticket"],
+        "cells": cells_from_rows(partition["rows"]),
+    }
+    try:
+        await db[ROLLUP_COLLECTION].replace_one(
+            {"date": doc["date"], "machine": doc["machine"], "ticket": {"$lte": doc["ticket"]}},
+            doc, upsert=True,
+        )
+    except DuplicateKeyError:
+        pass
+
+
+def reprice_update(partition):
+    """Yeniden fiyatlanan bölümün özet güncellemesi (bölümle aynı bilet koşulu)"""
+    return UpdateOne(
+        {"date": partition["date"], "machine": partition["machine"], "ticket": partition["ticket"]},
+        {"$set": {"cells": cells_from_rows(partition["rows"])}},
+    )
+
+
+async def delete_partitions(db, query):
+    await db[ROLLUP_COLLECTION].delete_many(query)
+
+
+def parse_group_by(group_by):
+    """'month,machine' -> ('month', 'machine'); geçersiz boyut için ValueError"""
+    dimensions = tuple(part.strip() for part in group_by.split(",") if part.strip())
+    invalid = [dimension for dimension in dimensions if dimension not in GROUP_DIMENSIONS]
+    if invalid:
+        raise ValueError(f"Geçersiz groupBy boyutu: {', '.join(invalid)}")
+    return tuple(dict.fromkeys(dimensions))
+
+
+def _dimension_expr(dimension):
+    if dimension == "month":
+        return {"$substr": ["$date", 0, 7]}
+    if dimension in CELL_DIMENSIONS:
+        return f"$cells.{dimension}"
+    return f"${dimension}"
+
+
+def rollup_pipeline(dimensions, date_from=None, date_to=None, machine=None):
+    match = {}
+    if date_from or date_to:
+        match["date"] = {}
+        if date_from:
+            match["date"]["$gte"] = date_from
+        if date_to:
+            match["date"]["$lte"] = date_to
+    if machine is not None:
+        match["machine"] = machine
+
+    group = {"_id": {dimension: _dimension_expr(dimension) for dimension in dimensions}}
+    for measure in MEASURES:
+        group[measure] = {"$sum": f"$cells.{measure}"}
+    return [
+        {"$match": match},
+        {"$unwind": "$cells"},
+        {"$group": group},
+        {"$sort": {f"_id.{dimension}": 1 for dimension in dimensions} or {"_id": 1}},
+    ]
+
+
+async def query(db, dimensions, date_from=None, date_to=None, machine=None):
+    """Özetleri verilen boyutlara göre grupla (boyut yoksa genel toplam)"""
+    groups = await db[ROLLUP_COLLECTION].aggregate(
+        rollup_pipeline(dimensions, date_from, date_to, machine)
+    ).to_list(None)
+    result = []
+    for group in groups:
+        row = {dimension: group["_id"].get(dimension) for dimension in dimensions}
+        for measure in MEASURES:
+            value = group[measure]
+            row[measure] = value if measure in ("quantity", "count") else round(value, 2)
+        result.append(row)
+    return result
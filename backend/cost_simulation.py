@@ -0,0 +1,244 @@
+"""
+Maliyet senaryoları (what-if)
+Hammadde fiyatı ve döviz kuru değişikliklerinin maliyetlere etkisi, kayıtlı
+veriye dokunmadan hesaplanır. Maliyet bölümlerinde saklanan dağıtılmış miktar
+sütunları tek bir matriste birleştirilir; tüm senaryolar (ve karşılaştırma için
+mevcut durum) senaryo × satır fiyat matrisleriyle tek geçişte fiyatlandırılır.
+
+Senaryo alanları:
+- priceChanges: {hammadde: yüzde} - örn. {"petkim": 8}; "masura" tüm masuralara uygulanır
+- prices: {hammadde: birim fiyat} - hammaddenin kendi para biriminde
+- usd / eur: senaryo boyunca tüm tarihlerde kullanılacak kur
+- dateFrom / dateTo: senaryonun kapsadığı üretim tarihleri (dahil)
+Hammadde adları petkim, estol, talk, gaz veya masura tipidir ("MASURA 100").
+"""
+import numpy as np
+import pandas as pd
+
+import cost_engine
+import cost_partitions
+import exchange_rate_history
+
+MAX_SCENARIOS = 50
+
+# SKU kırılımı (stok ile aynı: kalınlık, en, metre, renk)
+SKU_FIELDS = ("thickness", "width", "length", "color")
+
+
+def _normalize(name):
+    return str(name).upper().strip()
+
+
+def material_key(name):
+    """Senaryo hammadde adını fiyat anahtarına çevir; geçersizse ValueError"""
+    key = str(name).strip().lower()
+    if key in cost_engine.MATERIAL_KEYS or key == "masura":
+        return key
+    if "MASURA" in _normalize(name):
+        return _normalize(name)
+    raise ValueError(f"Geçersiz hammadde: {name}")
+
+
+def normalize_scenario(scenario):
+    """Senaryo sözlüğünü doğrula; hammadde adları fiyat anahtarlarına çevrilir"""
+    return {
+        **scenario,
+        "priceChanges": {material_key(k): float(v) for k, v in (scenario.get("priceChanges") or {}).items()},
+        "prices": {material_key(k): float(v) for k, v in (scenario.get("prices") or {}).items()},
+    }
+
+
+def _rate_factors(currency, usd, eur):
+    """Para birimine göre TL çarpanı (senaryo × satır)"""
+    if currency == 'USD':
+        return usd
+    if currency == 'EUR':
+        return eur
+    return np.ones_like(usd)
+
+
+def _unit_prices(quote, override_keys, scenarios, usd, eur):
+    """
+    Bir hammaddenin senaryo × satır TL birim fiyatı; hammadde tanımlı değilse None.
+    override_keys: önceliğe göre senaryo anahtarları (örn. ["MASURA 100", "masura"])
+    """
+    prices = np.empty(len(scenarios))
+    changes = np.zeros(len(scenarios))
+    defined = quote is not None
+    for s, scenario in enumerate(scenarios):
+        base = quote[0] if quote is not None else 0.0
+        for key in override_keys:
+            if key in scenario["prices"]:
+                base = scenario["prices"][key]
+                defined = True
+                break
+        prices[s] = base
+        for key in override_keys:
+            if key in scenario["priceChanges"]:
+                changes[s] = scenario["priceChanges"][key]
+                break
+    if not defined:
+        return None
+    currency = quote[1] if quote is not None else 'TL'
+    return (prices * (1 + changes / 100))[:, None] * _rate_factors(currency, usd, eur)
+
+
+def _row_rates(dates, history, scenarios):
+    """Satırların kurları (senaryo × satır): senaryo kuru yoksa üretim tarihindeki kur"""
+    date_codes, unique_dates = pd.factorize(np.asarray(dates, dtype=object))
+    usd_by_date = np.ones(len(unique_dates))
+    eur_by_date = np.ones(len(unique_dates))
+    for i, day in enumerate(unique_dates):
+        usd_by_date[i], eur_by_date[i] = cost_engine.exchange_rates_from(history.rate_on(day))
+
+    usd = np.tile(usd_by_date[date_codes], (len(scenarios), 1))
+    eur = np.tile(eur_by_date[date_codes], (len(scenarios), 1))
+    for s, scenario in enumerate(scenarios):
+        if scenario.get("usd") is not None:
+            usd[s] = scenario["usd"]
+        if scenario.get("eur") is not None:
+            eur[s] = scenario["eur"]
+    return usd, eur
+
+
+def evaluate(productions, columns, materials, history, scenarios):
+    """
+    Senaryoların satır maliyetleri: (malzeme, masura) - her biri senaryo × satır.
+    scenarios normalize_scenario ile doğrulanmış olmalıdır.
+    """
+    n = len(productions)
+    usd, eur = _row_rates([prod.get("date") for prod in productions], history, scenarios)
+    quotes, masura_quotes = cost_engine.material_quotes(materials)
+
+    material_cost = np.zeros((len(scenarios), n))
+    for key in cost_engine.MATERIAL_KEYS:
+        unit = _unit_prices(quotes[key], [key], scenarios, usd, eur)
+        if unit is not None:
+            material_cost += columns[key] * unit
+
+    # Masura: satırlar masura tipine göre gruplanıp tip başına fiyatlanır
+    masura_cost = np.zeros((len(scenarios), n))
+    types = [_normalize(prod.get("masuraType", "")) for prod in productions]
+    type_codes, unique_types = pd.factorize(np.asarray(types, dtype=object), use_na_sentinel=False)
+    quantity = columns["quantity"].astype(np.float64)
+    for code, masura_type in enumerate(unique_types):
+        rows = type_codes == code
+        unit = _unit_prices(masura_quotes.get(masura_type), [masura_type, "masura"], scenarios, usd[:, rows], eur[:, rows])
+        if unit is not None:
+            masura_cost[:, rows] = quantity[rows] * unit
+    return material_cost, masura_cost
+
+
+def _in_range(dates, scenario):
+    mask = np.ones(len(dates), dtype=bool)
+    if scenario.get("dateFrom"):
+        mask &= dates >= scenario["dateFrom"]
+    if scenario.get("dateTo"):
+        mask &= dates <= scenario["dateTo"]
+    return mask
+
+
+def _unit_cost(cost, quantity):
+    return round(cost / quantity, 2) if quantity > 0 else 0
+
+
+def _totals(material, masura, quantity):
+    total = material + masura
+    return {
+        "materialCost": round(material, 2),
+        "masuraCost": round(masura, 2),
+        "totalCost": round(total, 2),
+        "unitCost": _unit_cost(total, quantity),
+    }
+
+
+def summarize(productions, columns, material_cost, masura_cost, scenarios):
+    """
+    Senaryo toplamları ve SKU bazında birim maliyet farkları.
+    material_cost / masura_cost'un ilk satırı mevcut durumdur (karşılaştırma tabanı).
+    """
+    dates = np.array([prod.get("date") or "" for prod in productions], dtype=object)
+    quantity = columns["quantity"].astype(np.float64) if productions else np.zeros(0)
+    m2 = columns["m2"] if productions else np.zeros(0)
+    total_cost = material_cost + masura_cost
+
+    sku_keys = [tuple(prod.get(field, "") for field in SKU_FIELDS) for prod in productions]
+    sku_codes, sku_uniques = pd.factorize(pd.Series(sku_keys, dtype=object), use_na_sentinel=False)
+    sku_count = len(sku_uniques)
+    sku_order = sorted(range(sku_count), key=lambda g: tuple(str(part) for part in sku_uniques[g]))
+
+    # Senaryo kapsamı (senaryo × satır) ve SKU toplamları (SKU × senaryo)
+    masks = np.array([_in_range(dates, scenario) for scenario in scenarios[1:]], dtype=bool).reshape(len(scenarios) - 1, len(productions))
+    weights = masks.astype(np.float64)
+    sku_quantity = np.zeros((sku_count, len(scenarios) - 1))
+    sku_base = np.zeros((sku_count, len(scenarios) - 1))
+    sku_simulated = np.zeros((sku_count, len(scenarios) - 1))
+    np.add.at(sku_quantity, sku_codes, (weights * quantity).T)
+    np.add.at(sku_base, sku_codes, (weights * total_cost[0]).T)
+    np.add.at(sku_simulated, sku_codes, (weights * total_cost[1:]).T)
+
+    base_material = weights @ material_cost[0]
+    base_masura = weights @ masura_cost[0]
+    sim_material = (weights * material_cost[1:]).sum(axis=1)
+    sim_masura = (weights * masura_cost[1:]).sum(axis=1)
+    scenario_quantity = weights @ quantity
+    scenario_m2 = weights @ m2
+
+    results = []
+    for s, scenario in enumerate(scenarios[1:]):
+        baseline = _totals(base_material[s], base_masura[s], scenario_quantity[s])
+        simulated = _totals(sim_material[s], sim_masura[s], scenario_quantity[s])
+        base_total = base_material[s] + base_masura[s]
+        delta = sim_material[s] + sim_masura[s] - base_total
+
+        skus = []
+        for g in sku_order:
+            sku_qty = sku_quantity[g, s]
+            if sku_qty <= 0:
+                continue
+            base_unit = sku_base[g, s] / sku_qty
+            sim_unit = sku_simulated[g, s] / sku_qty
+            skus.append({
+                **dict(zip(SKU_FIELDS, sku_uniques[g])),
+                "quantity": int(sku_qty),
+                "baselineUnitCost": round(base_unit, 2),
+                "simulatedUnitCost": round(sim_unit, 2),
+                "unitCostDelta": round(sim_unit - base_unit, 2),
+            })
+
+        results.append({
+            "name": scenario.get("name"),
+            "dateFrom": scenario.get("dateFrom"),
+            "dateTo": scenario.get("dateTo"),
+            "rows": int(masks[s].sum()),
+            "quantity": int(scenario_quantity[s]),
+            "m2": round(float(scenario_m2[s]), 2),
+            "baseline": baseline,
+            "simulated": simulated,
+            "totalCostDelta": round(delta, 2),
+            "totalCostDeltaPercent": round(delta / base_total * 100, 2) if base_total else 0,
+            "skus": skus,
+        })
+    return results
+
+
+async def simulate(db, scenarios):
+    """Senaryoları kayıtlı maliyet bölümleri üzerinde değerlendir (veri değişmez)"""
+    scenarios = [normalize_scenario(scenario) for scenario in scenarios]
+
+    # Tüm senaryoları kapsayan tarih aralığındaki bölümler bir kez okunur
+    date_from = None if any(not s.get("dateFrom") for s in scenarios) else min(s["dateFrom"] for s in scenarios)
+    date_to = None if any(not s.get("dateTo") for s in scenarios) else max(s["dateTo"] for s in scenarios)
+    productions, columns = await cost_partitions.load_columns(
+        db, cost_partitions.date_range_query(date_from, date_to)
+    )
+    materials = await db.materials.find({}, {"_id": 0}).to_list(None)
+    history = await exchange_rate_history.load(db)
+
+    # İlk senaryo mevcut durumdur (değişiklik yok)
+    evaluated = [normalize_scenario({})] + scenarios
+    if productions:
+        material_cost, masura_cost = evaluate(productions, columns, materials, history, evaluated)
+    else:
+        material_cost = masura_cost = np.zeros((len(evaluated), 0))
+    return summarize(productions, columns, material_cost, masura_cost, evaluated)
@@ -0,0 +1,79 @@
+"""
+Yazma işlemlerinden türetilen durumların tek giriş noktası
+API'deki her ekleme/güncelleme/silme işlemi değişikliği buraya bildirir;
+stok defteri, maliyet bölümleri gibi türetilmiş koleksiyonlar ve koleksiyon
+sürüm sayaçları buradan güncellenir. Sürüm sayaçları en son artırılır; böylece
+yeni sürümü gören bir okuma türetilmiş durumun da güncel halini görür.
+
+Türetilmiş durumlar yazma kaydedildikten sonra güncellenir; bu yüzden sayı olarak
+okunan alanlar (NUMERIC_FIELDS) yazmadan önce coerce_numbers ile sayıya çevrilir.
+"""
+import math
+
+import collection_versions
+import cost_partitions
+import stock_checkpoints
+import stock_ledger
+
+
+# Stok defteri ve maliyet bölümlerinin sayı olarak okuduğu alanlar (üretimler
+# ProductionCreate ile doğrulanır)
+NUMERIC_FIELDS = {
+    "cut_products": {"quantity": int},
+    "shipments": {"quantity": int, "m2": float},
+    "materials": {"quantity": float, "unitPrice": float},
+    "daily_consumption": {"petkim": float, "estol": float, "talk": float, "gaz": float},
+}
+
+
+def coerce_numbers(collection, data):
+    """
+    data'daki sayısal alanları yerinde sayıya çevir: boş değer 0, "5,5" 5.5 olur.
+    Sayıya çevrilemeyen değerde ValueError.
+    """
+    for field, kind in NUMERIC_FIELDS.get(collection, {}).items():
+        if field not in data:
+            continue
+        value = data[field]
+        if value is None or (isinstance(value, str) and not value.strip()):
+            data[field] = kind(0)
+            continue
+        try:
+            number = float(value.strip().replace(",", ".") if isinstance(value, str) else value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{field} sayısal olmalı")
+        if not math.isfinite(number):
+            raise ValueError(f"{field} sayısal olmalı")
+        if kind is int and not number.is_integer():
+            raise ValueError(f"{field} tam sayı olmalı")
+        data[field] = kind(number)
+    return data
+
+
+async def record_changes(db, collection, changes):
+    """changes: [(eski_belge, yeni_belge), ...] - ekleme için eski, silme için yeni None"""
+    if not changes:
+        return
+    await stock_ledger.apply_changes(db, collection, changes)
+    await stock_checkpoints.apply_changes(db, collection, changes)
+    await cost_partitions.apply_changes(db, collection, changes)
+    await collection_versions.bump(db, collection)
+
+
+async def record_change(db, collection, before=None, after=None):
+    await record_changes(db, collection, [(before, after)])
+
+
+async def rebuild(db, collection):
+    """
+    Koleksiyon toptan değiştirildiğinde (içe aktarmada renameCollection ile) türetilmiş
+    durumları sıfırdan hesapla; değişiklik listesi olmadığından artımlı güncelleme yapılamaz
+    """
+    if collection in stock_ledger.TRACKED_COLLECTIONS:
+        await stock_ledger.rebuild(db)
+        await stock_checkpoints.invalidate_from(db, "")
+    if collection in cost_partitions.ALLOCATION_SOURCES:
+        await cost_partitions.rebuild(db)
+    elif collection in cost_partitions.PRICE_SOURCES:
+        await cost_partitions.reprice_stale(db)
+    await collection_versions.bump(db, collection)
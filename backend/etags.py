@@ -0,0 +1,44 @@
+"""
+Koleksiyon sürüm sayaçlarından türetilen ETag'ler (koşullu GET)
+Okuma uç noktasının ETag'i; yol, sorgu parametreleri, Accept başlığı ve bağımlı
+koleksiyonların sürüm sayaçlarından hesaplanır. İstemci aynı değeri
+If-None-Match ile gönderirse sorgu veya hesaplama yapılmadan 304 döner; yalnızca
+sürüm sayaçları okunur.
+"""
+import hashlib
+
+from fastapi import HTTPException
+
+import collection_versions
+
+
+def compute_etag(request, versions):
+    parts = [
+        request.url.path,
+        str(request.url.query),
+        request.headers.get("accept", ""),
+        ",".join(str(version) for version in versions),
+    ]
+    digest = hashlib.sha1("|".join(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _matches(if_none_match, etag):
+    """If-None-Match değerlerinden biri ETag ile (zayıf karşılaştırmayla) eşleşiyor mu"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    if "*" in candidates:
+        return True
+    bare = etag.removeprefix("W/")
+    return any(candidate.removeprefix("W/") == bare for candidate in candidates)
+
+
+async def check(db, collections, request, response):
+    """İstemcideki kopya güncelse 304, değilse yanıta ETag ekle"""
+    versions = await collection_versions.get_versions(db, collections)
+    etag = compute_etag(request, versions)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
@@ -0,0 +1,251 @@
+"""
+Excel görüntüleyici için çalışma kitabı okuma ve önbellek
+Çalışma kitabı bir kez ayrıştırılır; sonuç süreç içinde dosyanın (mtime, boyut)
+bilgisiyle, diskte ise içerik özeti (sha256) ile saklanır:
+
+- Dosya değişmediyse (mtime ve boyut aynı) sayfalar bellekten döner; JSON gövdesi
+  de bir kez üretilip saklanır.
+- Değiştiyse içerik özeti hesaplanır; bu özet için Parquet yan dosyaları
+  (EXCEL_CACHE_DIR/<özet>/) varsa Excel yeniden ayrıştırılmaz. Sunucu yeniden
+  başlasa da yalnızca Parquet dosyaları okunur.
+
+Sütunlar tiplenir (integer, number, boolean, date, text); NaN değerler null,
+tarihler ISO metni olarak döner. Görüntüleyici sayfa listesini (metadata) ve
+sayfa satırlarını pencereler halinde (offset / limit, isteğe bağlı arama) ister;
+pencereler önbellekteki sütunlu kopyadan kesilir, tüm kitap JSON'a çevrilmez.
+Ayrıştırma CPU yoğun olduğundan load_sheets worker_pools.excel_pool'da
+(varsayılan olarak ayrı süreçte) çalıştırılır. Arama metni bu süreçte saklanır;
+arama ayrı sürece sayfa kopyalanmasın diye iş parçacığında (asyncio.to_thread)
+yapılır.
+pyarrow kurulu değilse yan dosyalar yazılmaz, yalnızca bellek önbelleği kullanılır.
+"""
+import asyncio
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import orjson
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (Parquet yan dosyaları için)
+except ImportError:
+    pyarrow = None
+
+EXCEL_FILE = "/tmp/SAR-2025-Original.xlsx"
+DOWNLOAD_NAME = "SAR-2025.xlsx"
+CACHE_DIR = Path(os.environ.get("EXCEL_CACHE_DIR", "/tmp/excel-viewer-cache"))
+MANIFEST = "sheets.json"
+
+
+def content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _clean_column(series):
+    """Sütunu JSON'a uygun tipe çevir: (sütun, tip)"""
+    if pd.api.types.is_bool_dtype(series):
+        return series.astype("boolean"), "boolean"
+    if pd.api.types.is_integer_dtype(series):
+        return series.astype("Int64"), "integer"
+    if pd.api.types.is_float_dtype(series):
+        values = series.dropna()
+        # Boş hücre yüzünden float okunmuş tam sayı sütunları
+        if len(values) and np.all(np.mod(values, 1) == 0):
+            return series.astype("Int64"), "integer"
+        return series, "number"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.dropna()
+        has_time = bool(len(values)) and bool((values != values.dt.normalize()).any())
+        text = series.dt.strftime("%Y-%m-%dT%H:%M:%S" if has_time else "%Y-%m-%d")
+        return text.astype("string"), "date"
+    # Karışık / metin sütunları metin olarak saklanır
+    return series.map(lambda value: None if pd.isna(value) else str(value)).astype("string"), "text"
+
+
+def _clean_frame(df):
+    columns = [str(column) for column in df.columns]
+    cleaned = {}
+    types = []
+    for position, column in enumerate(columns):
+        cleaned[column], column_type = _clean_column(df.iloc[:, position])
+        types.append(column_type)
+    return pd.DataFrame(cleaned, columns=columns), types
+
+
+def _sidecar_dir(digest):
+    return CACHE_DIR / digest
+
+
+def _read_sidecars(digest):
+    directory = _sidecar_dir(digest)
+    manifest = directory / MANIFEST
+    if pyarrow is None or not manifest.exists():
+        return None
+    try:
+        entries = json.loads(manifest.read_text())
+        return [
+            {"name": entry["name"], "types": entry["types"],
+             "frame": pd.read_parquet(directory / entry["file"])}
+            for entry in entries
+        ]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_sidecars(digest, sheets):
+    if pyarrow is None:
+        return
+    directory = _sidecar_dir(digest)
+    tmp = directory.with_name(f"{digest}.tmp{os.getpid()}")
+    tmp.mkdir(parents=True, exist_ok=True)
+    entries = []
+    for index, sheet in enumerate(sheets):
+        file = f"{index}.parquet"
+        sheet["frame"].to_parquet(tmp / file, index=False)
+        entries.append({"name": sheet["name"], "types": sheet["types"], "file": file})
+    (tmp / MANIFEST).write_text(json.dumps(entries, ensure_ascii=False))
+    try:
+        tmp.rename(directory)
+    except OSError:
+        # Başka bir süreç aynı özeti önce yazdı
+        for file in tmp.iterdir():
+            file.unlink()
+        tmp.rmdir()
+
+
+def load_sheets(path=EXCEL_FILE):
+    """
+    (içerik özeti, [{name, types, frame}]) - Parquet yan dosyaları varsa onlardan,
+    yoksa Excel'den okunur ve yan dosyalar yazılır.
+    """
+    digest = content_hash(path)
+    sheets = _read_sidecars(digest)
+    if sheets is None:
+        sheets = []
+        with pd.ExcelFile(path) as xls:
+            for sheet_name in xls.sheet_names:
+                frame, types = _clean_frame(pd.read_excel(xls, sheet_name=sheet_name))
+                sheets.append({"name": sheet_name, "types": types, "frame": frame})
+        _write_sidecars(digest, sheets)
+    return digest, sheets
+
+
+def rows(frame):
+    """DataFrame satırları (eksik değerler None)"""
+    return frame.astype(object).where(frame.notna(), None).values.tolist()
+
+
+def search_text(frame):
+    """Arama için satır başına küçük harfli birleşik metin"""
+    text = pd.Series([""] * len(frame), index=frame.index, dtype=object)
+    for column in frame.columns:
+        text = text + "\t" + frame[column].astype("string").fillna("").astype(str).str.casefold()
+    return text
+
+
+def matching_positions(text, q):
+    """q'nun geçtiği satırların sıraları (büyük/küçük harf duyarsız)"""
+    return np.flatnonzero(text.str.contains(q.casefold(), regex=False).to_numpy())
+
+
+def _broken_rows(frame):
+    """İlk hücresi 0 olan (bozuk veri) satır sayısı"""
+    if frame.shape[1] == 0:
+        return 0
+    first = frame.iloc[:, 0].astype(object)
+    return int(first.isin([0, "0"]).sum())
+
+
+class Workbook:
+    """Ayrıştırılmış çalışma kitabı; tam JSON gövdesi ilk istekte üretilir"""
+
+    def __init__(self, digest, sheets):
+        self.digest = digest
+        self.sheets = sheets
+        self._body = None
+        self._search_text = {}
+
+    def metadata(self):
+        """Sayfa adları, sütunlar, tipler ve satır sayıları (satırlar olmadan)"""
+        return {
+            "filename": DOWNLOAD_NAME,
+            "sheets": [
+                {"name": sheet["name"], "columns": list(sheet["frame"].columns), "types": sheet["types"],
+                 "rowCount": len(sheet["frame"]), "brokenRows": _broken_rows(sheet["frame"])}
+                for sheet in self.sheets
+            ],
+        }
+
+    def sheet(self, name):
+        return next((sheet for sheet in self.sheets if sheet["name"] == name), None)
+
+    async def search(self, sheet, q):
+        """
+        Herhangi bir hücresinde q geçen satırların sıraları; arama metni ilk aramada
+        üretilip saklanır. Üretim ve tarama olay döngüsü dışında, iş parçacığında yapılır.
+        """
+        text = self._search_text.get(sheet["name"])
+        if text is None:
+            text = await asyncio.to_thread(search_text, sheet["frame"])
+            self._search_text[sheet["name"]] = text
+        return await asyncio.to_thread(matching_positions, text, q)
+
+    def window(self, sheet, offset=0, limit=100, positions=None):
+        """
+        Sayfanın offset'ten başlayan en fazla limit satırı; positions verilirse
+        (arama sonucu) yalnızca o satırlar.
+        """
+        frame = sheet["frame"]
+        if positions is None:
+            positions = np.arange(len(frame))
+        selected = positions[offset:offset + limit]
+        return {
+            "name": sheet["name"],
+            "columns": list(frame.columns),
+            "types": sheet["types"],
+            "total": len(positions),
+            "offset": offset,
+            "limit": limit,
+            # Satır numaraları (1'den başlar) arama sonuçlarında da asıl sırayı gösterir
+            "rowNumbers": (selected + 1).tolist(),
+            "rows": rows(frame.iloc[selected]),
+        }
+
+    def body(self):
+        if self._body is None:
+            self._body = orjson.dumps({
+                "sheets": [
+                    {"name": sheet["name"], "columns": list(sheet["frame"].columns),
+                     "types": sheet["types"], "data": rows(sheet["frame"])}
+                    for sheet in self.sheets
+                ],
+                "filename": DOWNLOAD_NAME,
+            })
+        return self._body
+
+
+_cache = {"stat": None, "workbook": None}
+# Aynı anda gelen istekler dosyayı bir kez yükler
+_load_lock = asyncio.Lock()
+
+
+async def get_workbook(pool, path=EXCEL_FILE):
+    """Önbellekteki çalışma kitabı; dosya değiştiyse havuzda yeniden yüklenir"""
+    async with _load_lock:
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        if _cache["workbook"] is not None and _cache["stat"] == key:
+            return _cache["workbook"]
+        digest, sheets = await pool.run(load_sheets, path)
+        workbook = _cache["workbook"]
+        if workbook is None or workbook.digest != digest:
+            workbook = Workbook(digest, sheets)
+        _cache.update(stat=key, workbook=workbook)
+        return workbook
@@ -0,0 +1,98 @@
+"""
+Döviz kuru geçmişi (exchange_rate_history)
+Her kur girişi geçerlilik tarihiyle birlikte eklenir, hiçbir kayıt değiştirilmez.
+Bir tarihteki kur, o tarihte veya öncesinde geçerli olan son giriştir; ilk
+girişten önceki tarihler için ilk giriş kullanılır.
+
+Geçmiş süreç içinde tarih sıralı bir dizide tutulur ve tarih araması bisect ile
+yapılır; dizi exchange_rates sürüm sayacı değişince yeniden okunur. Güncel kur
+(son geçerlilik tarihli giriş) ayrıca exchange_rates belgesinde tutulur.
+"""
+from bisect import bisect_right
+from datetime import date, datetime, timezone
+
+import collection_versions
+
+HISTORY_COLLECTION = "exchange_rate_history"
+
+# Geçmiş exchange_rates sürüm sayacına bağlıdır (kur yazmaları bu sayacı artırır)
+VERSION_KEY = "exchange_rates"
+
+
+class RateHistory:
+    """Tarih sıralı kur geçmişi"""
+
+    def __init__(self, entries):
+        self.dates = [entry["date"] for entry in entries]
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def index_on(self, day):
+        """day tarihinde geçerli girişin sırası (geçmiş boşsa None)"""
+        if not self.entries:
+            return None
+        return max(bisect_right(self.dates, day) - 1, 0)
+
+    def rate_on(self, day):
+        """day tarihinde geçerli kur ({date, usd, eur}) veya geçmiş boşsa None"""
+        index = self.index_on(day)
+        return None if index is None else self.entries[index]
+
+
+_cache = {"version": None, "history": None}
+
+
+def _entry(doc):
+    return {"date": doc["date"], "usd": float(doc.get("usd", 1)), "eur": float(doc.get("eur", 1))}
+
+
+async def _seed(db):
+    """Geçmiş boşsa mevcut exchange_rates belgesini ilk giriş olarak ekle"""
+    current = await db.exchange_rates.find_one({}, {"_id": 0})
+    if not current:
+        return
+    day = current.get("date") or (current.get("lastUpdated") or "")[:10] or date.today().isoformat()
+    await db[HISTORY_COLLECTION].update_one(
+        {"_id": "initial"},
+        {"$setOnInsert": {"date": day, "usd": current.get("usd", 1), "eur": current.get("eur", 1), "createdAt": ""}},
+        upsert=True,
+    )
+
+
+async def load(db):
+    """Kur geçmişi; sürüm sayacı değişmediyse süreç içindeki kopya döner"""
+    (version,) = await collection_versions.get_versions(db, [VERSION_KEY])
+    if _cache["history"] is not None and _cache["version"] == version:
+        return _cache["history"]
+
+    docs = await db[HISTORY_COLLECTION].find({}).sort([("date", 1), ("createdAt", 1)]).to_list(None)
+    if not docs:
+        await _seed(db)
+        docs = await db[HISTORY_COLLECTION].find({}).sort([("date", 1), ("createdAt", 1)]).to_list(None)
+
+    # Aynı tarihte birden fazla giriş varsa son girilen geçerlidir
+    by_date = {}
+    for doc in docs:
+        by_date[doc["date"]] = _entry(doc)
+    history = RateHistory(list(by_date.values()))
+    _cache.update(version=version, history=history)
+    return history
+
+
+async def append(db, usd, eur, day):
+    """
+    Geçmişe yeni giriş ekle. Giriş en güncel tarihliyse exchange_rates belgesi
+    (güncel kur) de güncellenir. (eski, yeni) güncel kur belgesi döner.
+    """
+    await load(db)  # Eski kayıtlar ilk girişten önce geçmişe aktarılır
+    now = datetime.now(timezone.utc).isoformat()
+    await db[HISTORY_COLLECTION].insert_one({"date": day, "usd": usd, "eur": eur, "createdAt": now})
+
+    current = await db.exchange_rates.find_one({}, {"_id": 0})
+    if current and current.get("date", "") > day:
+        return current, current
+    data = {"usd": usd, "eur": eur, "date": day, "lastUpdated": now}
+    await db.exchange_rates.update_one({}, {"$set": data}, upsert=True)
+    return current, data
@@ -0,0 +1,207 @@
+"""
+Koleksiyonların ve hesaplanan raporların XLSX / CSV olarak dışa aktarımı
+/api/export/{kaynak}.xlsx ve /api/export/{kaynak}.csv uç noktaları için satırlar
+MongoDB imlecinden (stok için aggregation imlecinden, maliyet analizi için
+bölümlerden gün gün) okunur; liste bellekte toplanmaz.
+
+- CSV: satırlar okundukça CHUNK_SIZE'lık parçalar halinde gönderilir.
+- XLSX: openpyxl write-only modunda satırlar çalışma sayfasının geçici XML
+  dosyasına eklenir; kitap diske (geçici dosya) kaydedilip istemciye parça parça
+  okunarak gönderilir. XLSX bir zip dosyası olduğundan gönderim kitap
+  kapandıktan sonra başlar, ama bellek kullanımı satır sayısıyla büyümez.
+
+Sayfa adları ve sütun başlıkları SAR-2025-Veriler.xlsx ile aynıdır; dışa aktarılan
+dosya import_excel_data.py ile yeniden içe aktarılabilir.
+"""
+import asyncio
+import csv
+import io
+import json
+import tempfile
+
+import openpyxl
+
+import cost_partitions
+from stock_pipeline import stock_pipeline
+
+XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV = "text/csv; charset=utf-8"
+FORMATS = {"xlsx": XLSX, "csv": CSV}
+
+# Her parçada işlenen satır sayısı ve XLSX dosyasından okunan blok boyutu
+CHUNK_SIZE = 500
+FILE_CHUNK_SIZE = 64 * 1024
+
+# Sütun: (başlık, alan) - alan bir demet ise ilk dolu alan kullanılır
+EXPORTS = {
+    "productions": {
+        "sheet": "Üretim Kayıtları",
+        "filename": "uretim-kayitlari",
+        "collection": "productions",
+        "columns": (
+            ("Tarih", "date"), ("Makine", "machine"), ("Kalınlık", "thickness"), ("En", "width"),
+            ("Uzunluk", "length"), ("M²", "m2"), ("Adet", "quantity"), ("Masura Tipi", "masuraType"),
+            ("Renk", "color"), ("Renk Kategorisi", "colorCategory"),
+        ),
+    },
+    "cut-products": {
+        "sheet": "Kesilmiş Ürünler",
+        "filename": "kesilmis-urunler",
+        "collection": "cut_products",
+        "columns": (
+            ("Tarih", "date"), ("Malzeme", ("originalMaterial", "material")), ("Kesim Boyutu", "cutSize"),
+            ("Adet", "quantity"), ("Kullanılan Malzeme", "usedMaterial"), ("Renk", "color"),
+        ),
+    },
+    "shipments": {
+        "sheet": "Sevkiyatlar",
+        "filename": "sevkiyatlar",
+        "collection": "shipments",
+        "columns": (
+            ("Tarih", "date"), ("Müşteri", "customer"), ("Tip", "type"), ("Boyut", "size"), ("M²", "m2"),
+            ("Adet", "quantity"), ("Renk", "color"), ("İrsaliye No", ("waybillNo", "waybill")),
+        ),
+    },
+    "materials": {
+        "sheet": "Hammadde",
+        "filename": "hammadde-kayitlari",
+        "collection": "materials",
+        "columns": (
+            ("Tarih", "date"), ("Hammadde", "material"), ("Giriş Tipi", "entryType"), ("Miktar", "quantity"),
+            ("Birim", "unit"), ("Birim Fiyat", "unitPrice"), ("Para Birimi", "currency"),
+            ("Toplam (TL)", "totalPrice"), ("Kur", "exchangeRate"), ("Tedarikçi", "supplier"),
+        ),
+    },
+    "daily-consumption": {
+        "sheet": "Günlük Tüketim",
+        "filename": "gunluk-tuketim",
+        "collection": "daily_consumption",
+        "columns": (
+            ("Tarih", "date"), ("Makine", "machine"), ("PETKİM (kg)", "petkim"), ("ESTOL (kg)", "estol"),
+            ("TALK (kg)", "talk"), ("GAZ (kg)", "gaz"), ("FİRE (kg)", "fire"),
+        ),
+    },
+    "stock": {
+        "sheet": "Stok",
+        "filename": "stok",
+        "columns": (
+            ("Ürün Tipi", "type"), ("Kalınlık (mm)", "thickness"), ("En (cm)", "width"),
+            ("Metre / Boy", "length"), ("Renk", "color"), ("Renk Kategorisi", "colorCategory"),
+            ("Toplam m²", "m2"), ("Toplam Adet", "quantity"),
+        ),
+    },
+    "cost-analysis": {
+        "sheet": "Maliyet Analizi",
+        "filename": "maliyet-analizi",
+        "columns": (
+            ("Tarih", "date"), ("Makine", "machine"), ("Kalınlık", "thickness"), ("En", "width"),
+            ("Uzunluk", "length"), ("M²", "m2"), ("Adet", "quantity"), ("Masura Tipi", "masuraType"),
+            ("Renk", "color"), ("PETKİM (kg)", "petkim"), ("ESTOL (kg)", "estol"), ("TALK (kg)", "talk"),
+            ("GAZ (kg)", "gaz"), ("Hammadde Maliyeti (TL)", "materialCost"),
+            ("Masura Maliyeti (TL)", "masuraCost"), ("Toplam Maliyet (TL)", "totalCost"),
+            ("Birim Maliyet (TL)", "unitCost"), ("M² Maliyeti (TL)", "m2Cost"),
+        ),
+    },
+}
+
+# Dışa aktarımın ETag'i için izlenen koleksiyonlar
+SOURCE_COLLECTIONS = {
+    "stock": ("productions", "shipments", "cut_products"),
+    "cost-analysis": ("productions", "materials", "daily_consumption", "exchange_rates"),
+}
+
+
+def source_collections(resource):
+    return SOURCE_COLLECTIONS.get(resource) or (EXPORTS[resource]["collection"],)
+
+
+def filename(resource, fmt):
+    return f'{EXPORTS[resource]["filename"]}.{fmt}'
+
+
+async def documents(db, resource, date_from=None, date_to=None):
+    """Kaynağın satırları (tarih artan); tarih aralığı stok dışındaki kaynaklara uygulanır"""
+    spec = EXPORTS[resource]
+    query = cost_partitions.date_range_query(date_from, date_to)
+    if resource == "stock":
+        source = db.productions.aggregate(stock_pipeline())
+    elif resource == "cost-analysis":
+        source = cost_partitions.iter_rows(db, query, descending=False)
+    else:
+        source = (
+            db[spec["collection"]].find(query, {"_id": 0})
+            .sort([("date", 1), ("id", 1)])
+            .batch_size(CHUNK_SIZE)
+        )
+    async for doc in source:
+        yield doc
+
+
+def _cell(doc, field):
+    if isinstance(field, tuple):
+        value = next((doc.get(name) for name in field if doc.get(name) not in (None, "")), None)
+    else:
+        value = doc.get(field)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+
+def _row(doc, columns):
+    return [_cell(doc, field) for _, field in columns]
+
+
+async def csv_chunks(docs, resource):
+    """Başlık satırı ve CHUNK_SIZE'lık satır parçaları (Excel için BOM ile)"""
+    columns = EXPORTS[resource]["columns"]
+    buffer = io.StringIO()
+    buffer.write("\ufeff")
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _ in columns])
+    count = 0
+    async for doc in docs:
+        writer.writerow(["" if value is None else value for value in _row(doc, columns)])
+        count += 1
+        if count % CHUNK_SIZE == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _append_rows(sheet, rows):
+    for row in rows:
+        sheet.append(row)
+
+
+async def xlsx_chunks(docs, resource):
+    """write-only çalışma kitabını geçici dosyada oluştur, dosyayı parça parça oku"""
+    spec = EXPORTS[resource]
+    columns = spec["columns"]
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(spec["sheet"])
+    sheet.append([header for header, _ in columns])
+
+    # openpyxl çağrıları CPU yoğun; olay döngüsü bloklanmasın diye iş parçacığında
+    batch = []
+    async for doc in docs:
+        batch.append(_row(doc, columns))
+        if len(batch) >= CHUNK_SIZE:
+            await asyncio.to_thread(_append_rows, sheet, batch)
+            batch = []
+    if batch:
+        await asyncio.to_thread(_append_rows, sheet, batch)
+
+    with tempfile.TemporaryFile() as file:
+        await asyncio.to_thread(workbook.save, file)
+        file.seek(0)
+        while True:
+            chunk = await asyncio.to_thread(file.read, FILE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def chunks(db, resource, fmt, date_from=None, date_to=None):
+    docs = documents(db, resource, date_from, date_to)
+    return xlsx_chunks(docs, resource) if fmt == "xlsx" else csv_chunks(docs, resource)
@@ -0,0 +1,160 @@
+"""
+Yazma istekleri için Idempotency-Key desteği (ASGI ara katmanı)
+İstemci POST/PUT/PATCH/DELETE isteğine Idempotency-Key başlığı eklerse ilk yanıt
+(durum kodu, başlıklar, gövde) idempotency_keys koleksiyonunda saklanır. Aynı
+anahtarla gelen tekrar istekte yazma yeniden çalıştırılmaz; saklanan yanıt tek bir
+_id okumasıyla döner (Idempotent-Replayed: true başlığıyla).
+
+- Anahtar ilk istek işlenirken "işleniyor" olarak kaydedilir; bu sırada gelen
+  tekrar 409 alır.
+- Anahtarlar çağırana göre ayrılır: kayıt kimliği Authorization başlığının ve
+  anahtarın özetidir. Başka bir oturum aynı anahtarla saklanan yanıtı alamaz.
+- Aynı anahtar farklı bir istekle (yöntem, yol, gövde) kullanılırsa 422 döner.
+- 5xx ve yetki / çakışma / hız sınırı yanıtlarında (401, 403, 409, 429) veya hata
+  durumunda kayıt silinir; istemci (örneğin yeniden giriş yaptıktan sonra) tekrar
+  deneyebilir.
+- Giriş isteği (SKIPPED_PATHS) saklanmaz; oturum anahtarları veritabanına yazılmaz.
+- Kayıtlar TTL indeksiyle KEY_TTL_SECONDS sonra silinir (indexes.py).
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from pymongo.errors import DuplicateKeyError
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+KEYS_COLLECTION = "idempotency_keys"
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Saklanan yanıtların ömrü (saniye)
+KEY_TTL_SECONDS = 24 * 60 * 60
+MAX_KEY_LENGTH = 255
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Yanıtı saklanmayan yollar ve durum kodları
+SKIPPED_PATHS = {"/api/auth/login"}
+NOT_STORED_STATUSES = {401, 403, 409, 429}
+
+
+def _stored_id(scope, key):
+    """Kayıt kimliği: çağıranın Authorization başlığı ve anahtarın özeti"""
+    authorization = Headers(scope=scope).get("authorization", "")
+    digest = hashlib.sha256(authorization.encode())
+    digest.update(b"\0")
+    digest.update(key.encode())
+    return digest.hexdigest()
+
+
+def _fingerprint(scope, body):
+    digest = hashlib.sha256()
+    for part in (scope["method"], scope["path"], scope.get("query_string", b"").decode()):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+def _error(status_code, detail):
+    return JSONResponse({"detail": detail}, status_code=status_code)
+
+
+async def _replay(stored, send):
+    headers = [(bytes(name), bytes(value)) for name, value in stored["headers"]]
+    headers.append((REPLAYED_HEADER.lower().encode(), b"true"))
+    await send({"type": "http.response.start", "status": stored["status"], "headers": headers})
+    await send({"type": "http.response.body", "body": bytes(stored["body"])})
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app, db):
+        self.app = app
+        self.db = db
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS or scope["path"] in SKIPPED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        key = Headers(scope=scope).get(HEADER)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _error(400, f"{HEADER} 1-{MAX_KEY_LENGTH} karakter olmalı")(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        fingerprint = _fingerprint(scope, body)
+        key = _stored_id(scope, key)
+        keys = self.db[KEYS_COLLECTION]
+        try:
+            await keys.insert_one({
+                "_id": key,
+                "fingerprint": fingerprint,
+                "response": None,
+                "createdAt": datetime.now(timezone.utc),
+            })
+        except DuplicateKeyError:
+            stored = await keys.find_one({"_id": key})
+            if stored is None:
+                # Kayıt bu arada silindi (süresi doldu / ilk istek başarısız oldu)
+                await _error(409, "İstek işleniyor, tekrar deneyin")(scope, receive, send)
+            elif stored["fingerprint"] != fingerprint:
+                await _error(422, f"{HEADER} başka bir istek için kullanılmış")(scope, receive, send)
+            elif stored["response"] is None:
+                await _error(409, "Aynı anahtarlı istek hâlâ işleniyor")(scope, receive, send)
+            else:
+                await _replay(stored["response"], send)
+            return
+
+        await self._execute(scope, body, receive, send, key)
+
+    async def _execute(self, scope, body, receive, send, key):
+        """İsteği uygulamaya ilet; yanıtı istemciye gönderirken kaydet"""
+        consumed = False
+
+        async def replay_receive():
+            nonlocal consumed
+            if not consumed:
+                consumed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        response = {"status": None, "headers": [], "body": []}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [list(header) for header in message.get("headers", [])]
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        keys = self.db[KEYS_COLLECTION]
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await keys.delete_one({"_id": key})
+            raise
+
+        if response["status"] is None or response["status"] >= 500 or response["status"] in NOT_STORED_STATUSES:
+            await keys.delete_one({"_id": key})
+            return
+        await keys.update_one({"_id": key}, {"$set": {"response": {
+            "status": response["status"],
+            "headers": response["headers"],
+            "body": b"".join(response["body"]),
+        }}})
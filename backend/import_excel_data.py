@@ -1,16 +1,31 @@
 """
 Excel dosyasından tüm verileri okuyup MongoDB'ye yükle
 SAR-2025-Veriler.xlsx dosyasındaki tüm sheet'leri ve verileri içe aktar
+
+Sayfalar ayrı süreçlerde aynı anda okunur; tip dönüşümü, varsayılan değerler ve
+tarih biçimi satır satır değil sütun bazında yapılır. Belgeler
+INSERT_CHUNK_SIZE'lık parçalar halinde hazırlık koleksiyonuna yazılır ve canlı
+verilere yalnızca farklar uygulanır (staged_import.py).
+
+Kullanım:
+    python import_excel_data.py          # Değişen kayıtları uygula
+    python import_excel_data.py --swap   # Koleksiyonları toptan değiştir (renameCollection)
 """
 import pandas as pd
+import numpy as np
+import argparse
 import asyncio
+import itertools
+import uuid
+from concurrent.futures import ProcessPoolExecutor
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
 from pathlib import Path
-import uuid
 from datetime import datetime
 
+import staged_import
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
@@ -21,223 +36,195 @@ db = client[os.environ['DB_NAME']]
 
 EXCEL_FILE = "/app/SAR-2025-Veriler.xlsx"
 
-async def import_production_data():
-    """Üretim verilerini import et (Sheet: Üretim Kayıtları)"""
-    print("📊 Üretim verileri yükleniyor...")
-    
-    try:
-        # Excel'den oku - Sheet adı: "Üretim Kayıtları"
-        df = pd.read_excel(EXCEL_FILE, sheet_name="Üretim Kayıtları")
-        
-        print(f"   Sütunlar: {df.columns.tolist()}")
-        print(f"   Toplam satır: {len(df)}")
-        
-        productions = []
-        for index, row in df.iterrows():
-            try:
-                # Boş satırları atla
-                if pd.isna(row['Tarih']):
-                    continue
-                
-                # Tarih formatını düzenle
-                if isinstance(row['Tarih'], pd.Timestamp):
-                    date_str = row['Tarih'].strftime('%Y-%m-%d')
-                else:
-                    date_str = str(row['Tarih'])
-                
-                machine = str(row['Makine']) if not pd.isna(row['Makine']) else "Makine 1"
-                thickness = str(row['Kalınlık']) if not pd.isna(row['Kalınlık']) else "1 mm"
-                width = str(int(row['En'])) if not pd.isna(row['En']) else "100"
-                length = str(int(row['Uzunluk'])) if not pd.isna(row['Uzunluk']) else "300"
-                m2 = float(row['M²']) if not pd.isna(row['M²']) else 0.0
-                quantity = int(row['Adet']) if not pd.isna(row['Adet']) else 0
-                masura_type = str(row['Masura Tipi']) if not pd.isna(row['Masura Tipi']) else "Masura 100"
-                color = str(row['Renk']) if not pd.isna(row['Renk']) else "Doğal"
-                color_category = str(row['Renk Kategorisi']) if not pd.isna(row['Renk Kategorisi']) else "Doğal"
-                
-                prod = {
-                    "id": str(uuid.uuid4()),
-                    "date": date_str,
-                    "machine": machine,
-                    "thickness": thickness,
-                    "width": width,
-                    "length": length,
-                    "m2": m2,
-                    "quantity": quantity,
-                    "masuraType": masura_type,
-                    "color": color,
-                    "colorCategory": color_category,
-                    "created_at": datetime.utcnow().isoformat()
-                }
-                
-                productions.append(prod)
-                
-            except Exception as e:
-                print(f"   ⚠️ Satır {index} atlandı: {e}")
-                continue
-        
-        if productions:
-            # Mevcut verileri temizle
-            await db.productions.delete_many({})
-            # Yeni verileri ekle
-            await db.productions.insert_many(productions)
-            print(f"   ✅ {len(productions)} üretim kaydı yüklendi")
-        else:
-            print("   ⚠️ Üretim verisi bulunamadı")
-            
-    except Exception as e:
-        print(f"   ❌ Üretim verileri yüklenemedi: {e}")
-        import traceback
-        traceback.print_exc()
+# Belgelere tek seferde çevrilen satır sayısı
+INSERT_CHUNK_SIZE = staged_import.WRITE_CHUNK_SIZE
+
+
+# ===== Sütun dönüşümleri =====
+def _dates(series):
+    """Tarih sütunu: Excel tarihleri YYYY-MM-DD, diğer değerler olduğu gibi metin"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.strftime('%Y-%m-%d')
+    text = series.astype(str)
+    stamps = series.map(lambda value: isinstance(value, datetime)).astype(bool)
+    if stamps.any():
+        text[stamps] = pd.to_datetime(series[stamps]).dt.strftime('%Y-%m-%d')
+    return text
+
+
+def _text(df, column, default):
+    values = df[column]
+    return values.where(values.notna(), default).astype(str)
+
+
+def _numbers(df, column, default, invalid):
+    """Sayısal sütun; sayıya çevrilemeyen dolu hücrelerin satırları invalid'e eklenir"""
+    values = pd.to_numeric(df[column], errors='coerce')
+    invalid |= values.isna() & df[column].notna()
+    return values.fillna(default)
+
+
+def _integers(df, column, default, invalid):
+    """Tam sayı sütunu; kesirli değerli (5.5) satırlar da invalid'e eklenir"""
+    values = _numbers(df, column, default, invalid)
+    fractional = values != values.round()
+    invalid |= fractional
+    return values.where(~fractional, default).astype('int64')
+
+
+def _integer_text(df, column, default, invalid):
+    return _integers(df, column, default, invalid).astype(str)
 
-async def import_cut_products():
-    """Kesilmiş ürün verilerini import et (Sheet: Kesilmiş Ürünler)"""
-    print("\n✂️ Kesilmiş ürün verileri yükleniyor...")
-    
-    try:
-        df = pd.read_excel(EXCEL_FILE, sheet_name="Kesilmiş Ürünler")
-        
-        print(f"   Sütunlar: {df.columns.tolist()}")
-        print(f"   Toplam satır: {len(df)}")
-        
-        cut_products = []
-        for index, row in df.iterrows():
-            try:
-                # Boş satırları atla
-                if pd.isna(row['Tarih']):
-                    continue
-                    
-                if isinstance(row['Tarih'], pd.Timestamp):
-                    date_str = row['Tarih'].strftime('%Y-%m-%d')
-                else:
-                    date_str = str(row['Tarih'])
-                
-                original_material = str(row['Malzeme']) if not pd.isna(row['Malzeme']) else ""
-                cut_size = str(row['Kesim Boyutu']) if not pd.isna(row['Kesim Boyutu']) else ""
-                quantity = int(row['Adet']) if not pd.isna(row['Adet']) else 0
-                used_material = str(row['Kullanılan Malzeme']) if not pd.isna(row['Kullanılan Malzeme']) else ""
-                color = str(row['Renk']) if not pd.isna(row['Renk']) else "Doğal"
-                
-                cut_prod = {
-                    "id": str(uuid.uuid4()),
-                    "date": date_str,
-                    "originalMaterial": original_material,
-                    "cutSize": cut_size,
-                    "quantity": quantity,
-                    "usedMaterial": used_material,
-                    "color": color,
-                    "colorCategory": "Doğal" if color == "Doğal" else "Renkli"
-                }
-                
-                cut_products.append(cut_prod)
-                
-            except Exception as e:
-                print(f"   ⚠️ Satır {index} atlandı: {e}")
-                continue
-        
-        if cut_products:
-            await db.cut_products.delete_many({})
-            await db.cut_products.insert_many(cut_products)
-            print(f"   ✅ {len(cut_products)} kesilmiş ürün kaydı yüklendi")
-        else:
-            print("   ⚠️ Kesilmiş ürün verisi bulunamadı")
-            
-    except Exception as e:
-        print(f"   ❌ Kesilmiş ürün verileri yüklenemedi: {e}")
-        import traceback
-        traceback.print_exc()
 
-async def import_shipments():
-    """Sevkiyat verilerini import et (Sheet: Sevkiyatlar)"""
-    print("\n📦 Sevkiyat verileri yükleniyor...")
-    
+def _frame(df, columns, invalid):
+    """Boş tarihli ve dönüştürülemeyen satırlar atılır; (belgeler, atlanan satır numaraları)"""
+    frame = pd.DataFrame(columns)
+    skipped = df.index[invalid & df['Tarih'].notna()].tolist()
+    frame = frame[df['Tarih'].notna().to_numpy() & ~invalid.to_numpy()].reset_index(drop=True)
+    frame.insert(0, 'id', [str(uuid.uuid4()) for _ in range(len(frame))])
+    return frame, skipped
+
+
+def production_frame(df):
+    """Üretim Kayıtları sayfası -> productions belgeleri"""
+    invalid = pd.Series(False, index=df.index)
+    columns = {
+        "date": _dates(df['Tarih']),
+        "machine": _text(df, 'Makine', "Makine 1"),
+        "thickness": _text(df, 'Kalınlık', "1 mm"),
+        "width": _integer_text(df, 'En', 100, invalid),
+        "length": _integer_text(df, 'Uzunluk', 300, invalid),
+        "m2": _numbers(df, 'M²', 0.0, invalid).astype(float),
+        "quantity": _integers(df, 'Adet', 0, invalid),
+        "masuraType": _text(df, 'Masura Tipi', "Masura 100"),
+        "color": _text(df, 'Renk', "Doğal"),
+        "colorCategory": _text(df, 'Renk Kategorisi', "Doğal"),
+    }
+    frame, skipped = _frame(df, columns, invalid)
+    frame["created_at"] = datetime.utcnow().isoformat()
+    return frame, skipped
+
+
+def cut_product_frame(df):
+    """Kesilmiş Ürünler sayfası -> cut_products belgeleri"""
+    invalid = pd.Series(False, index=df.index)
+    color = _text(df, 'Renk', "Doğal")
+    columns = {
+        "date": _dates(df['Tarih']),
+        "originalMaterial": _text(df, 'Malzeme', ""),
+        "cutSize": _text(df, 'Kesim Boyutu', ""),
+        "quantity": _integers(df, 'Adet', 0, invalid),
+        "usedMaterial": _text(df, 'Kullanılan Malzeme', ""),
+        "color": color,
+        "colorCategory": np.where(color == "Doğal", "Doğal", "Renkli"),
+    }
+    return _frame(df, columns, invalid)
+
+
+def shipment_frame(df):
+    """Sevkiyatlar sayfası -> shipments belgeleri"""
+    invalid = pd.Series(False, index=df.index)
+    columns = {
+        "date": _dates(df['Tarih']),
+        "customer": _text(df, 'Müşteri', ""),
+        "type": _text(df, 'Tip', "Normal"),
+        "size": _text(df, 'Boyut', ""),
+        "m2": _numbers(df, 'M²', 0.0, invalid).astype(float),
+        "quantity": _integers(df, 'Adet', 0, invalid),
+        "color": _text(df, 'Renk', "Doğal"),
+        "waybillNo": _text(df, 'İrsaliye No', ""),
+    }
+    return _frame(df, columns, invalid)
+
+
+# Sayfa adı -> (koleksiyon, dönüştürücü, başlık, kayıt adı)
+SHEETS = {
+    "Üretim Kayıtları": ("productions", production_frame, "📊 Üretim verileri", "üretim"),
+    "Kesilmiş Ürünler": ("cut_products", cut_product_frame, "✂️ Kesilmiş ürün verileri", "kesilmiş ürün"),
+    "Sevkiyatlar": ("shipments", shipment_frame, "📦 Sevkiyat verileri", "sevkiyat"),
+}
+
+
+def read_sheet(sheet_name):
+    """Sayfayı oku ve dönüştür (iş sürecinde çalışır): (sütunlar, satır sayısı, belgeler, atlananlar)"""
+    df = pd.read_excel(EXCEL_FILE, sheet_name=sheet_name)
+    frame, skipped = SHEETS[sheet_name][1](df)
+    return df.columns.tolist(), len(df), frame, skipped
+
+
+def _chunks(frame):
+    """INSERT_CHUNK_SIZE'lık belge listeleri (sütunlar tolist ile Python tiplerine çevrilir)"""
+    names = frame.columns.tolist()
+    for start in range(0, len(frame), INSERT_CHUNK_SIZE):
+        part = frame.iloc[start:start + INSERT_CHUNK_SIZE]
+        columns = [part[name].tolist() for name in names]
+        yield [dict(zip(names, values)) for values in zip(*columns)]
+
+
+async def import_sheet(executor, write_lock, sheet_name, replace=False):
+    """
+    Sayfayı oku ve koleksiyona uygula (replace=True ise koleksiyonu toptan değiştir)
+    Okuma diğer sayfalarla aynı anda yapılır; türetilmiş durumlar (stok defteri vb.)
+    birden fazla koleksiyondan hesaplandığı için yazmalar sırayla uygulanır.
+    """
+    collection, _, title, label = SHEETS[sheet_name]
     try:
-        df = pd.read_excel(EXCEL_FILE, sheet_name="Sevkiyatlar")
-        
-        print(f"   Sütunlar: {df.columns.tolist()}")
-        print(f"   Toplam satır: {len(df)}")
-        
-        shipments = []
-        for index, row in df.iterrows():
-            try:
-                # Boş satırları atla
-                if pd.isna(row['Tarih']):
-                    continue
-                    
-                if isinstance(row['Tarih'], pd.Timestamp):
-                    date_str = row['Tarih'].strftime('%Y-%m-%d')
-                else:
-                    date_str = str(row['Tarih'])
-                
-                customer = str(row['Müşteri']) if not pd.isna(row['Müşteri']) else ""
-                ship_type = str(row['Tip']) if not pd.isna(row['Tip']) else "Normal"
-                size = str(row['Boyut']) if not pd.isna(row['Boyut']) else ""
-                m2 = float(row['M²']) if not pd.isna(row['M²']) else 0.0
-                quantity = int(row['Adet']) if not pd.isna(row['Adet']) else 0
-                color = str(row['Renk']) if not pd.isna(row['Renk']) else "Doğal"
-                waybill_no = str(row['İrsaliye No']) if not pd.isna(row['İrsaliye No']) else ""
-                
-                shipment = {
-                    "id": str(uuid.uuid4()),
-                    "date": date_str,
-                    "customer": customer,
-                    "type": ship_type,
-                    "size": size,
-                    "m2": m2,
-                    "quantity": quantity,
-                    "color": color,
-                    "waybillNo": waybill_no
-                }
-                
-                shipments.append(shipment)
-                
-            except Exception as e:
-                print(f"   ⚠️ Satır {index} atlandı: {e}")
-                continue
-        
-        if shipments:
-            await db.shipments.delete_many({})
-            await db.shipments.insert_many(shipments)
-            print(f"   ✅ {len(shipments)} sevkiyat kaydı yüklendi")
+        loop = asyncio.get_running_loop()
+        columns, total, frame, skipped = await loop.run_in_executor(executor, read_sheet, sheet_name)
+
+        print(f"{title} ({sheet_name}) - Sütunlar: {columns}")
+        print(f"   Toplam satır: {total}")
+        for index in skipped:
+            print(f"   ⚠️ Satır {index} atlandı: sayıya çevrilemeyen veya tam sayı olmayan değer")
+
+        if len(frame):
+            docs = itertools.chain.from_iterable(_chunks(frame))
+            async with write_lock:
+                result = await staged_import.load(db, collection, docs, replace)
+            print(f"   ✅ {len(frame)} {label} kaydı: {staged_import.summary(result)}")
         else:
-            print("   ⚠️ Sevkiyat verisi bulunamadı")
-            
+            print(f"   ⚠️ {label.capitalize()} verisi bulunamadı")
+
     except Exception as e:
-        print(f"   ❌ Sevkiyat verileri yüklenemedi: {e}")
+        print(f"   ❌ {title} yüklenemedi: {e}")
         import traceback
         traceback.print_exc()
 
 
 async def main():
+    parser = argparse.ArgumentParser(description="SAR-2025-Veriler.xlsx dosyasını MongoDB'ye aktar")
+    parser.add_argument("--swap", action="store_true", help="Koleksiyonları farkla güncellemek yerine toptan değiştir")
+    args = parser.parse_args()
+
     print("=" * 70)
     print("📁 SAR-2025-Veriler.xlsx dosyası MongoDB'ye yükleniyor...")
     print("=" * 70)
-    
+
     # Tüm sheet'leri oku ve incele
     xls = pd.ExcelFile(EXCEL_FILE)
     print(f"\n📋 Excel'de bulunan sheet'ler: {xls.sheet_names}\n")
-    
-    # Her sheet'i import et
-    await import_production_data()
-    await import_cut_products()
-    await import_shipments()
-    
+
+    # Sayfalar ayrı süreçlerde aynı anda okunur
+    write_lock = asyncio.Lock()
+    with ProcessPoolExecutor(max_workers=len(SHEETS)) as executor:
+        await asyncio.gather(*(import_sheet(executor, write_lock, sheet_name, args.swap) for sheet_name in SHEETS))
+
     print("\n" + "=" * 70)
     print("✅ TÜM VERİLER BAŞARIYLA YÜKLENDİ!")
     print("=" * 70)
-    
+
     # İstatistikleri göster
     prod_count = await db.productions.count_documents({})
     cut_count = await db.cut_products.count_documents({})
     ship_count = await db.shipments.count_documents({})
-    
+
     print(f"\n📊 Yüklenen Veri Özeti:")
     print(f"  • Üretim Kayıtları: {prod_count} kayıt")
     print(f"  • Kesilmiş Ürünler: {cut_count} kayıt")
     print(f"  • Sevkiyatlar: {ship_count} kayıt")
     print(f"\n💾 Veritabanı: {os.environ['DB_NAME']}")
     print("\n✨ Veriler uygulamada görüntülenmeye hazır!")
-    
+
     client.close()
 
 if __name__ == "__main__":
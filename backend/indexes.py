@@ -0,0 +1,232 @@
+"""
+MongoDB indeks kaydı
+Uygulamanın tüm indeksleri burada tanımlanır. Sunucu açılışında ve
+`python indexes.py apply` ile uygulanır; tekrar çalıştırmak güvenlidir: aynı
+indeks varsa dokunulmaz, aynı anahtarlarla farklı seçenekli (örn. unique olmayan)
+bir indeks varsa yeniden oluşturulur. Tekil (unique) indeks, koleksiyonda tekrar
+eden değer varsa oluşturulmaz ve eski indeks korunur.
+
+`python indexes.py verify` uç noktaların seçici sorgularını explain() ile
+çalıştırır; tam koleksiyon taraması (COLLSCAN) yapan sorgu varsa hata koduyla
+çıkar. Filtresiz liste okumaları (tüm koleksiyonu döndürenler) denetlenmez.
+"""
+import argparse
+import asyncio
+import logging
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+import cost_partitions
+import cost_rollups
+import exchange_rate_history
+import idempotency
+import pagination
+import stock_checkpoints
+
+logger = logging.getLogger(__name__)
+
+# Karşılaştırılan indeks seçenekleri
+OPTION_KEYS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+
+def _keys(*fields):
+    return [(field, ASCENDING) for field in fields]
+
+
+INDEXES = {
+    "productions": [
+        IndexModel(_keys("id"), unique=True),
+        # Maliyet bölümü yeniden hesaplaması günün üretimlerini (tarih, makine) ile okur
+        IndexModel(_keys("date", "machine")),
+    ],
+    "daily_consumption": [
+        IndexModel(_keys("id"), unique=True),
+        IndexModel(_keys("date", "machine")),
+    ],
+    "shipments": [
+        IndexModel(_keys("id"), unique=True),
+        # Stok hesabında kesilmiş ürün sevkiyatları tip ve tarihe göre süzülür
+        IndexModel(_keys("type", "date")),
+        # İrsaliye numarası eski kayıtlarda waybill, Excel aktarımında waybillNo alanındadır
+        IndexModel(_keys("waybillNo"), sparse=True),
+        IndexModel(_keys("waybill"), sparse=True),
+    ],
+    "cut_products": [
+        IndexModel(_keys("id"), unique=True),
+    ],
+    "materials": [
+        IndexModel(_keys("id"), unique=True),
+    ],
+    "users": [
+        IndexModel(_keys("id"), unique=True),
+        IndexModel(_keys("username"), unique=True),
+    ],
+    cost_partitions.PARTITIONS_COLLECTION: [
+        IndexModel(_keys("date", "machine"), unique=True),
+    ],
+    cost_rollups.ROLLUP_COLLECTION: [
+        IndexModel(_keys("date", "machine"), unique=True),
+    ],
+    exchange_rate_history.HISTORY_COLLECTION: [
+        IndexModel(_keys("date", "createdAt")),
+    ],
+    # Saklanan idempotent yanıtlar süresi dolunca MongoDB tarafından silinir
+    idempotency.KEYS_COLLECTION: [
+        IndexModel(_keys("createdAt"), expireAfterSeconds=idempotency.KEY_TTL_SECONDS),
+    ],
+}
+
+# Liste sayfalaması: her sıralama alanı için (alan, id). Tarih aralığı sorguları da
+# (date, id) indeksinin önekini kullanır.
+for _collection, _sorts in pagination.LIST_SORTS.items():
+    INDEXES[_collection] += [IndexModel(_keys(sort.lstrip("-"), "id")) for sort in _sorts]
+
+
+def _options(document):
+    return {key: document[key] for key in OPTION_KEYS if document.get(key) is not None}
+
+
+async def _has_duplicates(collection, keys):
+    """Tekil indeks anahtarlarında tekrar eden değer var mı"""
+    group_id = {field.replace(".", "_"): f"${field}" for field, _ in keys}
+    duplicates = await collection.aggregate([
+        {"$group": {"_id": group_id, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": 1},
+    ], allowDiskUse=True).to_list(None)
+    return bool(duplicates)
+
+
+async def _apply_index(collection, model, existing):
+    """Tek indeksi uygula; yapılan işlem (mevcut, oluşturuldu, yeniden oluşturuldu, tekrar eden değer)"""
+    document = model.document
+    keys = list(document["key"].items())
+    current = next(
+        ((name, info) for name, info in existing.items() if list(info["key"]) == keys),
+        None,
+    )
+    if current is not None and _options(current[1]) == _options(document):
+        return "mevcut"
+
+    if document.get("unique") and await _has_duplicates(collection, keys):
+        return "tekrar eden değer"
+    if current is not None:
+        await collection.drop_index(current[0])
+    await collection.create_indexes([model])
+    return "yeniden oluşturuldu" if current is not None else "oluşturuldu"
+
+
+async def apply(db, collections=None):
+    """
+    Kayıttaki indeksleri uygula (collections verilirse yalnızca o koleksiyonlar).
+    [(koleksiyon, indeks adı, işlem)] döner.
+    """
+    results = []
+    for name, models in INDEXES.items():
+        if collections is not None and name not in collections:
+            continue
+        existing = await db[name].index_information()
+        for model in models:
+            action = await _apply_index(db[name], model, existing)
+            results.append((name, model.document["name"], action))
+    return results
+
+
+async def ensure_indexes(db):
+    """Sunucu açılışı: indeksleri uygula; tekil indeks oluşturulamazsa uyar"""
+    for collection, index, action in await apply(db):
+        if action == "tekrar eden değer":
+            logger.warning(f"{collection}.{index} tekil indeksi oluşturulamadı: tekrar eden değerler var")
+        elif action != "mevcut":
+            logger.info(f"İndeks {action}: {collection}.{index}")
+
+
+def endpoint_queries(db):
+    """
+    explain() ile denetlenen uç nokta sorguları: [(açıklama, Motor imleci)].
+    Değerler yalnızca sorgu şekli içindir.
+    """
+    day = "2025-01-01"
+    queries = []
+    for collection, sorts in pagination.LIST_SORTS.items():
+        # Güncelleme / silme ve imleçli sayfa sorguları
+        queries.append((f"{collection} id", db[collection].find({"id": "x"})))
+        for sort in sorts:
+            page, _ = pagination.find_page(db, collection, sort=sort, cursor=pagination.encode_cursor(["x", "x"]))
+            queries.append((f"{collection} ?sort={sort}", page))
+
+    day_range = cost_partitions.date_range_query(day, day)
+    movements = {"date": {"$gt": day, "$lte": day}}
+    return queries + [
+        ("giriş", db.users.find({"username": "x"})),
+        ("maliyet bölümü üretimleri", db.productions.find({"date": day})),
+        ("maliyet bölümü tüketimleri", db.daily_consumption.find({"date": day})),
+        ("maliyet analizi", db[cost_partitions.PARTITIONS_COLLECTION].find(day_range).sort("date", DESCENDING)),
+        ("maliyet özeti", db[cost_rollups.ROLLUP_COLLECTION].find({**day_range, "machine": "x"})),
+        ("stok kontrol noktası",
+         db[stock_checkpoints.CHECKPOINT_COLLECTION].find({"_id": {"$lte": day}}).sort("_id", DESCENDING)),
+        ("stok hareketleri (üretim)", db.productions.find(movements)),
+        ("stok hareketleri (sevkiyat)", db.shipments.find(movements)),
+        ("kesilmiş ürün sevkiyatları", db.shipments.find({**movements, "type": "Kesilmiş"})),
+        ("irsaliye", db.shipments.find({"waybillNo": "x"})),
+        ("kur geçmişi", db[exchange_rate_history.HISTORY_COLLECTION].find({}).sort([("date", 1), ("createdAt", 1)])),
+    ]
+
+
+def _stages(plan):
+    """explain çıktısındaki tüm plan aşamaları"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _stages(value)
+
+
+async def verify(db):
+    """COLLSCAN yapan sorguların açıklamaları (boşsa tüm sorgular indeks kullanır)"""
+    failures = []
+    for description, cursor in endpoint_queries(db):
+        plan = await cursor.explain()
+        if "COLLSCAN" in _stages(plan.get("queryPlanner", plan)):
+            failures.append(description)
+    return failures
+
+
+async def main():
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from dotenv import load_dotenv
+    from pathlib import Path
+    import os
+    import sys
+
+    parser = argparse.ArgumentParser(description="MongoDB indekslerini uygula veya denetle")
+    parser.add_argument("command", choices=["apply", "verify"])
+    args = parser.parse_args()
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    try:
+        if args.command == "apply":
+            results = await apply(db)
+            for collection, index, action in results:
+                print(f"{'⚠️ ' if action == 'tekrar eden değer' else '✅'} {collection}.{index}: {action}")
+            failed = any(action == "tekrar eden değer" for _, _, action in results)
+        else:
+            failures = await verify(db)
+            for failure in failures:
+                print(f"❌ COLLSCAN: {failure}")
+            if not failures:
+                print(f"✅ {len(endpoint_queries(db))} sorgunun tamamı indeks kullanıyor")
+            failed = bool(failures)
+    finally:
+        client.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -6,6 +6,10 @@ from pathlib import Path
 import uuid
 from datetime import datetime
 
+import exchange_rate_history
+import staged_import
+from derived_state import rebuild, record_change
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
@@ -53,18 +57,20 @@ async def load_additional_data():
     
     # Hammadde kayıtları
     print("📦 Hammadde kayıtları yükleniyor...")
-    await db.materials.delete_many({})
     for mat in materials_data:
         mat['id'] = str(uuid.uuid4())
         mat['created_at'] = '2025-10-28T00:00:00Z'
-        await db.materials.insert_one(mat)
-    print(f"✅ {len(materials_data)} hammadde kaydı yüklendi!")
+    # Yalnızca değişen kayıtlar yazılır; türetilmiş durumlar (stok, maliyet) güncellenir
+    result = await staged_import.load(db, "materials", materials_data)
+    print(f"✅ {len(materials_data)} hammadde kaydı: {staged_import.summary(result)}")
     
     # Döviz kurları
     print("\n💱 Döviz kurları yükleniyor...")
-    await db.exchange_rates.delete_many({})
-    exchange_rates_data['id'] = str(uuid.uuid4())
-    await db.exchange_rates.insert_one(exchange_rates_data)
+    # Kurlar hammadde girişlerinin ilk tarihinden geçerli olarak kur geçmişine
+    # eklenir; güncel kur belgesi append ile güncellenir
+    first_day = min(mat['date'] for mat in materials_data)
+    before, after = await exchange_rate_history.append(db, exchange_rates_data['usd'], exchange_rates_data['eur'], first_day)
+    await record_change(db, "exchange_rates", before=before, after=after)
     print(f"✅ Döviz kurları güncellendi: USD={exchange_rates_data['usd']} TL, EUR={exchange_rates_data['eur']} TL")
     
     # Kullanıcılar
@@ -74,6 +80,8 @@ async def load_additional_data():
         user['id'] = str(uuid.uuid4())
         user['created_at'] = '2025-10-28T00:00:00Z'
         await db.users.insert_one(user)
+    # Sürüm sayacı artırılır; önbellekler ve oturum doğrulaması yeni kullanıcıları görür
+    await rebuild(db, "users")
     print(f"✅ {len(users_data)} kullanıcı kaydı yüklendi!")
     
     # Doğrulama
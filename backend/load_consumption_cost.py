@@ -5,6 +5,9 @@ from dotenv import load_dotenv
 from pathlib import Path
 import uuid
 
+import staged_import
+from derived_state import rebuild
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
@@ -71,12 +74,12 @@ async def load_consumption_and_cost_data():
     
     # Günlük Tüketim
     print("📊 Günlük Tüketim kayıtları yükleniyor...")
-    await db.daily_consumption.delete_many({})
     for item in daily_consumption_data:
         item['id'] = str(uuid.uuid4())
         item['created_at'] = '2025-10-28T00:00:00Z'
-        await db.daily_consumption.insert_one(item)
-    print(f"✅ {len(daily_consumption_data)} günlük tüketim kaydı yüklendi!")
+    # Yalnızca değişen kayıtlar yazılır; türetilmiş durumlar (stok, maliyet) güncellenir
+    result = await staged_import.load(db, "daily_consumption", daily_consumption_data)
+    print(f"✅ {len(daily_consumption_data)} günlük tüketim kaydı: {staged_import.summary(result)}")
     
     # Maliyet Analizi
     print("\n💰 Maliyet analizi kayıtları yükleniyor...")
@@ -85,6 +88,7 @@ async def load_consumption_and_cost_data():
         item['id'] = str(uuid.uuid4())
         item['created_at'] = '2025-10-28T00:00:00Z'
         await db.cost_analysis.insert_one(item)
+    await rebuild(db, "cost_analysis")
     print(f"✅ {len(cost_analysis_data)} maliyet analizi kaydı yüklendi!")
     
     # Doğrulama
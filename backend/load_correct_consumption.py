@@ -5,6 +5,8 @@ from dotenv import load_dotenv
 from pathlib import Path
 import uuid
 
+import staged_import
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
@@ -50,14 +52,13 @@ daily_consumption_data = [
 async def load_correct_consumption_data():
     print("🔄 DOĞRU Günlük Tüketim verileri yükleniyor...\n")
     
-    await db.daily_consumption.delete_many({})
-    
     for item in daily_consumption_data:
         item['id'] = str(uuid.uuid4())
         item['created_at'] = '2025-10-28T00:00:00Z'
-        await db.daily_consumption.insert_one(item)
     
-    print(f"✅ {len(daily_consumption_data)} günlük tüketim kaydı yüklendi!")
+    # Yalnızca değişen kayıtlar yazılır; türetilmiş durumlar (stok, maliyet) güncellenir
+    result = await staged_import.load(db, "daily_consumption", daily_consumption_data)
+    print(f"✅ {len(daily_consumption_data)} günlük tüketim kaydı: {staged_import.summary(result)}")
     
     # Toplamları hesapla
     total_petkim = sum([d['petkim'] for d in daily_consumption_data])
@@ -10,6 +10,10 @@ from pathlib import Path
 import uuid
 from datetime import datetime
 
+import exchange_rate_history
+import staged_import
+from derived_state import record_change
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
@@ -21,11 +25,6 @@ async def clear_and_load_materials():
     """HAM hammadde giriş kayıtlarını temizle ve doğru verileri yükle"""
     print("🧪 Hammadde verileri düzeltiliyor...")
     
-    # Önce tümünü sil
-    await db.materials.delete_many({})
-    await db.daily_consumption.delete_many({})
-    await db.exchange_rates.delete_many({})
-    
     # Gerçek hammadde girişleri - Excel verilerine uygun
     materials = [
         {
@@ -120,16 +119,18 @@ async def clear_and_load_materials():
         },
     ]
     
-    await db.materials.insert_many(materials)
-    print(f"   ✅ {len(materials)} hammadde giriş kaydı yüklendi")
+    # Yalnızca değişen kayıtlar yazılır; türetilmiş durumlar (stok, maliyet) güncellenir
+    result = await staged_import.load(db, "materials", materials)
+    print(f"   ✅ {len(materials)} hammadde giriş kaydı: {staged_import.summary(result)}")
     
-    # Döviz kurları
+    # Döviz kurları (hammadde girişlerinin ilk tarihinden geçerli olarak kur geçmişine eklenir)
     exchange_rate = {
         "usd": 34.75,
         "eur": 37.82,
-        "lastUpdated": datetime.utcnow().isoformat()
+        "date": min(m["date"] for m in materials)
     }
-    await db.exchange_rates.insert_one(exchange_rate)
+    before, after = await exchange_rate_history.append(db, exchange_rate["usd"], exchange_rate["eur"], exchange_rate["date"])
+    await record_change(db, "exchange_rates", before=before, after=after)
     print(f"   ✅ Döviz kurları güncellendi")
 
 async def calculate_actual_stats():
@@ -220,8 +221,8 @@ async def load_realistic_consumption():
             "notes": f"Günlük üretim: {group['quantity_total']} adet, {m2:.2f} m²"
         })
     
-    await db.daily_consumption.insert_many(consumptions)
-    print(f"   ✅ {len(consumptions)} günlük tüketim kaydı yüklendi")
+    result = await staged_import.load(db, "daily_consumption", consumptions)
+    print(f"   ✅ {len(consumptions)} günlük tüketim kaydı: {staged_import.summary(result)}")
     
     # Toplam tüketim
     total_petkim = sum(c['petkim'] for c in consumptions)
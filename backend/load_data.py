@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
@@ -5,6 +6,8 @@ from dotenv import load_dotenv
 from pathlib import Path
 import uuid
 
+import staged_import
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
@@ -102,32 +105,29 @@ shipment_data = [
     {'date': '2025-10-24', 'customer': 'ES DOĞAN', 'type': 'Normal', 'size': '1mm x 120cm x 300m', 'm2': 360.00, 'quantity': 30, 'color': 'Doğal', 'waybill': 'OZI2025000000055'},
 ]
 
-async def load_data():
-    print("🔄 Veritabanı temizleniyor...")
-    await db.productions.delete_many({})
-    await db.cut_products.delete_many({})
-    await db.shipments.delete_many({})
-    
+async def load_data(replace=False):
+    print("🔄 Kayıtlar hazırlık koleksiyonlarına yazılıp canlı verilerle karşılaştırılıyor...")
+
     print("\n📊 Üretim kayıtları yükleniyor...")
     for prod in production_data:
         prod['id'] = str(uuid.uuid4())
         prod['created_at'] = '2025-10-28T00:00:00Z'
-        await db.productions.insert_one(prod)
-    print(f"✅ {len(production_data)} üretim kaydı yüklendi!")
-    
+    result = await staged_import.load(db, "productions", production_data, replace)
+    print(f"✅ {len(production_data)} üretim kaydı: {staged_import.summary(result)}")
+
     print("\n✂️ Kesilmiş ürün kayıtları yükleniyor...")
     for cut in cut_product_data:
         cut['id'] = str(uuid.uuid4())
         cut['created_at'] = '2025-10-28T00:00:00Z'
-        await db.cut_products.insert_one(cut)
-    print(f"✅ {len(cut_product_data)} kesilmiş ürün kaydı yüklendi!")
-    
+    result = await staged_import.load(db, "cut_products", cut_product_data, replace)
+    print(f"✅ {len(cut_product_data)} kesilmiş ürün kaydı: {staged_import.summary(result)}")
+
     print("\n🚚 Sevkiyat kayıtları yükleniyor...")
     for ship in shipment_data:
         ship['id'] = str(uuid.uuid4())
         ship['created_at'] = '2025-10-28T00:00:00Z'
-        await db.shipments.insert_one(ship)
-    print(f"✅ {len(shipment_data)} sevkiyat kaydı yüklendi!")
+    result = await staged_import.load(db, "shipments", shipment_data, replace)
+    print(f"✅ {len(shipment_data)} sevkiyat kaydı: {staged_import.summary(result)}")
     
     # Verify
     prod_count = await db.productions.count_documents({})
@@ -143,4 +143,6 @@ async def load_data():
     client.close()
 
 if __name__ == "__main__":
-    asyncio.run(load_data())
+    parser = argparse.ArgumentParser(description="Örnek verileri MongoDB'ye yükle")
+    parser.add_argument("--swap", action="store_true", help="Koleksiyonları farkla güncellemek yerine toptan değiştir")
+    asyncio.run(load_data(parser.parse_args().swap))
@@ -9,6 +9,10 @@ from pathlib import Path
 import uuid
 from datetime import datetime, timedelta
 
+import exchange_rate_history
+import staged_import
+from derived_state import record_change
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
@@ -153,9 +157,9 @@ async def load_materials():
         },
     ]
     
-    await db.materials.delete_many({})
-    await db.materials.insert_many(materials)
-    print(f"   ✅ {len(materials)} hammadde giriş kaydı yüklendi")
+    # Yalnızca değişen kayıtlar yazılır; türetilmiş durumlar (stok, maliyet) güncellenir
+    result = await staged_import.load(db, "materials", materials)
+    print(f"   ✅ {len(materials)} hammadde giriş kaydı: {staged_import.summary(result)}")
 
 async def load_daily_consumption():
     """Günlük hammadde tüketim kayıtlarını yükle"""
@@ -222,22 +226,24 @@ async def load_daily_consumption():
             "notes": "Günlük üretim tüketimi"
         })
     
-    await db.daily_consumption.delete_many({})
-    await db.daily_consumption.insert_many(consumptions)
-    print(f"   ✅ {len(consumptions)} günlük tüketim kaydı yüklendi")
+    result = await staged_import.load(db, "daily_consumption", consumptions)
+    print(f"   ✅ {len(consumptions)} günlük tüketim kaydı: {staged_import.summary(result)}")
 
 async def load_exchange_rates():
     """Döviz kurlarını yükle"""
     print("\n💱 Döviz kurları yükleniyor...")
     
+    # Kurlar hammadde girişlerinin ilk tarihinden geçerli olarak kur geçmişine
+    # eklenir; güncel kur belgesi append ile güncellenir
+    first = await db.materials.find_one({}, {"_id": 0, "date": 1}, sort=[("date", 1)])
     exchange_rate = {
         "usd": 34.75,
         "eur": 37.82,
-        "lastUpdated": datetime.utcnow().isoformat()
+        "date": first["date"] if first else datetime.utcnow().date().isoformat()
     }
     
-    await db.exchange_rates.delete_many({})
-    await db.exchange_rates.insert_one(exchange_rate)
+    before, after = await exchange_rate_history.append(db, exchange_rate["usd"], exchange_rate["eur"], exchange_rate["date"])
+    await record_change(db, "exchange_rates", before=before, after=after)
     print(f"   ✅ Döviz kurları yüklendi (USD: {exchange_rate['usd']}, EUR: {exchange_rate['eur']})")
 
 async def verify_data():
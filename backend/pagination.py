@@ -0,0 +1,140 @@
+"""
+Liste uç noktaları için imleç (keyset) sayfalama
+Sayfalar (sıralama alanı, id) çiftine göre ilerler: imleç son satırın bu ikilisini
+taşır ve sonraki sayfa indeksten tam bu noktadan itibaren okunur; skip kullanılmaz,
+araya kayıt eklense de satır atlanmaz veya tekrarlanmaz.
+
+İmleç istemci için opak bir base64 metnidir; sonraki sayfanın imleci X-Next-Cursor
+başlığında döner (son sayfada başlık yoktur).
+"""
+import base64
+import json
+import re
+
+from pymongo import ASCENDING, DESCENDING
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_LIMIT = 1000
+
+# Koleksiyon başına sıralanabilir alanlar; ilki varsayılan sıralamadır
+LIST_SORTS = {
+    "productions": ("-date", "created_at", "machine"),
+    "cut_products": ("-date",),
+    "shipments": ("-date", "customer"),
+    "materials": ("-date", "material"),
+    "daily_consumption": ("-date", "machine"),
+    "users": ("username", "createdAt"),
+}
+
+
+# Hiçbir zaman döndürülmeyen alanlar
+HIDDEN_FIELDS = {
+    "users": ("password", "tokenVersion"),
+}
+
+FIELD_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9_]*$")
+
+
+def field_projection(collection, fields=None):
+    """
+    ?fields=date,machine,quantity -> MongoDB projeksiyonu. fields yoksa gizli alanlar
+    hariç tüm belge. Geçersiz veya gizli alan için ValueError.
+    """
+    hidden = HIDDEN_FIELDS.get(collection, ())
+    if not fields:
+        return {"_id": 0, **{field: 0 for field in hidden}}
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    invalid = [name for name in names if not FIELD_PATTERN.match(name) or name in hidden]
+    if invalid or not names:
+        raise ValueError(f"Geçersiz alan: {', '.join(invalid) or fields}")
+    return {"_id": 0, **{name: 1 for name in names}}
+
+
+def _is_inclusion(projection):
+    return any(value == 1 for key, value in projection.items() if key != "_id")
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Geçersiz imleç için ValueError"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Geçersiz imleç") from e
+    if not isinstance(key, list):
+        raise ValueError("Geçersiz imleç")
+    return key
+
+
+def parse_sort(collection, sort=None):
+    """'-date' -> ('date', DESCENDING); izin verilmeyen alan için ValueError"""
+    allowed = LIST_SORTS[collection]
+    sort = sort or allowed[0]
+    field = sort.lstrip("-")
+    if field not in {name.lstrip("-") for name in allowed}:
+        raise ValueError(f"Geçersiz sıralama alanı: {field}")
+    return field, DESCENDING if sort.startswith("-") else ASCENDING
+
+
+def _after(field, direction, value, last_id):
+    """(alan, id) sırasında imleçten sonraki belgeler (null değerler artan sırada en başta)"""
+    if direction == ASCENDING:
+        if value is None:
+            return {"$or": [{field: None, "id": {"$gt": last_id}}, {field: {"$ne": None}}]}
+        return {"$or": [{field: {"$gt": value}}, {field: value, "id": {"$gt": last_id}}]}
+    if value is None:
+        return {field: None, "id": {"$lt": last_id}}
+    return {"$or": [{field: {"$lt": value}}, {field: value, "id": {"$lt": last_id}}, {field: None}]}
+
+
+def find_page(db, collection, query=None, projection=None, sort=None, cursor=None):
+    """
+    Sayfa sorgusunun Motor imleci ve sıralama alanı (alan None ise kayıt sırası).
+    sort/cursor geçersizse ValueError.
+    """
+    projection = projection or {"_id": 0}
+    if sort is None and cursor is None:
+        return db[collection].find(query or {}, projection), None
+
+    field, direction = parse_sort(collection, sort)
+    query = dict(query or {})
+    if cursor:
+        key = decode_cursor(cursor)
+        if len(key) != 2:
+            raise ValueError("Geçersiz imleç")
+        query = {"$and": [query, _after(field, direction, key[0], key[1])]} if query else _after(field, direction, *key)
+    return db[collection].find(query, projection).sort([(field, direction), ("id", direction)]), field
+
+
+async def paginate(db, collection, query=None, projection=None, sort=None, limit=None, cursor=None):
+    """
+    (belgeler, sonraki_imleç). limit verilmezse tüm belgeler döner; hiçbir parametre
+    verilmezse kayıt sırası korunur. sort/cursor geçersizse ValueError.
+    """
+    if limit is not None and sort is None:
+        sort = LIST_SORTS[collection][0]
+    projection = projection or {"_id": 0}
+    if limit is None:
+        find, _ = find_page(db, collection, query, projection, sort, cursor)
+        return await find.to_list(None), None
+
+    # İmleç için sıralama alanı ve id her zaman okunur; istenmediyse yanıttan çıkarılır
+    field, _ = parse_sort(collection, sort)
+    extra = ()
+    if _is_inclusion(projection):
+        extra = tuple(key for key in (field, "id") if key not in projection)
+        projection = {**projection, **{key: 1 for key in extra}}
+
+    find, _ = find_page(db, collection, query, projection, sort, cursor)
+    docs = await find.limit(limit + 1).to_list(None)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor([docs[-1].get(field), docs[-1].get("id")])
+    for doc in docs:
+        for key in extra:
+            doc.pop(key, None)
+    return docs, next_cursor
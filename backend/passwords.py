@@ -0,0 +1,41 @@
+"""
+Şifre özetleme ve doğrulama (bcrypt)
+bcrypt çağrıları olay döngüsünde değil worker_pools.password_pool'da çalışır.
+Eski şifre değiştirme işlemi şifreleri düz metin olarak kaydediyordu; bu
+kayıtlar girişte düz metinle karşılaştırılır ve başarılı girişte bcrypt özetine
+çevrilir (needs_rehash).
+"""
+import hmac
+
+import bcrypt
+
+import worker_pools
+
+
+def _is_bcrypt_hash(stored):
+    return stored.startswith(("$2a$", "$2b$", "$2y$"))
+
+
+def _hash(password):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+
+def _check(password, stored):
+    if not _is_bcrypt_hash(stored):
+        return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8'))
+    return bcrypt.checkpw(password.encode('utf-8'), stored.encode('utf-8'))
+
+
+def needs_rehash(stored):
+    """Kayıtlı şifre bcrypt özeti değilse (eski düz metin kayıt) True"""
+    return not _is_bcrypt_hash(stored)
+
+
+async def hash_password(password):
+    return await worker_pools.password_pool.run(_hash, password)
+
+
+async def verify_password(password, stored):
+    if not stored:
+        return False
+    return await worker_pools.password_pool.run(_check, password, stored)
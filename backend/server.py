@@ -1,14 +1,45 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.middleware.gzip import GZipMiddleware
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
+import json
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, field_validator
+from typing import Dict, List, Optional
 import uuid
 from datetime import datetime, timezone
+import auth_tokens
+import bulk_writes
+import cost_engine
+import cost_partitions
+import cost_rollups
+import cost_simulation
+import etags
+import excel_viewer
+import exchange_rate_history
+import exports
+import idempotency
+import indexes
+import pagination
+import passwords
+import streaming
+import worker_pools
+from collection_versions import VersionedCache
+import stock_checkpoints
+import stock_ledger
+from stock_pipeline import stock_pipeline
+import derived_state
+from derived_state import record_change
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # brotli-asgi kurulu değilse yalnızca gzip kullanılır
+    BrotliMiddleware = None
 
 
 ROOT_DIR = Path(__file__).parent
@@ -19,12 +50,18 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+# Bu boyutun altındaki yanıtlar sıkıştırılmaz (byte)
+COMPRESS_MIN_SIZE = 1024
+
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+# Maliyet analizi bu koleksiyonların saf bir fonksiyonudur
+cost_analysis_cache = VersionedCache(["productions", "daily_consumption", "materials", "exchange_rates"])
+
 
 # ===== Models =====
 
@@ -38,16 +75,33 @@ class UserResponse(BaseModel):
     username: str
     role: str = "admin"
 
+class LoginResponse(UserResponse):
+    token: str
+    expiresAt: int
+
 class UserCreate(BaseModel):
     username: str
     password: str
     name: str
     role: str = "viewer"
 
+# Oturum anahtarı doğrulama (doğrulanmış anahtarlar bellekte tutulur, MongoDB'ye gidilmez)
+token_verifier = auth_tokens.TokenVerifier()
+
+async def current_user(authorization: Optional[str] = Header(None)):
+    """Authorization: Bearer <anahtar> başlığındaki oturumun bilgileri"""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Oturum açmanız gerekiyor", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return await token_verifier.verify(db, token.strip())
+    except auth_tokens.InvalidToken as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+
 # Role checker dependency
-async def check_admin_role(current_user: str = Header(None, alias="X-User-Role")):
+async def check_admin_role(user: dict = Depends(current_user)):
     """İzleyici rolündeki kullanıcılar veri değiştiremez"""
-    if current_user == "viewer":
+    if user.get("role") == "viewer":
         raise HTTPException(status_code=403, detail="Bu işlem için yetkiniz yok. Sadece admin kullanıcılar veri ekleyebilir/düzenleyebilir/silebilir.")
     return True
 
@@ -64,6 +118,16 @@ class ProductionCreate(BaseModel):
     color: str
     colorCategory: str
 
+    # En ve uzunluk metin olarak saklanır, maliyet analizinde tam sayıya çevrilir
+    @field_validator("width", "length")
+    @classmethod
+    def integer_text(cls, value: str):
+        try:
+            int(value)
+        except ValueError:
+            raise ValueError("tam sayı olmalı")
+        return value
+
 class Production(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     date: str
@@ -78,6 +142,40 @@ class Production(BaseModel):
     colorCategory: str
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+# ?fields= ile kısmi dönebilen üretim satırı (yalnızca okunan alanlar yanıtta yer alır)
+class ProductionOut(BaseModel):
+    id: Optional[str] = None
+    date: Optional[str] = None
+    machine: Optional[str] = None
+    thickness: Optional[str] = None
+    width: Optional[str] = None
+    length: Optional[str] = None
+    m2: Optional[float] = None
+    quantity: Optional[int] = None
+    masuraType: Optional[str] = None
+    color: Optional[str] = None
+    colorCategory: Optional[str] = None
+    created_at: Optional[str] = None
+
+# Toplu yazma (ekleme, güncelleme, silme tek istekte)
+class BulkUpdate(BaseModel):
+    id: str
+    data: dict
+
+class BulkRequest(BaseModel):
+    inserts: List[dict] = []
+    updates: List[BulkUpdate] = []
+    deletes: List[str] = []
+    ordered: bool = True
+
+class ProductionBulkUpdate(BaseModel):
+    id: str
+    data: ProductionCreate
+
+class ProductionBulkRequest(BulkRequest):
+    inserts: List[ProductionCreate] = []
+    updates: List[ProductionBulkUpdate] = []
+
 # Stock Stats Model
 class StockStats(BaseModel):
     totalStock: int = 0
@@ -95,6 +193,19 @@ class StockStats(BaseModel):
         "sari": 0,
     }
 
+# Cost Simulation Models
+class CostScenario(BaseModel):
+    name: Optional[str] = None
+    priceChanges: Dict[str, float] = {}
+    prices: Dict[str, float] = {}
+    usd: Optional[float] = None
+    eur: Optional[float] = None
+    dateFrom: Optional[str] = None
+    dateTo: Optional[str] = None
+
+class CostSimulationRequest(BaseModel):
+    scenarios: List[CostScenario]
+
 # Stock Models
 class StockItem(BaseModel):
     type: str
@@ -107,8 +218,114 @@ class StockItem(BaseModel):
     quantity: int
 
 
+# ===== Conditional GET =====
+def _conditional(*collections: str):
+    """Okuma uç noktası için ETag bağımlılığı; koleksiyonlar değişmediyse 304 döner"""
+    async def check(request: Request, response: Response):
+        await etags.check(db, collections, request, response)
+    return Depends(check)
+
+
+# ===== Write Helpers =====
+def _numbers(collection: str, data: dict):
+    """Sayısal alanları yazmadan önce çevir; çevrilemezse 400 (kayıt yazılmaz)"""
+    try:
+        return derived_state.coerce_numbers(collection, data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _update_document(collection: str, doc_id: str, data: dict):
+    """Belgeyi güncelle ve değişikliği türetilmiş durumlara bildir (bulunamazsa None)"""
+    data = _numbers(collection, {k: v for k, v in data.items() if k not in ("id", "_id")})
+    before = await db[collection].find_one_and_update(
+        {"id": doc_id},
+        {"$set": data},
+        projection={"_id": 0},
+    )
+    if before is None:
+        return None
+    after = {**before, **data}
+    await record_change(db, collection, before, after)
+    return after
+
+def _with_headers(result: Response, response: Response):
+    """Bağımlılıkların eklediği başlıkları (ETag, X-Next-Cursor) doğrudan dönen yanıta taşı"""
+    for key, value in response.headers.items():
+        if key != "content-length":
+            result.headers[key] = value
+    return result
+
+def _trusted_json(content, response: Response):
+    """
+    Veritabanından gelen belgeleri Pydantic ile yeniden doğrulamadan orjson ile yaz
+    (response_model yalnızca API şeması için kalır)
+    """
+    return _with_headers(ORJSONResponse(content), response)
+
+class ListParams:
+    """Liste uç noktalarının ortak parametreleri (sayfalama ve akış biçimi)"""
+
+    def __init__(
+        self,
+        sort: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_LIMIT),
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+        accept: Optional[str] = Header(None),
+    ):
+        self.sort = sort
+        self.limit = limit
+        self.cursor = cursor
+        self.fields = fields
+        self.stream = streaming.stream_format(accept)
+
+async def _list_documents(collection: str, response: Response, params: ListParams):
+    """
+    Liste uç noktaları: imleçle sayfalama; sonraki sayfanın imleci X-Next-Cursor başlığında.
+    fields verilirse yalnızca o alanlar okunur. Accept NDJSON/CSV ise belgeler
+    doğrulanmadan doğrudan imleçten akıtılır.
+    """
+    try:
+        projection = pagination.field_projection(collection, params.fields)
+        if params.stream:
+            find, _ = pagination.find_page(db, collection, projection=projection,
+                                           sort=params.sort, cursor=params.cursor)
+            if params.limit is not None:
+                find = find.limit(params.limit)
+            columns = [name for name in projection if name != "_id"] if params.fields else None
+            return _with_headers(streaming.streaming_response(find, params.stream, collection, columns), response)
+
+        docs, next_cursor = await pagination.paginate(db, collection, projection=projection, sort=params.sort,
+                                                      limit=params.limit, cursor=params.cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    return _trusted_json(docs, response)
+
+async def _delete_document(collection: str, doc_id: str):
+    """Belgeyi sil ve değişikliği türetilmiş durumlara bildir (bulunamazsa None)"""
+    before = await db[collection].find_one_and_delete({"id": doc_id}, projection={"_id": 0})
+    if before is None:
+        return None
+    await record_change(db, collection, before=before)
+    return before
+
+
+async def _bulk_write(collection: str, request: BulkRequest, inserts: list, updates: list):
+    """Doğrulanmış toplu işi yürüt (bulk_writes.execute); işlem başına sonuç döner"""
+    if len(inserts) + len(updates) + len(request.deletes) > bulk_writes.MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Toplu işlemde en fazla {bulk_writes.MAX_BULK_ITEMS} kayıt olabilir")
+    return await bulk_writes.execute(db, collection, inserts, updates, request.deletes, request.ordered)
+
+async def _bulk_documents(collection: str, request: BulkRequest):
+    inserts = [_numbers(collection, {**doc, "id": str(uuid.uuid4())}) for doc in request.inserts]
+    updates = [(item.id, _numbers(collection, item.data)) for item in request.updates]
+    return await _bulk_write(collection, request, inserts, updates)
+
+
 # ===== Auth Routes =====
-@api_router.post("/auth/login", response_model=UserResponse)
+@api_router.post("/auth/login", response_model=LoginResponse)
 async def login(request: LoginRequest):
     # Veritabanından kullanıcıyı bul
     user = await db.users.find_one({"username": request.username})
@@ -116,20 +333,45 @@ async def login(request: LoginRequest):
     if not user:
         raise HTTPException(status_code=401, detail="Kullanıcı adı veya şifre hatalı")
     
-    # Şifre kontrolü
-    import bcrypt
-    is_valid = bcrypt.checkpw(request.password.encode('utf-8'), user['password'].encode('utf-8'))
+    # Şifre kontrolü (bcrypt iş havuzunda çalışır)
+    is_valid = await passwords.verify_password(request.password, user.get('password', ''))
     
     if not is_valid:
         raise HTTPException(status_code=401, detail="Kullanıcı adı veya şifre hatalı")
+
+    # Düz metin kaydedilmiş eski şifreler ilk başarılı girişte özetlenir
+    if passwords.needs_rehash(user['password']):
+        await db.users.update_one(
+            {"_id": user["_id"]},
+            {"$set": {"password": await passwords.hash_password(request.password)}}
+        )
     
-    return UserResponse(
-        id=user.get('id', str(uuid.uuid4())),
+    # id alanı olmayan eski kullanıcı kayıtlarına kalıcı bir id atanır (anahtar id'yi taşır)
+    if not user.get('id'):
+        await db.users.update_one(
+            {"_id": user["_id"], "id": {"$in": [None, ""]}},
+            {"$set": {"id": str(uuid.uuid4())}}
+        )
+        user = await db.users.find_one({"_id": user["_id"]})
+        await record_change(db, "users")
+    
+    token, expires = auth_tokens.issue(user)
+    return LoginResponse(
+        id=user['id'],
         username=user['username'],
-        name=user.get('name', ''),
-        role=user.get('role', 'viewer')
+        role=user.get('role', 'viewer'),
+        token=token,
+        expiresAt=expires,
     )
 
+@api_router.post("/auth/revoke")
+async def revoke_sessions(user: dict = Depends(current_user)):
+    """Kullanıcının tüm oturumlarını kapat (tüm cihazlarda yeniden giriş gerekir)"""
+    await auth_tokens.revoke(db, user["sub"])
+    await record_change(db, "users")
+    token_verifier.invalidate_versions()
+    return {"message": "Oturumlar kapatıldı"}
+
 @api_router.post("/users", response_model=UserResponse)
 async def create_user(user: UserCreate, _: bool = Depends(check_admin_role)):
     # Kullanıcı zaten var mı kontrol et
@@ -138,8 +380,7 @@ async def create_user(user: UserCreate, _: bool = Depends(check_admin_role)):
         raise HTTPException(status_code=400, detail="Bu kullanıcı adı zaten kullanılıyor")
     
     # Şifreyi hashle
-    import bcrypt
-    hashed_password = bcrypt.hashpw(user.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    hashed_password = await passwords.hash_password(user.password)
     
     # Yeni kullanıcı oluştur
     new_user = {
@@ -152,6 +393,7 @@ async def create_user(user: UserCreate, _: bool = Depends(check_admin_role)):
     }
     
     await db.users.insert_one(new_user)
+    await record_change(db, "users", after=new_user)
     
     return UserResponse(
         id=new_user['id'],
@@ -161,10 +403,9 @@ async def create_user(user: UserCreate, _: bool = Depends(check_admin_role)):
 
 
 # ===== Production Routes =====
-@api_router.get("/production", response_model=List[Production])
-async def get_productions():
-    productions = await db.productions.find({}, {"_id": 0}).to_list(1000)
-    return productions
+@api_router.get("/production", response_model=List[ProductionOut], response_model_exclude_unset=True, dependencies=[_conditional("productions")])
+async def get_productions(response: Response, params: ListParams = Depends()):
+    return await _list_documents("productions", response, params)
 
 @api_router.post("/production", response_model=Production)
 async def create_production(production: ProductionCreate, _: bool = Depends(check_admin_role)):
@@ -173,390 +414,261 @@ async def create_production(production: ProductionCreate, _: bool = Depends(chec
     
     doc = prod_obj.model_dump()
     await db.productions.insert_one(doc)
+    await record_change(db, "productions", after=doc)
     return prod_obj
 
+@api_router.post("/production/bulk")
+async def bulk_production(request: ProductionBulkRequest, _: bool = Depends(check_admin_role)):
+    """Gün sonu üretim girişleri: tüm satırlar doğrulanır, tek bulk_write ile yazılır"""
+    inserts = [Production(**item.model_dump()).model_dump() for item in request.inserts]
+    updates = [(item.id, item.data.model_dump()) for item in request.updates]
+    return await _bulk_write("productions", request, inserts, updates)
+
 @api_router.put("/production/{prod_id}")
 async def update_production(prod_id: str, production: ProductionCreate, _: bool = Depends(check_admin_role)):
-    result = await db.productions.update_one(
-        {"id": prod_id},
-        {"$set": production.model_dump()}
-    )
-    if result.matched_count == 0:
+    if not await _update_document("productions", prod_id, production.model_dump()):
         raise HTTPException(status_code=404, detail="Production not found")
     return {"message": "Updated successfully"}
 
 @api_router.delete("/production/{prod_id}")
 async def delete_production(prod_id: str, _: bool = Depends(check_admin_role)):
-    result = await db.productions.delete_one({"id": prod_id})
-    if result.deleted_count == 0:
+    if not await _delete_document("productions", prod_id):
         raise HTTPException(status_code=404, detail="Production not found")
     return {"message": "Deleted successfully"}
 
 
 # ===== Stock Routes =====
-@api_router.get("/stock/stats", response_model=StockStats)
-async def get_stock_stats():
-    # Count productions
-    production_count = await db.productions.count_documents({})
-    
-    # Calculate total stock: Productions - Normal Shipments
-    productions = await db.productions.find({}, {"_id": 0, "quantity": 1}).to_list(1000)
-    total_produced = sum(p.get("quantity", 0) for p in productions)
-    
-    # Get normal shipments
-    shipments = await db.shipments.find({}, {"_id": 0, "type": 1, "quantity": 1}).to_list(1000)
-    total_shipped = sum(int(s.get("quantity", 0)) for s in shipments if s.get("type") == "Normal")
-    
-    # Remaining stock
-    total_stock = total_produced - total_shipped
-    
-    # Calculate cut products TOTAL QUANTITY (Üretim - Sevkiyat)
-    cut_products_list = await db.cut_products.find({}, {"_id": 0, "quantity": 1}).to_list(1000)
-    cut_products_produced = sum(int(cp.get("quantity", 0)) for cp in cut_products_list)
-    
-    # Kesilmiş ürün sevkiyatlarını düş
-    cut_shipments = [s for s in shipments if s.get("type") == "Kesilmiş"]
-    cut_products_shipped = sum(int(s.get("quantity", 0)) for s in cut_shipments)
-    
-    # Kalan kesilmiş ürün stoğu
-    cut_products_total = cut_products_produced - cut_products_shipped
-    
-    # Calculate material stocks (Giriş - Tüketim = Kalan)
-    # Get materials entries
-    materials = await db.materials.find({}, {"_id": 0}).to_list(1000)
-    
-    # Get daily consumption
-    consumptions = await db.daily_consumption.find({}, {"_id": 0}).to_list(1000)
-    
-    # Initialize material stocks
-    material_stocks = {
-        "gaz": 0.0,  # GAZ EKLENDİ!
-        "petkim": 0.0,
-        "estol": 0.0,
-        "talk": 0.0,
-        "masura100": 0,
-        "masura120": 0,
-        "masura150": 0,
-        "masura200": 0,
-        "sari": 0.0,
-    }
-    
-    # Add material entries (Giriş)
-    for mat in materials:
-        material_name = mat.get("material", "").upper()
-        quantity = float(mat.get("quantity", 0))
-        
-        if "GAZ" in material_name:
-            material_stocks["gaz"] += quantity
-        elif "PETKİM" in material_name or "PETKIM" in material_name:
-            material_stocks["petkim"] += quantity
-        elif "ESTOL" in material_name:
-            material_stocks["estol"] += quantity
-        elif "TALK" in material_name:
-            material_stocks["talk"] += quantity
-        elif "MASURA 100" in material_name:
-            material_stocks["masura100"] += int(quantity)
-        elif "MASURA 120" in material_name:
-            material_stocks["masura120"] += int(quantity)
-        elif "MASURA 150" in material_name:
-            material_stocks["masura150"] += int(quantity)
-        elif "MASURA 200" in material_name:
-            material_stocks["masura200"] += int(quantity)
-        elif "SARI" in material_name or "SARI" in material_name.upper():
-            material_stocks["sari"] += quantity
-    
-    # Subtract daily consumption (Çıkış) - YENİ: GAZ EKLENDİ
-    for consumption in consumptions:
-        gaz = float(consumption.get("gaz", 0))
-        petkim = float(consumption.get("petkim", 0))
-        estol = float(consumption.get("estol", 0))
-        talk = float(consumption.get("talk", 0))
-        
-        material_stocks["gaz"] -= gaz
-        material_stocks["petkim"] -= petkim
-        material_stocks["estol"] -= estol
-        material_stocks["talk"] -= talk
-    
-    # Subtract masura usage from productions
-    production_list = await db.productions.find({}, {"_id": 0, "masuraType": 1, "quantity": 1}).to_list(1000)
-    for prod in production_list:
-        masura_type = prod.get("masuraType", "")
-        quantity = int(prod.get("quantity", 0))
-        
-        if "100" in masura_type:
-            material_stocks["masura100"] -= quantity
-        elif "120" in masura_type:
-            material_stocks["masura120"] -= quantity
-        elif "150" in masura_type:
-            material_stocks["masura150"] -= quantity
-        elif "200" in masura_type:
-            material_stocks["masura200"] -= quantity
-    
-    # Round to 2 decimals for float values
-    material_stocks["petkim"] = round(material_stocks["petkim"], 2)
-    material_stocks["estol"] = round(material_stocks["estol"], 2)
-    material_stocks["talk"] = round(material_stocks["talk"], 2)
-    material_stocks["sari"] = round(material_stocks["sari"], 2)
-    
-    return {
-        "totalStock": total_stock,
-        "cutProducts": cut_products_total,
-        "productions": production_count,
-        "materials": {
-            "gaz": round(material_stocks["gaz"], 2),
-            "petkim": round(material_stocks["petkim"], 2),
-            "estol": round(material_stocks["estol"], 2),
-            "talk": round(material_stocks["talk"], 2),
-            "masura100": material_stocks["masura100"],
-            "masura120": material_stocks["masura120"],
-            "masura150": material_stocks["masura150"],
-            "masura200": material_stocks["masura200"],
-            "sari": round(material_stocks["sari"], 2),
-        },
-    }
+def _parse_day(value: Optional[str], name: str):
+    if value is None:
+        return None
+    try:
+        return stock_checkpoints.parse_day(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} tarihi YYYY-MM-DD formatında olmalı")
+
+@api_router.get("/stock/stats", response_model=StockStats, dependencies=[_conditional(*stock_ledger.TRACKED_COLLECTIONS)])
+async def get_stock_stats(asOf: Optional[str] = None):
+    as_of = _parse_day(asOf, "asOf")
+    if as_of:
+        # En yakın kontrol noktası + sonraki hareketler
+        return await stock_checkpoints.stats_as_of(db, as_of)
+
+    # Stok defterinden tek okuma (bakiyeler yazma işlemlerinde $inc ile güncellenir)
+    balances = await stock_ledger.get_balances(db)
+    return stock_ledger.stats_from_balances(balances)
 
 
 # ===== Cut Products Routes =====
-@api_router.get("/cut-products")
-async def get_cut_products():
-    cut_products = await db.cut_products.find({}, {"_id": 0}).to_list(1000)
-    return cut_products
+@api_router.get("/cut-products", dependencies=[_conditional("cut_products")])
+async def get_cut_products(response: Response, params: ListParams = Depends()):
+    return await _list_documents("cut_products", response, params)
 
 @api_router.post("/cut-products")
 async def create_cut_product(data: dict, _: bool = Depends(check_admin_role)):
+    _numbers("cut_products", data)
     data['id'] = str(uuid.uuid4())
     await db.cut_products.insert_one(data)
+    await record_change(db, "cut_products", after=data)
     return {"message": "Created", "id": data['id']}
 
+@api_router.post("/cut-products/bulk")
+async def bulk_cut_products(request: BulkRequest, _: bool = Depends(check_admin_role)):
+    return await _bulk_documents("cut_products", request)
+
+@api_router.put("/cut-products/{id}")
+async def update_cut_product(id: str, data: dict, _: bool = Depends(check_admin_role)):
+    if not await _update_document("cut_products", id, data):
+        raise HTTPException(status_code=404, detail="Not found")
+    return {"message": "Updated"}
+
 @api_router.delete("/cut-products/{id}")
 async def delete_cut_product(id: str, _: bool = Depends(check_admin_role)):
-    result = await db.cut_products.delete_one({"id": id})
-    if result.deleted_count == 0:
+    if not await _delete_document("cut_products", id):
         raise HTTPException(status_code=404, detail="Not found")
     return {"message": "Deleted"}
 
 # ===== Shipments Routes =====
-@api_router.get("/shipments")
-async def get_shipments():
-    shipments = await db.shipments.find({}, {"_id": 0}).to_list(1000)
-    return shipments
+@api_router.get("/shipments", dependencies=[_conditional("shipments")])
+async def get_shipments(response: Response, params: ListParams = Depends()):
+    return await _list_documents("shipments", response, params)
 
 @api_router.post("/shipments")
 async def create_shipment(data: dict, _: bool = Depends(check_admin_role)):
+    _numbers("shipments", data)
     data['id'] = str(uuid.uuid4())
     await db.shipments.insert_one(data)
+    await record_change(db, "shipments", after=data)
     return {"message": "Created", "id": data['id']}
 
+@api_router.post("/shipments/bulk")
+async def bulk_shipments(request: BulkRequest, _: bool = Depends(check_admin_role)):
+    return await _bulk_documents("shipments", request)
+
+@api_router.put("/shipments/{id}")
+async def update_shipment(id: str, data: dict, _: bool = Depends(check_admin_role)):
+    if not await _update_document("shipments", id, data):
+        raise HTTPException(status_code=404, detail="Not found")
+    return {"message": "Updated"}
+
 @api_router.delete("/shipments/{id}")
 async def delete_shipment(id: str, _: bool = Depends(check_admin_role)):
-    result = await db.shipments.delete_one({"id": id})
-    if result.deleted_count == 0:
+    if not await _delete_document("shipments", id):
         raise HTTPException(status_code=404, detail="Not found")
     return {"message": "Deleted"}
 
-@api_router.get("/materials")
-async def get_materials():
-    materials = await db.materials.find({}, {"_id": 0}).to_list(1000)
-    return materials
+@api_router.get("/materials", dependencies=[_conditional("materials")])
+async def get_materials(response: Response, params: ListParams = Depends()):
+    return await _list_documents("materials", response, params)
 
 @api_router.post("/materials")
 async def create_material(data: dict, _: bool = Depends(check_admin_role)):
+    _numbers("materials", data)
     data['id'] = str(uuid.uuid4())
     await db.materials.insert_one(data)
+    await record_change(db, "materials", after=data)
     return {"message": "Created", "id": data['id']}
 
-@api_router.get("/daily-consumption")
-async def get_daily_consumption():
-    consumptions = await db.daily_consumption.find({}, {"_id": 0}).to_list(1000)
-    return consumptions
+@api_router.post("/materials/bulk")
+async def bulk_materials(request: BulkRequest, _: bool = Depends(check_admin_role)):
+    return await _bulk_documents("materials", request)
+
+@api_router.put("/materials/{id}")
+async def update_material(id: str, data: dict, _: bool = Depends(check_admin_role)):
+    if not await _update_document("materials", id, data):
+        raise HTTPException(status_code=404, detail="Not found")
+    return {"message": "Updated"}
+
+@api_router.delete("/materials/{id}")
+async def delete_material(id: str, _: bool = Depends(check_admin_role)):
+    if not await _delete_document("materials", id):
+        raise HTTPException(status_code=404, detail="Not found")
+    return {"message": "Deleted"}
+
+@api_router.get("/daily-consumption", dependencies=[_conditional("daily_consumption")])
+async def get_daily_consumption(response: Response, params: ListParams = Depends()):
+    return await _list_documents("daily_consumption", response, params)
 
 @api_router.post("/daily-consumption")
 async def create_daily_consumption(data: dict, _: bool = Depends(check_admin_role)):
+    _numbers("daily_consumption", data)
     data['id'] = str(uuid.uuid4())
     await db.daily_consumption.insert_one(data)
+    await record_change(db, "daily_consumption", after=data)
     return {"message": "Created", "id": data['id']}
 
-@api_router.get("/cost-analysis")
-async def get_cost_analysis():
-    """Üretim satırı bazında gerçek maliyet analizi - Makine bazında doğru hesaplama"""
-    
-    # 1. Tüm üretim kayıtlarını al
-    productions = await db.productions.find({}, {"_id": 0}).to_list(1000)
-    
-    # 2. Günlük tüketim verilerini al
-    consumptions = await db.daily_consumption.find({}, {"_id": 0}).to_list(1000)
-    
-    # 3. Hammadde fiyatlarını ve döviz kurlarını al
-    materials = await db.materials.find({}, {"_id": 0}).to_list(1000)
-    exchange_rates = await db.exchange_rates.find_one({}, {"_id": 0})
-    
-    usd_rate = float(exchange_rates.get('usd', 1)) if exchange_rates else 1
-    eur_rate = float(exchange_rates.get('eur', 1)) if exchange_rates else 1
-    
-    # Hammadde birim fiyatları (TL'ye çevrilmiş)
-    material_prices = {
-        'petkim': 0, 'estol': 0, 'talk': 0, 'gaz': 0
+@api_router.post("/daily-consumption/bulk")
+async def bulk_daily_consumption(request: BulkRequest, _: bool = Depends(check_admin_role)):
+    return await _bulk_documents("daily_consumption", request)
+
+@api_router.put("/daily-consumption/{id}")
+async def update_daily_consumption(id: str, data: dict, _: bool = Depends(check_admin_role)):
+    if not await _update_document("daily_consumption", id, data):
+        raise HTTPException(status_code=404, detail="Not found")
+    return {"message": "Updated"}
+
+@api_router.delete("/daily-consumption/{id}")
+async def delete_daily_consumption(id: str, _: bool = Depends(check_admin_role)):
+    if not await _delete_document("daily_consumption", id):
+        raise HTTPException(status_code=404, detail="Not found")
+    return {"message": "Deleted"}
+
+@api_router.get("/cost-analysis", dependencies=[_conditional(*cost_analysis_cache.collections)])
+async def get_cost_analysis(
+    response: Response,
+    dateFrom: Optional[str] = None,
+    dateTo: Optional[str] = None,
+    machine: Optional[str] = None,
+    thickness: Optional[str] = None,
+    color: Optional[str] = None,
+    masuraType: Optional[str] = None,
+    sort: str = "-date",
+    limit: Optional[int] = Query(None, ge=1, le=pagination.MAX_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    """
+    Üretim satırı bazında gerçek maliyet analizi - Makine bazında doğru hesaplama
+    Tarih aralığı, makine, kalınlık, renk ve masura tipine göre süzülebilir.
+    limit verilirse sonraki sayfanın imleci X-Next-Cursor başlığında döner.
+    fields verilirse satırlarda yalnızca o alanlar döner.
+    """
+    selected = None
+    if fields:
+        selected = [name.strip() for name in fields.split(",") if name.strip()]
+        invalid = [name for name in selected if name not in cost_engine.ROW_FIELDS]
+        if invalid or not selected:
+            raise HTTPException(status_code=400, detail=f"Geçersiz alan: {', '.join(invalid) or fields}")
+
+    params = {
+        "date_from": _parse_day(dateFrom, "dateFrom"),
+        "date_to": _parse_day(dateTo, "dateTo"),
+        "machine": machine,
+        "filters": {"thickness": thickness, "color": color, "masuraType": masuraType},
+        "sort": sort,
+        "limit": limit,
+        "cursor": cursor,
     }
-    masura_prices = {}  # Her masura tipi için ayrı fiyat
-    
-    for mat in materials:
-        name = mat.get('material', '').upper()
-        price = float(mat.get('unitPrice', 0))
-        currency = mat.get('currency', 'TL')
-        
-        # Dövizi TL'ye çevir
-        if currency == 'USD':
-            price_tl = price * usd_rate
-        elif currency == 'EUR':
-            price_tl = price * eur_rate
-        else:
-            price_tl = price
-        
-        if 'PETK' in name or 'PETKİM' in name:
-            material_prices['petkim'] = price_tl
-        elif 'ESTOL' in name:
-            material_prices['estol'] = price_tl
-        elif 'TALK' in name:
-            material_prices['talk'] = price_tl
-        elif 'GAZ' in name:
-            material_prices['gaz'] = price_tl
-        elif 'MASURA' in name:
-            # Masura tipine göre fiyatları kaydet
-            masura_prices[mat.get('material', '')] = price_tl
-    
-    # 4. Tarihe ve makineye göre günlük tüketimi grupla
-    # Petkim, Estol, Talk → Makine bazında
-    # Gaz → O günün toplam gazını tüm makinelere dağıtacağız
-    consumption_by_date_machine = {}
-    total_gaz_by_date = {}  # Tarihe göre toplam gaz
-    
-    for cons in consumptions:
-        date = cons.get('date')
-        machine = cons.get('machine')
-        key = f"{date}_{machine}"
-        
-        if key not in consumption_by_date_machine:
-            consumption_by_date_machine[key] = {
-                'petkim': 0, 'estol': 0, 'talk': 0, 'gaz': 0
-            }
-        
-        # Petkim, Estol, Talk makine bazında topla
-        consumption_by_date_machine[key]['petkim'] += float(cons.get('petkim', 0))
-        consumption_by_date_machine[key]['estol'] += float(cons.get('estol', 0))
-        consumption_by_date_machine[key]['talk'] += float(cons.get('talk', 0))
-        
-        # Gaz'ı tarihe göre topla (tüm makineler için toplam)
-        if date not in total_gaz_by_date:
-            total_gaz_by_date[date] = 0
-        total_gaz_by_date[date] += float(cons.get('gaz', 0))
-    
-    # 5. Tarihe ve makineye göre toplam m² hesapla (gaz dağıtımı için gerekli)
-    total_m2_by_date_machine = {}
-    total_m2_by_date = {}  # O günün tüm makinelerindeki toplam m²
-    
-    for prod in productions:
-        date = prod.get('date')
-        machine = prod.get('machine')
-        m2 = float(prod.get('m2', 0))
-        
-        key = f"{date}_{machine}"
-        if key not in total_m2_by_date_machine:
-            total_m2_by_date_machine[key] = 0
-        total_m2_by_date_machine[key] += m2
-        
-        if date not in total_m2_by_date:
-            total_m2_by_date[date] = 0
-        total_m2_by_date[date] += m2
-    
-    # 6. Her üretim satırı için maliyet hesapla
-    cost_analysis = []
-    for prod in productions:
-        date = prod.get('date')
-        machine = prod.get('machine')
-        m2 = float(prod.get('m2', 0))
-        quantity = int(prod.get('quantity', 0))
-        
-        key = f"{date}_{machine}"
-        
-        # Bu tarih-makine için günlük tüketim
-        daily_cons = consumption_by_date_machine.get(key, {'petkim': 0, 'estol': 0, 'talk': 0, 'gaz': 0})
-        total_m2_machine = total_m2_by_date_machine.get(key, 1)
-        
-        # Bu üretimin payı (aynı makine içindeki ürünler arasında m²'ye göre)
-        if total_m2_machine > 0:
-            ratio = m2 / total_m2_machine
-        else:
-            ratio = 0
-        
-        # Petkim, Estol, Talk → Makine bazında dağıt
-        prod_petkim = daily_cons.get('petkim', 0) * ratio
-        prod_estol = daily_cons.get('estol', 0) * ratio
-        prod_talk = daily_cons.get('talk', 0) * ratio
-        
-        # Gaz → O günün TÜM makineleri arasında m²'ye göre dağıt
-        total_gaz_day = total_gaz_by_date.get(date, 0)
-        total_m2_day = total_m2_by_date.get(date, 1)
-        
-        if total_m2_day > 0:
-            gaz_ratio = m2 / total_m2_day
-        else:
-            gaz_ratio = 0
-        
-        prod_gaz = total_gaz_day * gaz_ratio
-        
-        # Hammadde maliyeti
-        material_cost = (
-            prod_petkim * material_prices['petkim'] +
-            prod_estol * material_prices['estol'] +
-            prod_talk * material_prices['talk'] +
-            prod_gaz * material_prices['gaz']
+    # Kaynak koleksiyonlar değişmediyse önbellekteki sonuç döner
+    key = json.dumps(params, sort_keys=True)
+    try:
+        rows, next_cursor = await cost_analysis_cache.get_or_compute(
+            db, key, lambda: cost_partitions.query_rows(db, **params)
         )
-        
-        # Masura maliyeti (Bu üretim satırının masura tipine göre!)
-        masura_type = prod.get('masuraType', '').upper().strip()
-        masura_unit_price = 0
-        
-        # Masura fiyatını bul (büyük/küçük harf duyarsız)
-        for masura_name, masura_price in masura_prices.items():
-            if masura_name.upper().strip() == masura_type:
-                masura_unit_price = masura_price
-                break
-        
-        masura_cost = quantity * masura_unit_price
-        
-        # Toplam maliyet
-        total_cost = material_cost + masura_cost
-        
-        # Birim maliyetler
-        unit_cost = total_cost / quantity if quantity > 0 else 0
-        m2_cost = total_cost / m2 if m2 > 0 else 0
-        
-        cost_analysis.append({
-            'id': prod.get('id', ''),
-            'date': date,
-            'machine': machine,
-            'thickness': prod.get('thickness', ''),
-            'width': int(prod.get('width', 0)),
-            'length': int(prod.get('length', 0)),
-            'm2': round(m2, 2),
-            'quantity': quantity,
-            'masuraType': prod.get('masuraType', ''),
-            'color': prod.get('color', ''),
-            'petkim': round(prod_petkim, 2),
-            'estol': round(prod_estol, 2),
-            'talk': round(prod_talk, 2),
-            'gaz': round(prod_gaz, 2),
-            'materialCost': round(material_cost, 2),
-            'masuraCost': round(masura_cost, 2),
-            'totalCost': round(total_cost, 2),
-            'unitCost': round(unit_cost, 2),
-            'm2Cost': round(m2_cost, 2),
-        })
-    
-    # Tarihe göre sırala (en yeni önce)
-    cost_analysis.sort(key=lambda x: x['date'], reverse=True)
-    
-    return cost_analysis
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    if selected:
+        rows = [{name: row[name] for name in selected} for row in rows]
+    return _trusted_json(rows, response)
+
+@api_router.get("/cost-analysis/rollup", dependencies=[_conditional(*cost_analysis_cache.collections)])
+async def get_cost_rollup(
+    response: Response,
+    groupBy: str = "month",
+    dateFrom: Optional[str] = None,
+    dateTo: Optional[str] = None,
+    machine: Optional[str] = None,
+):
+    """
+    Maliyet toplamları - groupBy: date, month, machine, thickness, width, length, color
+    (virgülle birden fazla boyut; boş ise genel toplam)
+    """
+    try:
+        dimensions = cost_rollups.parse_group_by(groupBy)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    date_from = _parse_day(dateFrom, "dateFrom")
+    date_to = _parse_day(dateTo, "dateTo")
+
+    async def compute():
+        await cost_partitions.ensure_current(db)
+        return await cost_rollups.query(db, dimensions, date_from, date_to, machine)
+
+    key = json.dumps(["rollup", dimensions, date_from, date_to, machine])
+    return _trusted_json(await cost_analysis_cache.get_or_compute(db, key, compute), response)
+
+@api_router.post("/cost-analysis/simulate")
+async def simulate_cost_analysis(request: CostSimulationRequest):
+    """
+    Fiyat / kur senaryolarının maliyete etkisi (kayıtlı veri değişmez)
+    Her senaryo için mevcut duruma göre toplamlar ve SKU bazında birim maliyet farkları döner.
+    """
+    if not request.scenarios:
+        raise HTTPException(status_code=400, detail="En az bir senaryo gerekli")
+    if len(request.scenarios) > cost_simulation.MAX_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"En fazla {cost_simulation.MAX_SCENARIOS} senaryo gönderilebilir")
+
+    scenarios = []
+    for scenario in request.scenarios:
+        data = scenario.model_dump()
+        data["dateFrom"] = _parse_day(scenario.dateFrom, "dateFrom")
+        data["dateTo"] = _parse_day(scenario.dateTo, "dateTo")
+        scenarios.append(data)
+    try:
+        return await cost_simulation.simulate(db, scenarios)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @api_router.post("/cost-analysis")
 async def create_cost_analysis(data: dict, _: bool = Depends(check_admin_role)):
@@ -564,16 +676,15 @@ async def create_cost_analysis(data: dict, _: bool = Depends(check_admin_role)):
     await db.cost_analysis.insert_one(data)
     return {"message": "Created", "id": data['id']}
 
-@api_router.get("/users")
-async def get_users():
-    users = await db.users.find({}, {"_id": 0, "password": 0}).to_list(1000)
-    return users
+@api_router.get("/users", dependencies=[_conditional("users")])
+async def get_users(response: Response, params: ListParams = Depends()):
+    return await _list_documents("users", response, params)
 
 @api_router.delete("/users/{user_id}")
 async def delete_user(user_id: str, _: bool = Depends(check_admin_role)):
-    result = await db.users.delete_one({"id": user_id})
-    if result.deleted_count == 0:
+    if not await _delete_document("users", user_id):
         raise HTTPException(status_code=404, detail="User not found")
+    token_verifier.invalidate_versions()
     return {"message": "User deleted"}
 
 @api_router.put("/users/change-password")
@@ -590,75 +701,110 @@ async def change_password(data: dict, _: bool = Depends(check_admin_role)):
     # Kullanıcıyı bul ve şifreyi güncelle
     result = await db.users.update_one(
         {"username": username},
-        {"$set": {"password": new_password}}
+        # Şifre değişince kullanıcının mevcut oturumları kapanır
+        {"$set": {"password": await passwords.hash_password(new_password)}, "$inc": {"tokenVersion": 1}}
     )
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="User not found or password unchanged")
+    await record_change(db, "users")
+    token_verifier.invalidate_versions()
     
     return {"message": "Password changed successfully"}
 
 @api_router.get("/excel-viewer")
 async def get_excel_data():
-    """Excel dosyasını okuyup JSON olarak döndür"""
-    import pandas as pd
-    
+    """
+    Excel dosyasını okuyup JSON olarak döndür. Ayrıştırılmış sayfalar önbellekte
+    tutulur; dosya değişmediyse yeniden okunmaz (okuma Excel iş havuzunda yapılır).
+    """
     try:
-        excel_file = "/tmp/SAR-2025-Original.xlsx"
-        
-        # Excel'i oku
-        xls = pd.ExcelFile(excel_file)
-        
-        result = {
-            "sheets": [],
-            "filename": "SAR-2025.xlsx"
-        }
-        
-        # Her sheet'i oku
-        for sheet_name in xls.sheet_names:
-            df = pd.read_excel(excel_file, sheet_name=sheet_name)
-            
-            # DataFrame'i dictionary'e çevir
-            sheet_data = {
-                "name": sheet_name,
-                "columns": df.columns.tolist(),
-                "data": df.values.tolist()
-            }
-            
-            result["sheets"].append(sheet_data)
-        
-        return result
+        workbook = await excel_viewer.get_workbook(worker_pools.excel_pool)
+        return Response(content=workbook.body(), media_type="application/json")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Excel dosyası bulunamadı")
+    except worker_pools.PoolBusy:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Excel okuma hatası: {str(e)}")
 
+async def _excel_workbook():
+    try:
+        return await excel_viewer.get_workbook(worker_pools.excel_pool)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Excel dosyası bulunamadı")
+
+@api_router.get("/excel-viewer/sheets")
+async def get_excel_sheets():
+    """Sayfa listesi: ad, sütunlar, sütun tipleri ve satır sayısı (satırlar olmadan)"""
+    workbook = await _excel_workbook()
+    return workbook.metadata()
+
+@api_router.get("/excel-viewer/sheets/{name}")
+async def get_excel_sheet_rows(
+    name: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=pagination.MAX_LIMIT),
+    q: Optional[str] = None,
+):
+    """Sayfa satırlarından bir pencere; q verilirse sunucu tarafında arama yapılır"""
+    workbook = await _excel_workbook()
+    sheet = workbook.sheet(name)
+    if sheet is None:
+        raise HTTPException(status_code=404, detail="Sayfa bulunamadı")
+    positions = await workbook.search(sheet, q) if q else None
+    return ORJSONResponse(workbook.window(sheet, offset, limit, positions))
+
 @api_router.get("/download-excel")
 async def download_excel():
     """Orijinal Excel dosyasını indir"""
     from fastapi.responses import FileResponse
     import os
     
-    excel_file = "/tmp/SAR-2025-Original.xlsx"
+    excel_file = excel_viewer.EXCEL_FILE
     
     if not os.path.exists(excel_file):
         raise HTTPException(status_code=404, detail="Excel dosyası bulunamadı")
     
     return FileResponse(
         path=excel_file,
-        filename="SAR-2025.xlsx",
+        filename=excel_viewer.DOWNLOAD_NAME,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
 
-@api_router.get("/exchange-rates")
-async def get_exchange_rates():
+@api_router.get("/exchange-rates", dependencies=[_conditional("exchange_rates")])
+async def get_exchange_rates(date: Optional[str] = None):
+    """Güncel kur; date=YYYY-MM-DD verilirse o tarihte geçerli kur"""
+    day = _parse_day(date, "date")
+    if day:
+        history = await exchange_rate_history.load(db)
+        rate = history.rate_on(day)
+        if rate:
+            return {"usd": rate["usd"], "eur": rate["eur"], "date": rate["date"]}
+        return {"usd": 42.00, "eur": 48.00}
+
     rate = await db.exchange_rates.find_one({}, {"_id": 0})
     if rate:
-        return {"usd": rate.get('usd', 0), "eur": rate.get('eur', 0), "lastUpdated": rate.get('lastUpdated', '')}
+        return {"usd": rate.get('usd', 0), "eur": rate.get('eur', 0), "date": rate.get('date', ''), "lastUpdated": rate.get('lastUpdated', '')}
     return {"usd": 42.00, "eur": 48.00}
 
+@api_router.get("/exchange-rates/history", dependencies=[_conditional("exchange_rates")])
+async def get_exchange_rate_history():
+    history = await exchange_rate_history.load(db)
+    return history.entries
+
 @api_router.put("/exchange-rates")
 async def update_exchange_rates(data: dict, _: bool = Depends(check_admin_role)):
-    data['lastUpdated'] = datetime.now(timezone.utc).isoformat()
-    await db.exchange_rates.update_one({}, {"$set": data}, upsert=True)
+    """Yeni kur girişi; date verilmezse bugünden itibaren geçerli"""
+    day = _parse_day(data.get('date'), "date") or datetime.now(timezone.utc).date().isoformat()
+    try:
+        usd = float(data['usd'])
+        eur = float(data['eur'])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="usd ve eur sayısal olmalı")
+
+    before, after = await exchange_rate_history.append(db, usd, eur, day)
+    await record_change(db, "exchange_rates", before=before, after=after)
     return {"message": "Updated"}
 
 
@@ -667,174 +813,95 @@ async def update_exchange_rates(data: dict, _: bool = Depends(check_admin_role))
 async def root():
     return {"message": "SAR Ambalaj API v1.0"}
 
+@api_router.get("/metrics")
+async def get_metrics():
+    """Önbellek isabet/ıskalama sayaçları ve iş havuzlarının doluluğu"""
+    return {
+        "caches": {
+            "costAnalysis": cost_analysis_cache.stats(),
+            "tokens": token_verifier.stats(),
+        },
+        "pools": worker_pools.stats(),
+    }
+
 # ===== Stock Routes =====
-@api_router.get("/stock")
-async def get_stock():
+@api_router.get("/stock", dependencies=[_conditional("productions", "shipments", "cut_products")])
+async def get_stock(response: Response, asOf: Optional[str] = None):
     """
     Dinamik stok hesaplama:
     Stok = Üretim - Sevkiyat
     Ürün tipine, kalınlığa, ene, metreye, renge göre gruplandırılmış
+    asOf=YYYY-MM-DD verilirse o gün sonundaki stok döner
     """
+    as_of = _parse_day(asOf, "asOf")
     try:
-        # 1. Tüm üretim kayıtlarını al
-        productions = await db.productions.find({}).to_list(None)
-        
-        # 2. Tüm sevkiyat kayıtlarını al
-        shipments = await db.shipments.find({}).to_list(None)
-        
-        # 3. Üretim verilerini grupla
-        production_groups = {}
-        for prod in productions:
-            thickness = prod.get('thickness', '')
-            width = prod.get('width', '')
-            length = prod.get('length', '')
-            color = prod.get('color', '')
-            
-            # Key oluştur: kalınlık_en_metre_renk
-            key = f"{thickness}_{width}_{length}_{color}"
-            
-            if key not in production_groups:
-                production_groups[key] = {
-                    'type': 'Normal',
-                    'thickness': thickness,
-                    'width': width,
-                    'length': length,
-                    'color': color,
-                    'colorCategory': prod.get('colorCategory', 'Doğal'),
-                    'm2': prod.get('m2', 0),
-                    'quantity': 0
-                }
-            
-            production_groups[key]['quantity'] += prod.get('quantity', 0)
-        
-        # 4. Sevkiyat verilerini grupla
-        shipment_groups = {}
-        for ship in shipments:
-            # Sevkiyat size'ından kalınlık, en, metre çıkar
-            size = ship.get('size', '')
-            ship_type = ship.get('type', 'Normal')
-            color = ship.get('color', '')
-            
-            # Size parsing: "2mm x 100cm x 300m" veya "1.8mm x 50cm x 137.5cm"
-            parts = size.split(' x ')
-            if len(parts) >= 3:
-                thickness_raw = parts[0].replace('mm', '').strip()
-                width_raw = parts[1].replace('cm', '').strip()
-                length_raw = parts[2].replace('m', '').replace('cm', '').strip()  # m veya cm'yi temizle
-                
-                # Üretimde thickness "2 mm" formatında
-                thickness = f"{thickness_raw} mm"
-                width = width_raw
-                length = length_raw
-                
-                # Key oluştur - üretimle aynı format
-                key = f"{thickness}_{width}_{length}_{color}"
-                
-                if key not in shipment_groups:
-                    shipment_groups[key] = 0
-                
-                shipment_groups[key] += int(ship.get('quantity', 0))
-        
-        # 5. Stok hesapla (Üretim - Sevkiyat)
-        stock_items = []
-        for key, prod_data in production_groups.items():
-            quantity = prod_data['quantity']
-            
-            # Sevkiyatı düş
-            if key in shipment_groups:
-                quantity -= shipment_groups[key]
-            
-            # Sadece stokta olan veya negatif olanları göster
-            if quantity != 0:
-                stock_items.append({
-                    'type': prod_data['type'],
-                    'thickness': prod_data['thickness'],
-                    'width': prod_data['width'],
-                    'length': prod_data['length'],
-                    'color': prod_data['color'],
-                    'colorCategory': prod_data['colorCategory'],
-                    'm2': prod_data['m2'],
-                    'quantity': quantity
-                })
-        
-        # 6. Kesilmiş ürünleri ekle
-        cut_products = await db.cut_products.find({}).to_list(None)
-        cut_groups = {}
-        
-        for cut in cut_products:
-            cut_size = cut.get('cutSize', '')
-            color = cut.get('color', '')
-            
-            key = f"cut_{cut_size}_{color}"
-            
-            if key not in cut_groups:
-                # cutSize parsing: "1.8mm x 50cm x 137.5cm"
-                parts = cut_size.split(' x ')
-                if len(parts) >= 3:
-                    cut_groups[key] = {
-                        'type': 'Kesilmiş',
-                        'thickness': parts[0].replace('mm', '').strip(),
-                        'width': parts[1].replace('cm', '').strip(),
-                        'length': parts[2].strip(),
-                        'color': color,
-                        'colorCategory': cut.get('colorCategory', 'Doğal'),
-                        'm2': 0.69,  # Kesilmiş ürün m2
-                        'quantity': 0
-                    }
-            
-            cut_groups[key]['quantity'] += int(cut.get('quantity', 0))
-        
-        # Kesilmiş ürün sevkiyatlarını düş
-        for ship in shipments:
-            if ship.get('type') == 'Kesilmiş':
-                size = ship.get('size', '')
-                color = ship.get('color', '')
-                key = f"cut_{size}_{color}"
-                
-                if key in cut_groups:
-                    cut_groups[key]['quantity'] -= int(ship.get('quantity', 0))
-        
-        # Kesilmiş ürünleri stock_items'a ekle
-        for cut_data in cut_groups.values():
-            if cut_data['quantity'] != 0:
-                stock_items.append(cut_data)
-        
-        # 7. Sırala (önce tip, sonra kalınlık)
-        def safe_float(val):
-            try:
-                # "2 mm" -> "2" -> 2.0
-                return float(str(val).replace(' mm', '').replace('mm', '').strip())
-            except:
-                return 0.0
-        
-        def safe_int(val):
-            try:
-                return int(str(val).strip())
-            except:
-                return 0
-        
-        stock_items.sort(key=lambda x: (
-            0 if x['type'] == 'Normal' else 1,
-            safe_float(x.get('thickness', '')),
-            safe_int(x.get('width', ''))
-        ))
-        
-        return stock_items
-        
+        if as_of:
+            # En yakın kontrol noktası + sonraki hareketler
+            return _trusted_json(await stock_checkpoints.stock_as_of(db, as_of), response)
+
+        # Gruplama, sevkiyat ve kesilmiş ürün düşümü MongoDB tarafında yapılır
+        return _trusted_json(await db.productions.aggregate(stock_pipeline()).to_list(None), response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# ===== Export Routes =====
+@api_router.get("/export/{resource}.{fmt}")
+async def export_resource(
+    resource: str,
+    fmt: str,
+    request: Request,
+    response: Response,
+    dateFrom: Optional[str] = None,
+    dateTo: Optional[str] = None,
+):
+    """
+    Koleksiyonu veya raporu XLSX / CSV dosyası olarak indir (SAR-2025-Veriler.xlsx sayfa düzeniyle)
+    resource: productions, cut-products, shipments, materials, daily-consumption, stock, cost-analysis
+    Satırlar veritabanından okundukça yazılır; dateFrom / dateTo stok dışındaki kaynakları süzer.
+    """
+    if resource not in exports.EXPORTS or fmt not in exports.FORMATS:
+        raise HTTPException(status_code=404, detail="Not found")
+    date_from = _parse_day(dateFrom, "dateFrom")
+    date_to = _parse_day(dateTo, "dateTo")
+    await etags.check(db, exports.source_collections(resource), request, response)
+
+    result = StreamingResponse(
+        exports.chunks(db, resource, fmt, date_from, date_to),
+        media_type=exports.FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{exports.filename(resource, fmt)}"'},
+    )
+    return _with_headers(result, response)
+
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.exception_handler(worker_pools.PoolBusy)
+async def pool_busy_handler(request: Request, exc: worker_pools.PoolBusy):
+    """İş havuzu kuyruğu doluysa 503 (istemci Retry-After sonra tekrar dener)"""
+    return ORJSONResponse(
+        {"detail": "Sunucu meşgul, lütfen tekrar deneyin"},
+        status_code=503,
+        headers={"Retry-After": "5"},
+    )
+
+# Idempotency-Key başlıklı yazma isteklerinin yanıtları saklanır, tekrarlar yeniden yürütülmez
+app.add_middleware(idempotency.IdempotencyMiddleware, db=db)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[pagination.NEXT_CURSOR_HEADER, "ETag", idempotency.REPLAYED_HEADER],
 )
 
+# Büyük yanıtlar istemcinin Accept-Encoding başlığına göre brotli veya gzip ile sıkıştırılır
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESS_MIN_SIZE)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_SIZE, compresslevel=6)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -842,6 +909,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def start_background_tasks():
+    await indexes.ensure_indexes(db)
+    await stock_ledger.ensure_built(db)
+    app.state.checkpoint_task = asyncio.create_task(stock_checkpoints.run_nightly(db))
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app.state.checkpoint_task.cancel()
+    worker_pools.shutdown()
     client.close()
\ No newline at end of file
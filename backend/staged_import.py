@@ -0,0 +1,185 @@
+"""
+Yükleme betikleri için hazırlık (staging) koleksiyonu üzerinden içe aktarma
+Yükleyiciler (import_excel_data.py, load_data.py, calculate_daily_consumption.py,
+calculate_materials.py) koleksiyonu silip yeniden yazmaz; yeni veri önce
+<koleksiyon>_staging koleksiyonuna yazılır. Böylece yükleme sürerken API boş veya
+yarım koleksiyon görmez.
+
+- sync (varsayılan): hazırlık koleksiyonu canlı veriyle doğal anahtara göre
+  (NATURAL_KEYS) karşılaştırılır; yalnızca değişen kayıtlar (id korunarak) içe
+  aktarılan belgeyle değiştirilir, yeniler eklenir, içe aktarımda olmayanlar
+  silinir. Değişmeyen kayıtlara (ve id'lerine) dokunulmaz; yazma ve türetilmiş
+  durum güncellemesi değişiklik sayısı kadardır.
+- swap (--swap): hazırlık koleksiyonuna indeksler kurulur ve renameCollection
+  (dropTarget) ile canlı koleksiyonun yerine tek adımda geçirilir; türetilmiş
+  durumlar sıfırdan hesaplanır.
+
+Aynı doğal anahtarlı birden fazla kayıt olabilir (aynı gün, aynı ölçüde iki üretim
+satırı); önce içeriği birebir aynı olanlar eşleştirilir, kalanlar sırayla
+güncelleme, ekleme veya silme olur.
+
+Döviz kurları bu yoldan yüklenmez; kur girişleri exchange_rate_history.append ile
+kur geçmişine eklenir.
+"""
+from pymongo import DeleteOne, InsertOne, ReplaceOne
+
+import indexes
+from derived_state import rebuild, record_changes
+
+STAGING_SUFFIX = "_staging"
+
+# Hazırlık koleksiyonuna ve canlı koleksiyona tek çağrıda yazılan belge / işlem sayısı
+WRITE_CHUNK_SIZE = 1000
+
+# Doğal anahtar alanları (koleksiyonda olmayan alan None sayılır)
+NATURAL_KEYS = {
+    "productions": ("date", "machine", "thickness", "width", "length", "color"),
+    "cut_products": ("date", "cutSize", "color"),
+    # Bir irsaliyede birden fazla ölçü olabilir; eski kayıtlarda numara waybill alanında
+    "shipments": ("waybillNo", "waybill", "size", "color"),
+    "materials": ("date", "material", "invoiceNo"),
+    "daily_consumption": ("date", "machine"),
+}
+
+# Karşılaştırmada yok sayılan alanlar (kimlik ve yükleme zamanı)
+IGNORED_FIELDS = {"_id", "id", "created_at", "createdAt", "lastUpdated"}
+
+# Değişen kayıt yerine yazılırken canlı kayıttan korunan alanlar
+KEPT_FIELDS = ("id", "created_at", "createdAt")
+
+
+def staging_name(collection):
+    return f"{collection}{STAGING_SUFFIX}"
+
+
+def _key(doc, fields):
+    return tuple(doc.get(field) for field in fields)
+
+
+def _content(doc):
+    return {field: value for field, value in doc.items() if field not in IGNORED_FIELDS}
+
+
+def _public(doc):
+    return None if doc is None else {field: value for field, value in doc.items() if field != "_id"}
+
+
+def _replacement(before, doc):
+    """Hazırlık belgesinin içeriği; kimlik ve oluşturma zamanı canlı kayıttan"""
+    kept = {field: before[field] for field in KEPT_FIELDS if field in before}
+    return {**_public(doc), **kept}
+
+
+async def _write_staging(db, collection, docs):
+    """Belgeleri boş hazırlık koleksiyonuna parça parça yaz; belge sayısı döner"""
+    staging = db[staging_name(collection)]
+    await staging.drop()
+    count = 0
+    chunk = []
+    for doc in docs:
+        chunk.append(doc)
+        if len(chunk) >= WRITE_CHUNK_SIZE:
+            await staging.insert_many(chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        await staging.insert_many(chunk)
+        count += len(chunk)
+    return count
+
+
+async def _diff(db, collection):
+    """Hazırlık ile canlı koleksiyon arasındaki farklar: (işlemler, değişiklikler, değişmeyen sayısı)"""
+    fields = NATURAL_KEYS[collection]
+    live = {}
+    async for doc in db[collection].find({}):
+        live.setdefault(_key(doc, fields), []).append(doc)
+
+    # Önce birebir aynı kayıtlar eşleştirilir; kalanlar anahtar bazında bekletilir
+    pending = {}
+    unchanged = 0
+    async for doc in db[staging_name(collection)].find({}):
+        key = _key(doc, fields)
+        content = _content(doc)
+        candidates = live.get(key, [])
+        match = next((i for i, old in enumerate(candidates) if _content(old) == content), None)
+        if match is None:
+            pending.setdefault(key, []).append(doc)
+        else:
+            candidates.pop(match)
+            unchanged += 1
+
+    operations = []
+    changes = []
+    for key, docs in pending.items():
+        candidates = live.get(key, [])
+        for doc in docs:
+            if candidates:
+                before = candidates.pop(0)
+                # İçe aktarımda olmayan alanlar da kaldırılsın diye belge tümüyle değiştirilir
+                replacement = _replacement(before, doc)
+                operations.append(ReplaceOne({"_id": before["_id"]}, replacement))
+                changes.append((before, replacement))
+            else:
+                operations.append(InsertOne(doc))
+                changes.append((None, doc))
+    for candidates in live.values():
+        for before in candidates:
+            operations.append(DeleteOne({"_id": before["_id"]}))
+            changes.append((before, None))
+    return operations, changes, unchanged
+
+
+async def sync(db, collection, docs):
+    """
+    Belgeleri hazırlık koleksiyonu üzerinden canlı koleksiyona farkla uygula
+    {inserted, updated, deleted, unchanged} döner.
+    """
+    await _write_staging(db, collection, docs)
+    try:
+        operations, changes, unchanged = await _diff(db, collection)
+        for start in range(0, len(operations), WRITE_CHUNK_SIZE):
+            await db[collection].bulk_write(operations[start:start + WRITE_CHUNK_SIZE], ordered=False)
+        await record_changes(db, collection, [(_public(before), _public(after)) for before, after in changes])
+    finally:
+        await db[staging_name(collection)].drop()
+    return {
+        "inserted": sum(1 for before, _ in changes if before is None),
+        "updated": sum(1 for before, after in changes if before is not None and after is not None),
+        "deleted": sum(1 for _, after in changes if after is None),
+        "unchanged": unchanged,
+    }
+
+
+async def swap(db, collection, docs):
+    """
+    Belgeleri hazırlık koleksiyonuna yaz, indeksleri kur ve canlı koleksiyonun yerine
+    tek adımda geçir (tekil indeks kurulamazsa canlı koleksiyona dokunulmaz)
+    {loaded} döner.
+    """
+    count = await _write_staging(db, collection, docs)
+    staging = db[staging_name(collection)]
+    try:
+        if indexes.INDEXES.get(collection):
+            await staging.create_indexes(indexes.INDEXES[collection])
+    except Exception:
+        await staging.drop()
+        raise
+    await staging.rename(collection, dropTarget=True)
+    await rebuild(db, collection)
+    return {"loaded": count}
+
+
+async def load(db, collection, docs, replace=False):
+    """replace=True ise swap, değilse sync"""
+    if replace:
+        return await swap(db, collection, docs)
+    return await sync(db, collection, docs)
+
+
+def summary(result):
+    """Yükleme sonucunun kısa açıklaması"""
+    if "loaded" in result:
+        return f"{result['loaded']} kayıt yüklendi (koleksiyon değiştirildi)"
+    return (f"{result['inserted']} yeni, {result['updated']} güncellenen, "
+            f"{result['deleted']} silinen, {result['unchanged']} değişmeyen kayıt")
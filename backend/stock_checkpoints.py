@@ -0,0 +1,236 @@
+"""
+Günlük stok kontrol noktaları (stock_checkpoints)
+Her gün sonu için SKU grupları ve malzeme bakiyelerinin bir kopyası saklanır.
+Geçmiş bir tarihteki stok (?asOf=YYYY-MM-DD), o tarihten önceki en yakın kontrol
+noktasından başlayıp yalnızca sonraki günlerin hareketleri tekrar oynatılarak
+hesaplanır.
+
+Geriye dönük bir kayıt eklenir/değiştirilirse o tarih ve sonrasındaki kontrol
+noktaları silinir; bir sonraki gece (veya ilk sorguda) yeniden oluşturulur.
+Silme işlemi bir geçersizleştirme sayacını artırır; hesaplanırken sayaç değişen
+kontrol noktası saklanmaz. Tarihi olmayan kayıtlar en baştan itibaren sayılır.
+
+Kullanım:
+    python stock_checkpoints.py                    # Dünün kontrol noktasını oluştur
+    python stock_checkpoints.py --date 2025-10-31  # Belirli bir gün için oluştur
+"""
+import argparse
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+
+import stock_ledger
+from stock_pipeline import date_range_query, sku_group_pipeline
+
+CHECKPOINT_COLLECTION = "stock_checkpoints"
+STATE_COLLECTION = "stock_checkpoints_state"
+
+# Gece görevinin kontrol aralığı (saniye)
+NIGHTLY_INTERVAL = 3600
+
+logger = logging.getLogger(__name__)
+
+
+def parse_day(value):
+    """'YYYY-MM-DD' doğrula; geçersizse ValueError"""
+    return datetime.strptime(value, "%Y-%m-%d").date().isoformat()
+
+
+def _group_key(group_id):
+    return (group_id["type"], group_id["a"], group_id["b"], group_id["c"], group_id["d"])
+
+
+def _merge_groups(base, delta):
+    """Kontrol noktası gruplarına sonraki hareketlerin gruplarını ekle"""
+    merged = {_group_key(g["_id"]): dict(g) for g in base}
+    for group in delta:
+        key = _group_key(group["_id"])
+        current = merged.get(key)
+        if current is None:
+            merged[key] = dict(group)
+            continue
+        current["produced"] += group["produced"]
+        current["shipped"] += group["shipped"]
+        # Görüntü alanları ilk kaynak belgeden gelir
+        if group["hasSource"] and not current["hasSource"]:
+            for field in ("thickness", "width", "length", "color", "colorCategory", "m2"):
+                current[field] = group.get(field)
+        current["hasSource"] = current["hasSource"] or group["hasSource"]
+    return list(merged.values())
+
+
+async def _nearest_checkpoint(db, as_of):
+    return await db[CHECKPOINT_COLLECTION].find_one(
+        {"_id": {"$lte": as_of}}, sort=[("_id", -1)]
+    )
+
+
+async def compute_state(db, as_of):
+    """as_of gün sonundaki (SKU grupları, malzeme bakiyeleri)"""
+    checkpoint = await _nearest_checkpoint(db, as_of)
+    if checkpoint is not None and checkpoint["_id"] == as_of:
+        return checkpoint["groups"], checkpoint["balances"]
+
+    start = checkpoint["_id"] if checkpoint else None
+    base_groups = checkpoint["groups"] if checkpoint else []
+    base_balances = checkpoint["balances"] if checkpoint else stock_ledger.empty_balances()
+
+    # Yalnızca kontrol noktasından sonraki hareketler
+    delta_groups = await db.productions.aggregate(
+        sku_group_pipeline((start, as_of))
+    ).to_list(None)
+    delta_balances = await stock_ledger.compute_balances(db, date_range_query(start, as_of))
+
+    balances = {key: base_balances.get(key, 0) + delta_balances[key] for key in stock_ledger.LEDGER_KEYS}
+    return _merge_groups(base_groups, delta_groups), balances
+
+
+def _safe_float(value):
+    try:
+        return float(str(value).replace(' mm', '').replace('mm', '').strip())
+    except ValueError:
+        return 0.0
+
+
+def _safe_int(value):
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        return 0
+
+
+def stock_rows(groups):
+    """SKU gruplarını /api/stock satırlarına çevir (stock_pipeline.stock_rows_stages ile aynı kurallar)"""
+    rows = []
+    for group in groups:
+        quantity = group["produced"] - group["shipped"]
+        if not group["hasSource"] or quantity == 0:
+            continue
+        rows.append((group, {
+            "type": group["_id"]["type"],
+            "thickness": group.get("thickness"),
+            "width": group.get("width"),
+            "length": group.get("length"),
+            "color": group.get("color"),
+            "colorCategory": group.get("colorCategory"),
+            "m2": group.get("m2"),
+            "quantity": quantity,
+        }))
+    rows.sort(key=lambda item: (
+        0 if item[1]["type"] == "Normal" else 1,
+        _safe_float(item[1]["thickness"]),
+        _safe_int(item[1]["width"]),
+        tuple(str(part) for part in _group_key(item[0]["_id"])),
+    ))
+    return [row for _, row in rows]
+
+
+async def stock_as_of(db, as_of):
+    groups, _ = await compute_state(db, as_of)
+    return stock_rows(groups)
+
+
+async def stats_as_of(db, as_of):
+    _, balances = await compute_state(db, as_of)
+    return stock_ledger.stats_from_balances(balances)
+
+
+async def _generation(db):
+    doc = await db[STATE_COLLECTION].find_one({"_id": "generation"})
+    return doc["value"] if doc else 0
+
+
+async def build_checkpoint(db, day):
+    """
+    day gün sonu için kontrol noktasını oluştur (varsa üzerine yaz)
+    Hesaplama sırasında geriye dönük bir değişiklik kontrol noktalarını geçersiz
+    kıldıysa (geçersizleştirme sayacı değiştiyse) eski durum saklanmaz; None döner.
+    """
+    generation = await _generation(db)
+    groups, balances = await compute_state(db, day)
+    if await _generation(db) != generation:
+        return None
+    await db[CHECKPOINT_COLLECTION].replace_one(
+        {"_id": day},
+        {
+            "_id": day,
+            "groups": groups,
+            "balances": balances,
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+        },
+        upsert=True,
+    )
+    # Kontrol ile yazma arasında geçersizleştirme olduysa yazılan nokta silinir
+    if await _generation(db) != generation:
+        await db[CHECKPOINT_COLLECTION].delete_one({"_id": day})
+        return None
+    return day
+
+
+async def invalidate_from(db, day):
+    """
+    day ve sonrasındaki kontrol noktalarını sil (geriye dönük değişiklik)
+    Sayaç silmeden önce artırılır; o sırada hesaplanan kontrol noktası saklanmaz.
+    """
+    await db[STATE_COLLECTION].update_one({"_id": "generation"}, {"$inc": {"value": 1}}, upsert=True)
+    await db[CHECKPOINT_COLLECTION].delete_many({"_id": {"$gte": day}})
+
+
+async def apply_changes(db, collection, changes):
+    if collection not in stock_ledger.TRACKED_COLLECTIONS:
+        return
+    # Tarihi metin olmayan kayıtlar en başta sayılır (date_range_query); tüm
+    # kontrol noktalarını etkiler
+    days = [
+        doc["date"] if isinstance(doc.get("date"), str) else ""
+        for change in changes
+        for doc in change
+        if doc is not None
+    ]
+    if days:
+        await invalidate_from(db, min(days))
+
+
+async def run_nightly(db, interval=NIGHTLY_INTERVAL):
+    """Dünün kontrol noktası yoksa oluştur; belirli aralıklarla tekrar kontrol et"""
+    while True:
+        yesterday = (date.today() - timedelta(days=1)).isoformat()
+        try:
+            if await db[CHECKPOINT_COLLECTION].count_documents({"_id": yesterday}, limit=1) == 0:
+                if await build_checkpoint(db, yesterday):
+                    logger.info(f"Stok kontrol noktası oluşturuldu: {yesterday}")
+                else:
+                    logger.info(f"Stok kontrol noktası hesaplanırken veri değişti, sonraki kontrolde tekrar denenecek: {yesterday}")
+        except Exception:
+            logger.exception("Stok kontrol noktası oluşturulamadı")
+        await asyncio.sleep(interval)
+
+
+async def main():
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from dotenv import load_dotenv
+    from pathlib import Path
+    import os
+
+    parser = argparse.ArgumentParser(description="Günlük stok kontrol noktası oluştur")
+    parser.add_argument("--date", default=(date.today() - timedelta(days=1)).isoformat(),
+                        help="YYYY-MM-DD (varsayılan: dün)")
+    args = parser.parse_args()
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    try:
+        day = parse_day(args.date)
+        if await build_checkpoint(db, day):
+            print(f"✅ Stok kontrol noktası oluşturuldu: {day}")
+        else:
+            print(f"⚠️ Hesaplama sırasında veri değişti, kontrol noktası saklanmadı: {day}")
+            raise SystemExit(1)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,271 @@
+"""
+Stok defteri (stock_ledger)
+Her malzeme kodu, Normal rulo stoğu ve kesilmiş ürün stoğu için tek bir yürüyen
+bakiye tutar. API'deki yazma işlemleri bakiyeleri atomik $inc ile günceller,
+böylece /api/stock/stats tek bir okuma ile cevap verir.
+
+Defter kaynak verilerden bir kez oluşturulur ("built" işareti). İşaret yokken
+gelen ilk yazma farkları uygulamak yerine defteri sıfırdan oluşturur; böylece var
+olan bir veritabanında defter yalnızca değişen anahtarlarla kısmen oluşmaz.
+
+Kullanım:
+    python stock_ledger.py verify     # Defteri sıfırdan hesapla, farkları raporla
+    python stock_ledger.py rebuild    # Defteri sıfırdan hesapla ve üzerine yaz
+"""
+import argparse
+import asyncio
+from pymongo import UpdateOne, ReplaceOne
+
+LEDGER_COLLECTION = "stock_ledger"
+STATE_COLLECTION = "stock_ledger_state"
+
+# Defter yapısı değişince artırılır; eski yapıdaki defter yeniden oluşturulur
+BUILD_VERSION = 1
+
+MATERIAL_CODES = [
+    "gaz", "petkim", "estol", "talk",
+    "masura100", "masura120", "masura150", "masura200",
+    "sari",
+]
+MASURA_CODES = {"masura100", "masura120", "masura150", "masura200"}
+CONSUMED_MATERIALS = ["gaz", "petkim", "estol", "talk"]
+
+NORMAL_STOCK = "normalStock"
+CUT_STOCK = "cutStock"
+PRODUCTION_COUNT = "productions"
+
+LEDGER_KEYS = [NORMAL_STOCK, CUT_STOCK, PRODUCTION_COUNT] + MATERIAL_CODES
+
+# Defteri etkileyen koleksiyonlar
+TRACKED_COLLECTIONS = ["productions", "shipments", "cut_products", "materials", "daily_consumption"]
+
+# Drift karşılaştırmasında kayan nokta toleransı
+DRIFT_TOLERANCE = 1e-6
+
+
+def _number(value, kind=float):
+    """Sayıya çevrilemeyen değer (eski kayıtlardaki metin veya None) 0 sayılır"""
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return kind(0)
+
+
+def material_code(name):
+    """Hammadde adını defter koduna çevir (eşleşme yoksa None)"""
+    name = (name or "").upper()
+    if "GAZ" in name:
+        return "gaz"
+    if "PETKİM" in name or "PETKIM" in name:
+        return "petkim"
+    if "ESTOL" in name:
+        return "estol"
+    if "TALK" in name:
+        return "talk"
+    for size in ("100", "120", "150", "200"):
+        if f"MASURA {size}" in name:
+            return f"masura{size}"
+    if "SARI" in name:
+        return "sari"
+    return None
+
+
+def masura_code(masura_type):
+    """Üretimdeki masura tipini defter koduna çevir (eşleşme yoksa None)"""
+    masura_type = masura_type or ""
+    for size in ("100", "120", "150", "200"):
+        if size in masura_type:
+            return f"masura{size}"
+    return None
+
+
+def movement_deltas(collection, doc):
+    """Tek bir belgenin deftere katkısı: {anahtar: miktar}"""
+    deltas = {}
+
+    def add(key, amount):
+        deltas[key] = deltas.get(key, 0) + amount
+
+    if collection == "productions":
+        quantity = _number(doc.get("quantity", 0), int)
+        add(PRODUCTION_COUNT, 1)
+        add(NORMAL_STOCK, quantity)
+        code = masura_code(doc.get("masuraType", ""))
+        if code:
+            add(code, -quantity)
+    elif collection == "shipments":
+        ship_type = doc.get("type")
+        if ship_type == "Normal":
+            add(NORMAL_STOCK, -_number(doc.get("quantity", 0), int))
+        elif ship_type == "Kesilmiş":
+            add(CUT_STOCK, -_number(doc.get("quantity", 0), int))
+    elif collection == "cut_products":
+        add(CUT_STOCK, _number(doc.get("quantity", 0), int))
+    elif collection == "materials":
+        code = material_code(doc.get("material", ""))
+        if code:
+            quantity = _number(doc.get("quantity", 0))
+            add(code, int(quantity) if code in MASURA_CODES else quantity)
+    elif collection == "daily_consumption":
+        for code in CONSUMED_MATERIALS:
+            add(code, -_number(doc.get(code, 0)))
+    return deltas
+
+
+def change_deltas(collection, before=None, after=None):
+    """Bir değişikliğin (eski belge -> yeni belge) net etkisi"""
+    deltas = {}
+    if after is not None:
+        for key, amount in movement_deltas(collection, after).items():
+            deltas[key] = deltas.get(key, 0) + amount
+    if before is not None:
+        for key, amount in movement_deltas(collection, before).items():
+            deltas[key] = deltas.get(key, 0) - amount
+    return {key: amount for key, amount in deltas.items() if amount != 0}
+
+
+async def apply_deltas(db, deltas):
+    """Bakiyeleri atomik $inc ile güncelle"""
+    if not deltas:
+        return
+    await db[LEDGER_COLLECTION].bulk_write(
+        [UpdateOne({"_id": key}, {"$inc": {"balance": amount}}, upsert=True)
+         for key, amount in deltas.items()],
+        ordered=False,
+    )
+
+
+async def apply_changes(db, collection, changes):
+    """
+    [(eski, yeni), ...] değişikliklerini tek bir yazma ile deftere işle. Defter henüz
+    oluşturulmamışsa sıfırdan oluşturulur (yazma kaydedildiği için değişiklik dahildir).
+    """
+    if collection not in TRACKED_COLLECTIONS:
+        return
+    if not await is_built(db):
+        await rebuild(db)
+        return
+    total = {}
+    for before, after in changes:
+        for key, amount in change_deltas(collection, before, after).items():
+            total[key] = total.get(key, 0) + amount
+    await apply_deltas(db, {key: amount for key, amount in total.items() if amount != 0})
+
+
+def empty_balances():
+    return {key: 0 for key in LEDGER_KEYS}
+
+
+async def compute_balances(db, query=None):
+    """Defteri kaynak koleksiyonlardan sıfırdan hesapla"""
+    balances = empty_balances()
+    for collection in TRACKED_COLLECTIONS:
+        async for doc in db[collection].find(query or {}, {"_id": 0}):
+            for key, amount in movement_deltas(collection, doc).items():
+                balances[key] += amount
+    return balances
+
+
+async def is_built(db):
+    return await db[STATE_COLLECTION].count_documents({"_id": "built", "value": BUILD_VERSION}, limit=1) > 0
+
+
+async def read_balances(db):
+    """Kayıtlı bakiyeleri oku (defter hiç oluşturulmamışsa None)"""
+    if not await is_built(db):
+        return None
+    docs = await db[LEDGER_COLLECTION].find({}).to_list(None)
+    balances = empty_balances()
+    for doc in docs:
+        balances[doc["_id"]] = doc.get("balance", 0)
+    return balances
+
+
+async def rebuild(db):
+    """Defteri sıfırdan hesaplayıp üzerine yaz"""
+    balances = await compute_balances(db)
+    await db[LEDGER_COLLECTION].bulk_write(
+        [ReplaceOne({"_id": key}, {"_id": key, "balance": amount}, upsert=True)
+         for key, amount in balances.items()],
+        ordered=False,
+    )
+    await db[STATE_COLLECTION].update_one({"_id": "built"}, {"$set": {"value": BUILD_VERSION}}, upsert=True)
+    return balances
+
+
+async def ensure_built(db):
+    """Defter hiç oluşturulmamışsa veya eski bir yapıdaysa yeniden oluştur"""
+    if not await is_built(db):
+        await rebuild(db)
+
+
+async def get_balances(db):
+    """Bakiyeleri oku; defter oluşturulmamışsa ilk kez oluştur"""
+    balances = await read_balances(db)
+    if balances is None:
+        balances = await rebuild(db)
+    return balances
+
+
+async def verify(db):
+    """Kayıtlı defteri yeniden hesaplananla karşılaştır: {anahtar: (kayıtlı, beklenen)}"""
+    stored = await read_balances(db) or {}
+    expected = await compute_balances(db)
+    drift = {}
+    for key in LEDGER_KEYS:
+        stored_value = stored.get(key, 0)
+        if abs(stored_value - expected[key]) > DRIFT_TOLERANCE:
+            drift[key] = (stored_value, expected[key])
+    return drift
+
+
+def stats_from_balances(balances):
+    """Bakiyelerden /stock/stats cevabını oluştur"""
+    materials = {}
+    for code in MATERIAL_CODES:
+        if code in MASURA_CODES:
+            materials[code] = int(round(balances[code]))
+        else:
+            materials[code] = round(float(balances[code]), 2)
+    return {
+        "totalStock": int(round(balances[NORMAL_STOCK])),
+        "cutProducts": int(round(balances[CUT_STOCK])),
+        "productions": int(balances[PRODUCTION_COUNT]),
+        "materials": materials,
+    }
+
+
+async def main():
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from dotenv import load_dotenv
+    from pathlib import Path
+    import os
+
+    parser = argparse.ArgumentParser(description="Stok defteri yeniden hesaplama / doğrulama")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    args = parser.parse_args()
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    try:
+        drift = await verify(db)
+        if drift:
+            print(f"⚠️ {len(drift)} bakiyede fark bulundu:")
+            for key, (stored, expected) in drift.items():
+                print(f"   {key}: kayıtlı={stored} beklenen={expected} fark={stored - expected}")
+        else:
+            print("✅ Stok defteri kaynak verilerle tutarlı")
+
+        if args.command == "rebuild":
+            await rebuild(db)
+            print("✅ Stok defteri yeniden oluşturuldu")
+        elif drift:
+            raise SystemExit(1)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,201 @@
+"""
+/api/stock için SKU bazlı stok hesaplamasının MongoDB aggregation pipeline'ı
+Üretim, sevkiyat ve kesilmiş ürün kayıtları tek bir $unionWith/$group zincirinde
+birleştirilir; Python tarafına yalnızca sıralanmış SKU satırları gelir.
+
+Gruplama kuralları eski Python hesaplamasıyla aynıdır:
+- Normal: üretim (kalınlık, en, metre, renk) - tüm sevkiyatlar ("2mm x 100cm x 300m" boyutundan)
+- Kesilmiş: kesilmiş ürün (cutSize, renk) - "Kesilmiş" tipindeki sevkiyatlar
+- Yalnızca üretimi olan ve kalan miktarı 0 olmayan gruplar listelenir
+"""
+
+CUT_PRODUCT_M2 = 0.69  # Kesilmiş ürün m2
+
+
+def _text(field):
+    """Alanı gruplama anahtarı için metne çevir (f-string davranışı)"""
+    return {"$toString": {"$ifNull": [field, ""]}}
+
+
+def _quantity(field="$quantity"):
+    return {"$convert": {"input": field, "to": "long", "onError": 0, "onNull": 0}}
+
+
+def _size_parts(field):
+    """'2mm x 100cm x 300m' -> ['2mm', '100cm', '300m']"""
+    return {"$split": [
+        {"$cond": [{"$eq": [{"$type": field}, "string"]}, field, ""]},
+        " x ",
+    ]}
+
+
+def _strip(expr, *tokens):
+    for token in tokens:
+        expr = {"$replaceAll": {"input": expr, "find": token, "replacement": ""}}
+    return {"$trim": {"input": expr}}
+
+
+def _part(index):
+    return {"$arrayElemAt": ["$parts", index]}
+
+
+def date_range_query(after, until):
+    """
+    (başlangıç hariç, bitiş dahil) tarih aralığı sorgusu. Tarihi metin olmayan
+    kayıtlar en başta sayılır: başlangıç verilmemiş aralıklara dahildir.
+    """
+    condition = {}
+    if after:
+        condition["$gt"] = after
+    if until:
+        condition["$lte"] = until
+    if not condition:
+        return {}
+    if after:
+        return {"date": condition}
+    return {"$or": [{"date": condition}, {"date": {"$not": {"$type": "string"}}}]}
+
+
+def _date_match(date_range):
+    if not date_range:
+        return []
+    query = date_range_query(*date_range)
+    return [{"$match": query}] if query else []
+
+
+def _production_stages(date_range=None):
+    return _date_match(date_range) + [
+        {"$project": {
+            "_id": 0,
+            "group": {
+                "type": "Normal",
+                "a": _text("$thickness"), "b": _text("$width"),
+                "c": _text("$length"), "d": _text("$color"),
+            },
+            "source": {"$literal": True},
+            "thickness": {"$ifNull": ["$thickness", ""]},
+            "width": {"$ifNull": ["$width", ""]},
+            "length": {"$ifNull": ["$length", ""]},
+            "color": {"$ifNull": ["$color", ""]},
+            "colorCategory": {"$ifNull": ["$colorCategory", "Doğal"]},
+            "m2": {"$ifNull": ["$m2", 0]},
+            "produced": _quantity(),
+            "shipped": {"$literal": 0},
+        }},
+    ]
+
+
+def _normal_shipment_stages(date_range=None):
+    # Tüm sevkiyatlar Normal stoktan düşülür; boyutu eşleşmeyenler gruba bağlanmaz
+    return _date_match(date_range) + [
+        {"$project": {"_id": 0, "color": 1, "quantity": 1, "parts": _size_parts("$size")}},
+        {"$match": {"parts.2": {"$exists": True}}},
+        {"$project": {
+            "group": {
+                "type": "Normal",
+                "a": {"$concat": [_strip(_part(0), "mm"), " mm"]},
+                "b": _strip(_part(1), "cm"),
+                "c": _strip(_part(2), "m", "cm"),
+                "d": _text("$color"),
+            },
+            "source": {"$literal": False},
+            "produced": {"$literal": 0},
+            "shipped": _quantity(),
+        }},
+    ]
+
+
+def _cut_product_stages(date_range=None):
+    return _date_match(date_range) + [
+        {"$project": {
+            "_id": 0, "color": 1, "colorCategory": 1, "quantity": 1, "cutSize": 1,
+            "parts": _size_parts("$cutSize"),
+        }},
+        {"$match": {"parts.2": {"$exists": True}}},
+        {"$project": {
+            "group": {"type": "Kesilmiş", "a": _text("$cutSize"), "b": _text("$color"), "c": None, "d": None},
+            "source": {"$literal": True},
+            "thickness": _strip(_part(0), "mm"),
+            "width": _strip(_part(1), "cm"),
+            "length": _strip(_part(2)),
+            "color": {"$ifNull": ["$color", ""]},
+            "colorCategory": {"$ifNull": ["$colorCategory", "Doğal"]},
+            "m2": {"$literal": CUT_PRODUCT_M2},
+            "produced": _quantity(),
+            "shipped": {"$literal": 0},
+        }},
+    ]
+
+
+def _cut_shipment_stages(date_range=None):
+    return _date_match(date_range) + [
+        {"$match": {"type": "Kesilmiş"}},
+        {"$project": {
+            "_id": 0,
+            "group": {"type": "Kesilmiş", "a": _text("$size"), "b": _text("$color"), "c": None, "d": None},
+            "source": {"$literal": False},
+            "produced": {"$literal": 0},
+            "shipped": _quantity(),
+        }},
+    ]
+
+
+def sku_group_pipeline(date_range=None):
+    """
+    SKU gruplarını üreten pipeline (db.productions üzerinde çalıştırılır).
+    Her satır: _id (grup anahtarı), hasSource, produced, shipped ve görüntü alanları.
+    date_range=(başlangıç hariç, bitiş dahil) verilirse yalnızca o aralıktaki hareketler sayılır.
+    """
+    return _production_stages(date_range) + [
+        {"$unionWith": {"coll": "shipments", "pipeline": _normal_shipment_stages(date_range)}},
+        {"$unionWith": {"coll": "cut_products", "pipeline": _cut_product_stages(date_range)}},
+        {"$unionWith": {"coll": "shipments", "pipeline": _cut_shipment_stages(date_range)}},
+        # Kaynak belgeler (üretim / kesilmiş ürün) her grupta sevkiyatlardan önce gelir,
+        # bu yüzden $first görüntü alanlarını ilk kaynak belgeden alır
+        {"$group": {
+            "_id": "$group",
+            "hasSource": {"$max": "$source"},
+            "produced": {"$sum": "$produced"},
+            "shipped": {"$sum": "$shipped"},
+            "thickness": {"$first": "$thickness"},
+            "width": {"$first": "$width"},
+            "length": {"$first": "$length"},
+            "color": {"$first": "$color"},
+            "colorCategory": {"$first": "$colorCategory"},
+            "m2": {"$first": "$m2"},
+        }},
+    ]
+
+
+def _sort_number(field, to, *tokens):
+    return {"$convert": {
+        "input": _strip(_text(field), *tokens),
+        "to": to, "onError": 0, "onNull": 0,
+    }}
+
+
+def stock_rows_stages():
+    """Grup satırlarını /api/stock cevabına çeviren son aşamalar"""
+    return [
+        {"$match": {"hasSource": True}},
+        {"$addFields": {"quantity": {"$subtract": ["$produced", "$shipped"]}}},
+        {"$match": {"quantity": {"$ne": 0}}},
+        # Sırala (önce tip, sonra kalınlık, sonra en)
+        {"$addFields": {
+            "sortType": {"$cond": [{"$eq": ["$_id.type", "Normal"]}, 0, 1]},
+            "sortThickness": _sort_number("$thickness", "double", " mm", "mm"),
+            "sortWidth": _sort_number("$width", "int"),
+        }},
+        {"$sort": {"sortType": 1, "sortThickness": 1, "sortWidth": 1, "_id": 1}},
+        {"$replaceWith": {
+            "type": "$_id.type",
+            "thickness": "$thickness", "width": "$width", "length": "$length",
+            "color": "$color", "colorCategory": "$colorCategory",
+            "m2": "$m2", "quantity": "$quantity",
+        }},
+    ]
+
+
+def stock_pipeline():
+    """/api/stock için tam pipeline"""
+    return sku_group_pipeline() + stock_rows_stages()
@@ -0,0 +1,96 @@
+"""
+Liste uç noktaları için akış (streaming) yanıtları
+Accept: application/x-ndjson veya text/csv istenirse belgeler Motor imlecinden
+okundukça parça parça gönderilir; tüm liste bellekte toplanmaz ve Pydantic
+doğrulaması yapılmaz. Toplu veri çekimi (BI, yedek) için kullanılır.
+"""
+import csv
+import io
+import json
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+NDJSON = "application/x-ndjson"
+CSV = "text/csv"
+
+# Her parçada gönderilen belge sayısı
+CHUNK_SIZE = 500
+
+# CSV sütunları (belgede olmayan alan boş kalır)
+CSV_COLUMNS = {
+    "productions": ("id", "date", "machine", "thickness", "width", "length", "m2", "quantity",
+                    "masuraType", "color", "colorCategory", "created_at"),
+    "cut_products": ("id", "date", "material", "cutSize", "quantity", "usedMaterial", "color",
+                     "colorCategory", "cutWidth", "cutLength"),
+    "shipments": ("id", "date", "customer", "type", "size", "m2", "quantity", "color", "waybill",
+                  "vehicle", "driver", "exitTime"),
+    "materials": ("id", "date", "material", "entryType", "quantity", "unit", "unitPrice", "currency",
+                  "totalPrice", "exchangeRate", "supplier"),
+    "daily_consumption": ("id", "date", "machine", "petkim", "estol", "talk", "fire", "gaz"),
+    "users": ("id", "username", "name", "role", "createdAt"),
+}
+
+
+def stream_format(accept):
+    """Accept başlığından akış biçimi (NDJSON / CSV) veya None"""
+    accept = (accept or "").lower()
+    if NDJSON in accept:
+        return NDJSON
+    if CSV in accept:
+        return CSV
+    return None
+
+
+def _json_line(doc):
+    return orjson.dumps(doc, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE)
+
+
+async def ndjson_chunks(cursor):
+    chunk = []
+    async for doc in cursor:
+        chunk.append(_json_line(doc))
+        if len(chunk) >= CHUNK_SIZE:
+            yield b"".join(chunk)
+            chunk = []
+    if chunk:
+        yield b"".join(chunk)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+
+async def csv_chunks(cursor, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    count = 0
+    async for doc in cursor:
+        writer.writerow([_csv_value(doc.get(column)) for column in columns])
+        count += 1
+        if count % CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def streaming_response(cursor, media_type, collection, columns=None):
+    """Motor imlecindeki belgeleri NDJSON veya CSV olarak akıt (columns: ?fields= ile seçilen CSV sütunları)"""
+    if media_type == CSV:
+        # Excel'in UTF-8'i tanıması için BOM ile başlanır
+        async def body():
+            yield "\ufeff"
+            async for chunk in csv_chunks(cursor, columns or CSV_COLUMNS[collection]):
+                yield chunk
+        return StreamingResponse(
+            body(),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{collection}.csv"'},
+        )
+    return StreamingResponse(ndjson_chunks(cursor), media_type=NDJSON)
@@ -0,0 +1,102 @@
+"""
+CPU yoğun işler için iş havuzları
+bcrypt (şifre özetleme / doğrulama) ve pandas (Excel okuma) çağrıları olay
+döngüsünü bloklamasın diye ayrı havuzlarda çalıştırılır; böylece bir giriş isteği
+veya Excel okuması sırasında diğer istekler beklemez.
+
+bcrypt özetleme sırasında GIL'i bıraktığı için iş parçacığı (thread) havuzu yeterlidir;
+pandas/openpyxl ile Excel okuma saf Python ağırlıklı olduğundan varsayılan olarak
+süreç (process) havuzunda çalışır.
+
+Havuz boyutları ve kuyruk sınırları ortam değişkenleriyle ayarlanır:
+PASSWORD_POOL_SIZE, PASSWORD_POOL_QUEUE, EXCEL_POOL_SIZE, EXCEL_POOL_QUEUE,
+EXCEL_POOL_KIND (process / thread). Kuyruk doluysa PoolBusy fırlatılır.
+Anlık çalışan ve kuyrukta bekleyen iş sayıları /api/metrics altında görünür.
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class PoolBusy(Exception):
+    """Havuzun kuyruğu dolu; istek daha sonra tekrar denenmeli"""
+
+
+class WorkPool:
+    """Sınırlı kuyruklu iş havuzu (executor ilk kullanımda oluşturulur)"""
+
+    def __init__(self, name, kind, max_workers, max_queue):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _executor(self):
+        if self.executor is None:
+            if self.kind == "process":
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self.executor
+
+    async def run(self, func, *args, **kwargs):
+        """func(*args, **kwargs) havuzda çalıştırılır; kuyruk doluysa PoolBusy"""
+        if self.pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PoolBusy(self.name)
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor(), functools.partial(func, *args, **kwargs))
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "active": min(self.pending, self.max_workers),
+            "queued": max(self.pending - self.max_workers, 0),
+            "maxQueue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+password_pool = WorkPool(
+    "password", "thread",
+    max_workers=_env_int("PASSWORD_POOL_SIZE", 4),
+    max_queue=_env_int("PASSWORD_POOL_QUEUE", 64),
+)
+
+excel_pool = WorkPool(
+    "excel", os.environ.get("EXCEL_POOL_KIND", "process"),
+    max_workers=_env_int("EXCEL_POOL_SIZE", 2),
+    max_queue=_env_int("EXCEL_POOL_QUEUE", 8),
+)
+
+POOLS = (password_pool, excel_pool)
+
+
+def stats():
+    return {pool.name: pool.stats() for pool in POOLS}
+
+
+def shutdown():
+    for pool in POOLS:
+        pool.shutdown()
@@ -6,6 +6,15 @@ const AuthContext = createContext();
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Oturum anahtarı tüm isteklere Authorization başlığıyla eklenir
+const setAuthToken = (token) => {
+  if (token) {
+    axios.defaults.headers.common.Authorization = `Bearer ${token}`;
+  } else {
+    delete axios.defaults.headers.common.Authorization;
+  }
+};
+
 export const AuthProvider = ({ children }) => {
   const [user, setUser] = useState(null);
   const [loading, setLoading] = useState(true);
@@ -14,15 +23,37 @@ export const AuthProvider = ({ children }) => {
     // Check if user is logged in from localStorage
     const storedUser = localStorage.getItem('user');
     if (storedUser) {
-      setUser(JSON.parse(storedUser));
+      const parsed = JSON.parse(storedUser);
+      // Anahtarı olmayan veya süresi dolmuş eski oturumlar yeniden giriş ister
+      if (parsed.token && parsed.expiresAt * 1000 > Date.now()) {
+        setAuthToken(parsed.token);
+        setUser(parsed);
+      } else {
+        localStorage.removeItem('user');
+      }
     }
     setLoading(false);
+
+    // Anahtar geçersiz / iptal edilmişse oturumu kapat
+    const interceptor = axios.interceptors.response.use(
+      (response) => response,
+      (error) => {
+        if (error.response?.status === 401 && !error.config?.url?.endsWith('/auth/login')) {
+          setAuthToken(null);
+          setUser(null);
+          localStorage.removeItem('user');
+        }
+        return Promise.reject(error);
+      },
+    );
+    return () => axios.interceptors.response.eject(interceptor);
   }, []);
 
   const login = async (username, password) => {
     try {
       const response = await axios.post(`${API}/auth/login`, { username, password });
       const userData = response.data;
+      setAuthToken(userData.token);
       setUser(userData);
       localStorage.setItem('user', JSON.stringify(userData));
       return { success: true };
@@ -33,6 +64,7 @@ export const AuthProvider = ({ children }) => {
   };
 
   const logout = () => {
+    setAuthToken(null);
     setUser(null);
     localStorage.removeItem('user');
   };
@@ -43,7 +43,8 @@ export const CutProducts = () => {
 
   const fetchProductions = async () => {
     try {
-      const response = await productionApi.getAll();
+      // Bu sayfada yalnızca özet alanlar gerekir
+      const response = await productionApi.getAll({ fields: 'id,date,machine,quantity' });
       setProductions(response.data);
     } catch (error) {
       console.error('Fetch error:', error);
@@ -3,11 +3,151 @@ import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs";
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from "@/components/ui/table";
 import { Alert, AlertDescription } from "@/components/ui/alert";
-import { Loader2, FileSpreadsheet, AlertCircle } from "lucide-react";
+import { Button } from "@/components/ui/button";
+import { Input } from "@/components/ui/input";
+import { Loader2, FileSpreadsheet, AlertCircle, Search } from "lucide-react";
 import axios from "axios";
 
 const API_URL = process.env.REACT_APP_BACKEND_URL || import.meta.env.REACT_APP_BACKEND_URL;
 
+// Sunucudan tek seferde istenen satır sayısı
+const PAGE_SIZE = 200;
+
+// Bir sayfanın satırları pencereler halinde yüklenir; arama sunucuda yapılır
+const SheetWindow = ({ sheet }) => {
+  const [offset, setOffset] = useState(0);
+  const [query, setQuery] = useState("");
+  const [search, setSearch] = useState("");
+  const [windowData, setWindowData] = useState(null);
+  const [loading, setLoading] = useState(true);
+
+  useEffect(() => {
+    const timer = setTimeout(() => {
+      setSearch(query.trim());
+      setOffset(0);
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [query]);
+
+  useEffect(() => {
+    let cancelled = false;
+    setLoading(true);
+    axios
+      .get(`${API_URL}/api/excel-viewer/sheets/${encodeURIComponent(sheet.name)}`, {
+        params: { offset, limit: PAGE_SIZE, q: search || undefined },
+      })
+      .then((response) => {
+        if (!cancelled) setWindowData(response.data);
+      })
+      .finally(() => {
+        if (!cancelled) setLoading(false);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [sheet.name, offset, search]);
+
+  const total = windowData?.total ?? 0;
+
+  return (
+    <>
+      <div className="flex items-center justify-between gap-4 mb-4">
+        <div className="relative w-full max-w-sm">
+          <Search className="absolute left-3 top-1/2 -translate-y-1/2 h-4 w-4 text-slate-500" />
+          <Input
+            value={query}
+            onChange={(e) => setQuery(e.target.value)}
+            placeholder="Sayfada ara..."
+            className="pl-9 bg-slate-900 border-slate-700 text-white"
+          />
+        </div>
+        <div className="flex items-center gap-3 text-sm text-slate-400">
+          {loading && <Loader2 className="h-4 w-4 animate-spin text-blue-500" />}
+          <span>
+            {total === 0 ? 0 : offset + 1}-{Math.min(offset + PAGE_SIZE, total)} / {total}
+          </span>
+          <Button
+            variant="outline"
+            size="sm"
+            disabled={offset === 0}
+            onClick={() => setOffset(Math.max(offset - PAGE_SIZE, 0))}
+          >
+            Önceki
+          </Button>
+          <Button
+            variant="outline"
+            size="sm"
+            disabled={offset + PAGE_SIZE >= total}
+            onClick={() => setOffset(offset + PAGE_SIZE)}
+          >
+            Sonraki
+          </Button>
+        </div>
+      </div>
+
+      <div className="rounded-lg border border-slate-700 bg-slate-950/50 overflow-hidden">
+        <div className="overflow-x-auto">
+          <Table>
+            <TableHeader>
+              <TableRow className="bg-blue-900/30 hover:bg-blue-900/40 border-slate-700">
+                <TableHead className="text-blue-300 font-bold w-12 text-center sticky left-0 bg-blue-900/30">
+                  #
+                </TableHead>
+                {sheet.columns.map((column, colIndex) => (
+                  <TableHead
+                    key={colIndex}
+                    className="text-blue-300 font-semibold whitespace-nowrap min-w-[120px]"
+                  >
+                    {column}
+                  </TableHead>
+                ))}
+              </TableRow>
+            </TableHeader>
+            <TableBody>
+              {(windowData?.rows ?? []).map((row, rowIndex) => {
+                // Bozuk veri kontrolü (0 ile başlayan veya anormal satırlar)
+                const isBrokenRow = row[0] === 0 || row[0] === "0";
+
+                return (
+                  <TableRow
+                    key={windowData.rowNumbers[rowIndex]}
+                    className={`border-slate-800 hover:bg-slate-800/50 ${
+                      isBrokenRow ? "bg-red-900/20 border-red-800" : ""
+                    }`}
+                  >
+                    <TableCell className="text-slate-500 text-center font-mono text-xs sticky left-0 bg-slate-900/90">
+                      {windowData.rowNumbers[rowIndex]}
+                    </TableCell>
+                    {row.map((cell, cellIndex) => {
+                      // Boş hücre kontrolü
+                      const isEmpty = cell === null || cell === undefined || cell === "";
+
+                      return (
+                        <TableCell
+                          key={cellIndex}
+                          className={`text-slate-300 ${
+                            isEmpty ? "bg-yellow-900/20 text-yellow-600" : ""
+                          } ${isBrokenRow ? "text-red-400" : ""}`}
+                        >
+                          {isEmpty ? (
+                            <span className="italic text-yellow-600/60">boş</span>
+                          ) : (
+                            String(cell)
+                          )}
+                        </TableCell>
+                      );
+                    })}
+                  </TableRow>
+                );
+              })}
+            </TableBody>
+          </Table>
+        </div>
+      </div>
+    </>
+  );
+};
+
 export const ExcelViewer = () => {
   const [excelData, setExcelData] = useState(null);
   const [loading, setLoading] = useState(true);
@@ -20,7 +160,8 @@ export const ExcelViewer = () => {
   const loadExcelData = async () => {
     try {
       setLoading(true);
-      const response = await axios.get(`${API_URL}/api/excel-viewer`);
+      // Yalnızca sayfa bilgileri; satırlar sekme açıldıkça pencereler halinde gelir
+      const response = await axios.get(`${API_URL}/api/excel-viewer/sheets`);
       setExcelData(response.data);
       setError(null);
     } catch (err) {
@@ -89,7 +230,7 @@ export const ExcelViewer = () => {
                 >
                   {sheet.name}
                   <span className="ml-2 text-xs opacity-70">
-                    ({sheet.data.length} satır)
+                    ({sheet.rowCount} satır)
                   </span>
                 </TabsTrigger>
               ))}
@@ -97,72 +238,14 @@ export const ExcelViewer = () => {
 
             {excelData.sheets.map((sheet, sheetIndex) => (
               <TabsContent key={sheetIndex} value={sheetIndex.toString()} className="mt-6">
-                <div className="rounded-lg border border-slate-700 bg-slate-950/50 overflow-hidden">
-                  <div className="overflow-x-auto">
-                    <Table>
-                      <TableHeader>
-                        <TableRow className="bg-blue-900/30 hover:bg-blue-900/40 border-slate-700">
-                          <TableHead className="text-blue-300 font-bold w-12 text-center sticky left-0 bg-blue-900/30">
-                            #
-                          </TableHead>
-                          {sheet.columns.map((column, colIndex) => (
-                            <TableHead
-                              key={colIndex}
-                              className="text-blue-300 font-semibold whitespace-nowrap min-w-[120px]"
-                            >
-                              {column}
-                            </TableHead>
-                          ))}
-                        </TableRow>
-                      </TableHeader>
-                      <TableBody>
-                        {sheet.data.map((row, rowIndex) => {
-                          // Bozuk veri kontrolü (0 ile başlayan veya anormal satırlar)
-                          const isBrokenRow = row[0] === 0 || row[0] === "0";
-                          
-                          return (
-                            <TableRow
-                              key={rowIndex}
-                              className={`border-slate-800 hover:bg-slate-800/50 ${
-                                isBrokenRow ? "bg-red-900/20 border-red-800" : ""
-                              }`}
-                            >
-                              <TableCell className="text-slate-500 text-center font-mono text-xs sticky left-0 bg-slate-900/90">
-                                {rowIndex + 1}
-                              </TableCell>
-                              {row.map((cell, cellIndex) => {
-                                // Boş hücre kontrolü
-                                const isEmpty = cell === null || cell === undefined || cell === "";
-                                
-                                return (
-                                  <TableCell
-                                    key={cellIndex}
-                                    className={`text-slate-300 ${
-                                      isEmpty ? "bg-yellow-900/20 text-yellow-600" : ""
-                                    } ${isBrokenRow ? "text-red-400" : ""}`}
-                                  >
-                                    {isEmpty ? (
-                                      <span className="italic text-yellow-600/60">boş</span>
-                                    ) : (
-                                      String(cell)
-                                    )}
-                                  </TableCell>
-                                );
-                              })}
-                            </TableRow>
-                          );
-                        })}
-                      </TableBody>
-                    </Table>
-                  </div>
-                </div>
+                <SheetWindow sheet={sheet} />
 
                 {/* İstatistikler */}
                 <div className="mt-4 p-4 bg-slate-800/50 rounded-lg border border-slate-700">
                   <div className="grid grid-cols-3 gap-4 text-sm">
                     <div>
                       <span className="text-slate-400">Toplam Satır:</span>
-                      <span className="ml-2 text-white font-semibold">{sheet.data.length}</span>
+                      <span className="ml-2 text-white font-semibold">{sheet.rowCount}</span>
                     </div>
                     <div>
                       <span className="text-slate-400">Toplam Sütun:</span>
@@ -171,7 +254,7 @@ export const ExcelViewer = () => {
                     <div>
                       <span className="text-red-400">⚠️ Bozuk Satır:</span>
                       <span className="ml-2 text-red-300 font-semibold">
-                        {sheet.data.filter(row => row[0] === 0 || row[0] === "0").length}
+                        {sheet.brokenRows}
                       </span>
                     </div>
                   </div>
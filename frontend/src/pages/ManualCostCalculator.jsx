@@ -40,6 +40,9 @@ export const ManualCostCalculator = () => {
     finalCostPerPiece: 0
   });
 
+  // Dövizli fiyatlar bu tarihte geçerli kurla TL'ye çevrilir
+  const [priceDate, setPriceDate] = useState(new Date().toISOString().slice(0, 10));
+
   const [materialPrices, setMaterialPrices] = useState({
     petkim: 0,
     estol: 0,
@@ -71,7 +74,7 @@ export const ManualCostCalculator = () => {
   // Hammadde fiyatlarını ve döviz kurunu çek
   useEffect(() => {
     fetchMaterialPrices();
-  }, []);
+  }, [priceDate]);
 
   const fetchMaterialPrices = async () => {
     try {
@@ -79,8 +82,10 @@ export const ManualCostCalculator = () => {
       const materialsResponse = await axios.get(`${API}/materials`);
       const materials = materialsResponse.data;
 
-      // Döviz kurunu çek
-      const ratesResponse = await axios.get(`${API}/exchange-rates`);
+      // Seçilen tarihte geçerli döviz kurunu çek
+      const ratesResponse = await axios.get(`${API}/exchange-rates`, {
+        params: priceDate ? { date: priceDate } : {}
+      });
       const rates = ratesResponse.data;
       const usdRate = rates.usd || 42.0;
       const eurRate = rates.eur || 48.0;
@@ -287,7 +292,18 @@ export const ManualCostCalculator = () => {
       {/* Hammadde Fiyatları Göstergesi */}
       <Card className="bg-gradient-to-r from-blue-900/50 to-blue-800/50 border-blue-700">
         <CardHeader>
-          <CardTitle className="text-white text-sm">Hammadde Yönetiminden Çekilen Fiyatlar</CardTitle>
+          <div className="flex items-center justify-between gap-4">
+            <CardTitle className="text-white text-sm">Hammadde Yönetiminden Çekilen Fiyatlar</CardTitle>
+            <div className="flex items-center gap-2">
+              <Label className="text-blue-200 text-sm">Kur Tarihi</Label>
+              <Input
+                type="date"
+                value={priceDate}
+                onChange={(e) => setPriceDate(e.target.value)}
+                className="bg-slate-800/50 border-slate-700 text-white w-40"
+              />
+            </div>
+          </div>
         </CardHeader>
         <CardContent>
           <div className="grid grid-cols-2 md:grid-cols-4 gap-3 text-sm">
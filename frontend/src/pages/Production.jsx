@@ -5,7 +5,7 @@ import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '@/components/ui/table';
-import { productionApi } from '@/services/api';
+import { productionApi, exportApi } from '@/services/api';
 import { useToast } from '@/hooks/use-toast';
 import { useAuth } from '@/hooks/use-auth';
 import { Pencil, Trash2, Download, Filter } from 'lucide-react';
@@ -147,10 +147,7 @@ export const Production = () => {
   };
 
   const exportToExcel = () => {
-    toast({
-      title: 'Bilgi',
-      description: 'Excel export özelliği yakında eklenecek',
-    });
+    exportApi.download('productions', 'xlsx');
   };
 
   return (
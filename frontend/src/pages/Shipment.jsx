@@ -47,7 +47,8 @@ export const Shipment = () => {
 
   const fetchProductions = async () => {
     try {
-      const response = await productionApi.getAll();
+      // Bu sayfada yalnızca özet alanlar gerekir
+      const response = await productionApi.getAll({ fields: 'id,date,machine,quantity' });
       setProductions(response.data);
     } catch (error) {
       console.error('Fetch error:', error);
@@ -93,26 +93,15 @@ export const Users = () => {
         return;
       }
 
-      // Şifreyi güncelle (backend endpoint'i eklemeliyiz)
-      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL || import.meta.env.REACT_APP_BACKEND_URL}/api/users/change-password`, {
-        method: 'PUT',
-        headers: { 
-          'Content-Type': 'application/json',
-          'Authorization': `Bearer ${localStorage.getItem('token')}`
-        },
-        body: JSON.stringify({
-          username: currentUser.username,
-          newPassword: passwordChangeData.newPassword
-        })
+      // Şifreyi güncelle (oturum anahtarı axios'un Authorization başlığıyla gider)
+      await userApi.changePassword({
+        username: currentUser.username,
+        newPassword: passwordChangeData.newPassword
       });
 
-      if (response.ok) {
-        toast({ title: 'Başarılı', description: 'Şifreniz değiştirildi' });
-        setPasswordChangeData({ currentPassword: '', newPassword: '', confirmPassword: '' });
-        setIsPasswordDialogOpen(false);
-      } else {
-        throw new Error('Şifre değiştirilemedi');
-      }
+      toast({ title: 'Başarılı', description: 'Şifreniz değiştirildi' });
+      setPasswordChangeData({ currentPassword: '', newPassword: '', confirmPassword: '' });
+      setIsPasswordDialogOpen(false);
     } catch (error) {
       toast({ title: 'Hata', description: 'Şifre değiştirilemedi', variant: 'destructive' });
     }
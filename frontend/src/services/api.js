@@ -3,12 +3,27 @@ import axios from 'axios';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+const WRITE_METHODS = ['post', 'put', 'patch', 'delete'];
+
+const newIdempotencyKey = () =>
+  window.crypto?.randomUUID?.() ?? `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
+// Yazma isteklerine Idempotency-Key eklenir. Aynı istek (aynı config ile) yeniden
+// gönderilirse anahtar değişmez; sunucu kaydı ikinci kez oluşturmaz, ilk yanıtı döner.
+axios.interceptors.request.use((config) => {
+  if (WRITE_METHODS.includes(config.method) && !config.headers.has('Idempotency-Key')) {
+    config.headers.set('Idempotency-Key', newIdempotencyKey());
+  }
+  return config;
+});
+
 // Production API
 export const productionApi = {
-  getAll: () => axios.get(`${API}/production`),
+  getAll: (params) => axios.get(`${API}/production`, { params }),
   create: (data) => axios.post(`${API}/production`, data),
   update: (id, data) => axios.put(`${API}/production/${id}`, data),
   delete: (id) => axios.delete(`${API}/production/${id}`),
+  bulk: (data) => axios.post(`${API}/production/bulk`, data),
 };
 
 // Stock API
@@ -23,6 +38,7 @@ export const cutProductApi = {
   create: (data) => axios.post(`${API}/cut-products`, data),
   update: (id, data) => axios.put(`${API}/cut-products/${id}`, data),
   delete: (id) => axios.delete(`${API}/cut-products/${id}`),
+  bulk: (data) => axios.post(`${API}/cut-products/bulk`, data),
 };
 
 // Shipment API
@@ -31,6 +47,7 @@ export const shipmentApi = {
   create: (data) => axios.post(`${API}/shipments`, data),
   update: (id, data) => axios.put(`${API}/shipments/${id}`, data),
   delete: (id) => axios.delete(`${API}/shipments/${id}`),
+  bulk: (data) => axios.post(`${API}/shipments/bulk`, data),
 };
 
 // Material API
@@ -38,6 +55,7 @@ export const materialApi = {
   getAll: () => axios.get(`${API}/materials`),
   create: (data) => axios.post(`${API}/materials`, data),
   update: (id, data) => axios.put(`${API}/materials/${id}`, data),
+  bulk: (data) => axios.post(`${API}/materials/bulk`, data),
 };
 
 // User API
@@ -46,6 +64,7 @@ export const userApi = {
   create: (data) => axios.post(`${API}/users`, data),
   update: (id, data) => axios.put(`${API}/users/${id}`, data),
   delete: (id) => axios.delete(`${API}/users/${id}`),
+  changePassword: (data) => axios.put(`${API}/users/change-password`, data),
 };
 
 // Exchange Rate API
@@ -54,6 +73,18 @@ export const exchangeRateApi = {
   update: (data) => axios.put(`${API}/exchange-rates`, data),
 };
 
+// Export API - sunucuda akışla üretilen XLSX / CSV dosyaları (resource: productions,
+// cut-products, shipments, materials, daily-consumption, stock, cost-analysis)
+export const exportApi = {
+  url: (resource, format = 'xlsx', params = {}) => {
+    const query = new URLSearchParams(params).toString();
+    return `${API}/export/${resource}.${format}${query ? `?${query}` : ''}`;
+  },
+  download: (resource, format = 'xlsx', params = {}) => {
+    window.location.assign(exportApi.url(resource, format, params));
+  },
+};
+
 // Default export with all APIs
 export const api = {
   production: productionApi,
@@ -63,4 +94,5 @@ export const api = {
   material: materialApi,
   user: userApi,
   exchangeRate: exchangeRateApi,
+  export: exportApi,
 };
\ No newline at end of file
@@ -0,0 +1,30 @@
+"""
+Backend modülleri doğrudan içe aktarılabilsin diye backend/ yola eklenir.
+db fikstürü her test için boş bir bellek içi (mongomock) Motor veritabanı verir;
+sürüm sayaçları her veritabanında sıfırdan başladığı için sayaçlara bağlı süreç içi
+önbellekler (kur geçmişi) de sıfırlanır.
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# Modül düzeyinde bağlantı kuran betikler (yükleyiciler, server) için
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test")
+os.environ.setdefault("JWT_SECRET", "test-secret-for-signed-session-tokens")
+
+
+@pytest.fixture
+def db(monkeypatch):
+    from mongomock_motor import AsyncMongoMockClient
+
+    import exchange_rate_history
+    from tests import mongomock_operators
+
+    mongomock_operators.install()
+    monkeypatch.setattr(exchange_rate_history, "_cache", {"version": None, "history": None})
+    return AsyncMongoMockClient()["test"]
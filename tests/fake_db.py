@@ -0,0 +1,86 @@
+"""
+Testler için bellek içi, Motor arayüzünün küçük bir alt kümesi: find (eşitlik,
+$gt/$lt/$ne/$in, $or/$and), sort, limit, to_list ve async for. Karşılaştırmalar
+MongoDB gibi yalnızca aynı tipteki değerler arasında yapılır; null artan sırada başta.
+"""
+import copy
+
+
+def _compare(value, operator, operand):
+    if operator == "$ne":
+        return value != operand
+    if operator == "$in":
+        return value in operand
+    if value is None or operand is None or type(value) is not type(operand):
+        return False
+    return value > operand if operator == "$gt" else value < operand
+
+
+def matches(doc, query):
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(doc, part) for part in condition):
+                return False
+        elif field == "$and":
+            if not all(matches(doc, part) for part in condition):
+                return False
+        elif isinstance(condition, dict):
+            if not all(_compare(doc.get(field), op, operand) for op, operand in condition.items()):
+                return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+
+def sort_key(value):
+    return (0, "") if value is None else (1, value)
+
+
+def _project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+    included = [key for key, value in projection.items() if value and key != "_id"]
+    if included:
+        fields = included + ([] if projection.get("_id", 1) == 0 else ["_id"])
+        return {key: copy.deepcopy(doc[key]) for key in fields if key in doc}
+    return {key: copy.deepcopy(value) for key, value in doc.items() if projection.get(key, 1)}
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, spec):
+        for field, direction in reversed(spec):
+            self._docs.sort(key=lambda doc: sort_key(doc.get(field)), reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self._docs = self._docs[:count]
+        return self
+
+    async def to_list(self, length=None):
+        return self._docs if length is None else self._docs[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._docs:
+            yield doc
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = [dict(doc) for doc in docs]
+
+    def find(self, query=None, projection=None):
+        return FakeCursor([_project(doc, projection) for doc in self.docs if matches(doc, query or {})])
+
+
+class FakeDB:
+    def __init__(self, **collections):
+        self.collections = {name: FakeCollection(docs) for name, docs in collections.items()}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
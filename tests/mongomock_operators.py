@@ -0,0 +1,89 @@
+"""
+mongomock'un uygulamadığı aggregation operatörleri ($convert, $replaceAll, $trim,
+$type, $unionWith, $replaceWith). Stok pipeline'ı ve kontrol noktaları testlerde
+mongomock üzerinde çalışsın diye MongoDB belgelerindeki davranışla eklenir:
+$convert metinden tam sayıya yalnızca tam sayı metnini çevirir, ondalıklı sayıyı
+keser; çevrilemeyen değer onError, eksik değer onNull olur.
+"""
+import mongomock.aggregate as aggregate
+from mongomock.aggregate import _Parser
+
+_BSON_TYPES = {str: "string", bool: "bool", int: "int", float: "double", type(None): "null",
+               dict: "object", list: "array"}
+
+
+_installed = False
+
+
+def _convert(value, to):
+    if to in ("int", "long"):
+        return int(value)
+    if to == "double":
+        return float(value)
+    if to == "string":
+        return str(value)
+    raise NotImplementedError(to)
+
+
+def _parse_or_missing(parser, expression):
+    try:
+        return parser.parse(expression)
+    except KeyError:
+        return None
+
+
+def install():
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    string_operator = _Parser._handle_string_operator
+    conversion_operator = _Parser._handle_type_convertion_operator
+    type_operator = _Parser._handle_type_operator
+
+    def handle_string(self, operator, values):
+        if operator == "$replaceAll":
+            text = self.parse(values["input"])
+            return None if text is None else text.replace(self.parse(values["find"]), self.parse(values["replacement"]))
+        if operator == "$trim":
+            text = self.parse(values["input"])
+            return None if text is None else text.strip()
+        return string_operator(self, operator, values)
+
+    def handle_conversion(self, operator, values):
+        if operator != "$convert":
+            return conversion_operator(self, operator, values)
+        value = _parse_or_missing(self, values["input"])
+        if value is None:
+            return self.parse(values["onNull"]) if "onNull" in values else None
+        try:
+            return _convert(value, values["to"])
+        except (TypeError, ValueError):
+            if "onError" in values:
+                return self.parse(values["onError"])
+            raise
+
+    def handle_type(self, operator, values):
+        if operator != "$type":
+            return type_operator(self, operator, values)
+        try:
+            value = self.parse(values)
+        except KeyError:
+            return "missing"
+        return _BSON_TYPES.get(type(value), "object")
+
+    def union_with(collection, database, options):
+        if isinstance(options, str):
+            options = {"coll": options}
+        other = list(database[options["coll"]].find())
+        return list(collection) + list(aggregate.process_pipeline(other, database, options.get("pipeline", []), None))
+
+    _Parser._handle_string_operator = handle_string
+    _Parser._handle_type_convertion_operator = handle_conversion
+    _Parser._handle_type_operator = handle_type
+    for operators, name in ((aggregate.string_operators, "$replaceAll"), (aggregate.type_operators, "$type")):
+        if name not in operators:
+            operators.append(name)
+    aggregate._PIPELINE_HANDLERS["$unionWith"] = union_with
+    aggregate._PIPELINE_HANDLERS["$replaceWith"] = lambda collection, database, options: (
+        aggregate._handle_replace_root_stage(collection, database, {"newRoot": options}))
@@ -0,0 +1,84 @@
+"""Oturum anahtarları: imza, iptal ve bilinmeyen kullanıcı"""
+import asyncio
+
+import pytest
+
+import auth_tokens
+import collection_versions
+
+USER = {"id": "u1", "username": "admin", "role": "admin"}
+
+
+class CountingUsers:
+    """users koleksiyonunda tam tarama (find) sayısını sayar"""
+
+    def __init__(self, db):
+        self.db = db
+        self.scans = 0
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+    def __getitem__(self, name):
+        return self.db[name]
+
+    @property
+    def users(self):
+        outer = self
+        users = self.db.users
+
+        class Users:
+            def find(self, *args, **kwargs):
+                outer.scans += 1
+                return users.find(*args, **kwargs)
+
+            def __getattr__(self, name):
+                return getattr(users, name)
+
+        return Users()
+
+
+def test_issued_token_verifies_and_revoke_rejects_it(db):
+    verifier = auth_tokens.TokenVerifier()
+
+    async def run():
+        await db.users.insert_one(dict(USER))
+        token, _ = auth_tokens.issue(USER)
+        claims = await verifier.verify(db, token)
+        await auth_tokens.revoke(db, "u1")
+        await collection_versions.bump(db, "users")
+        verifier.invalidate_versions()
+        with pytest.raises(auth_tokens.InvalidToken):
+            await verifier.verify(db, token)
+        return claims
+
+    claims = asyncio.run(run())
+    assert claims["sub"] == "u1" and claims["role"] == "admin"
+
+
+def test_tampered_token_is_rejected(db):
+    token, _ = auth_tokens.issue(USER)
+    with pytest.raises(auth_tokens.InvalidToken):
+        asyncio.run(auth_tokens.TokenVerifier().verify(db, token[:-2] + "xx"))
+
+
+def test_unknown_subject_is_looked_up_without_rescanning_users(db):
+    """Silinmiş kullanıcının anahtarı reddedilir; her istekte tüm kullanıcılar okunmaz"""
+    counting = CountingUsers(db)
+    verifier = auth_tokens.TokenVerifier()
+    deleted, _ = auth_tokens.issue({"id": "gone", "username": "eski"})
+
+    async def run():
+        await db.users.insert_one(dict(USER))
+        await verifier.verify(counting, auth_tokens.issue(USER)[0])
+        scans = counting.scans
+        for _ in range(3):
+            with pytest.raises(auth_tokens.InvalidToken):
+                await verifier.verify(counting, deleted)
+        # Bellekte olmayan ama var olan kullanıcı (başka süreçte oluşturulmuş)
+        await db.users.insert_one({"id": "u2", "username": "yeni"})
+        await verifier.verify(counting, auth_tokens.issue({"id": "u2", "username": "yeni"})[0])
+        return scans, counting.scans
+
+    before, after = asyncio.run(run())
+    assert after == before
@@ -0,0 +1,113 @@
+"""Toplu yazma: işlem sonuçları ve türetilmiş durumlara bildirilen değişiklikler"""
+import asyncio
+
+import bulk_writes
+import stock_ledger
+from derived_state import record_change
+
+SHIPMENTS = [
+    {"id": "a", "date": "2025-09-24", "type": "Normal", "quantity": 1},
+    {"id": "b", "date": "2025-09-25", "type": "Normal", "quantity": 2},
+]
+
+
+def _statuses(result):
+    return [(item["op"], item["index"], item["status"]) for item in result["results"]]
+
+
+async def _seed(db):
+    await db.shipments.create_index("id", unique=True)
+    await db.shipments.insert_many([dict(doc) for doc in SHIPMENTS])
+    await stock_ledger.ensure_built(db)
+
+
+def test_ordered_stops_at_first_missing_document(db):
+    async def run():
+        await _seed(db)
+        result = await bulk_writes.execute(
+            db, "shipments", [{"id": "n", "type": "Normal", "quantity": 5}],
+            [("a", {"quantity": 3}), ("x", {"quantity": 1}), ("b", {"quantity": 4})], ["b"], ordered=True)
+        return result, await db.shipments.find_one({"id": "b"}, {"_id": 0}), await stock_ledger.verify(db)
+
+    result, b, drift = asyncio.run(run())
+    assert _statuses(result) == [
+        ("insert", 0, "ok"), ("update", 0, "ok"), ("update", 1, "notFound"), ("update", 2, "skipped"),
+        ("delete", 0, "skipped")]
+    assert (result["inserted"], result["updated"], result["deleted"]) == (1, 1, 0)
+    assert b["quantity"] == 2
+    assert drift == {}
+
+
+def test_unordered_continues_after_errors(db):
+    async def run():
+        await _seed(db)
+        result = await bulk_writes.execute(
+            db, "shipments", [{"id": "a", "type": "Normal"}, {"id": "n", "type": "Normal", "quantity": 5}],
+            [("x", {"quantity": 1}), ("b", {"quantity": 4})], ["y", "a"], ordered=False)
+        return result, await stock_ledger.verify(db)
+
+    result, drift = asyncio.run(run())
+    assert _statuses(result) == [
+        ("insert", 0, "error"), ("insert", 1, "ok"), ("update", 0, "notFound"), ("update", 1, "ok"),
+        ("delete", 0, "notFound"), ("delete", 1, "ok")]
+    assert drift == {}
+
+
+def test_chained_operations_on_same_document(db):
+    async def run():
+        await _seed(db)
+        result = await bulk_writes.execute(
+            db, "shipments", [], [("a", {"quantity": 3, "id": "z"}), ("a", {"quantity": 4})], ["a", "a"],
+            ordered=False)
+        return result, await db.shipments.count_documents({"id": "a"}), await stock_ledger.verify(db)
+
+    result, remaining, drift = asyncio.run(run())
+    assert _statuses(result) == [
+        ("update", 0, "ok"), ("update", 1, "ok"), ("delete", 0, "ok"), ("delete", 1, "notFound")]
+    assert remaining == 0
+    assert drift == {}
+
+
+class _RacingDB:
+    """shipments güncellemesinden hemen önce aynı belgeye tekil bir yazma yapar"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+    def __getitem__(self, name):
+        collection = self.db[name]
+        if name != "shipments":
+            return collection
+        db = self.db
+
+        async def race():
+            before = await collection.find_one_and_update({"id": "a"}, {"$set": {"quantity": 10}}, projection={"_id": 0})
+            await record_change(db, "shipments", before, {**before, "quantity": 10})
+
+        class Racing:
+            async def find_one_and_update(self, *args, **kwargs):
+                await race()
+                return await collection.find_one_and_update(*args, **kwargs)
+
+            async def bulk_write(self, *args, **kwargs):
+                await race()
+                return await collection.bulk_write(*args, **kwargs)
+
+            def __getattr__(self, attribute):
+                return getattr(collection, attribute)
+
+        return Racing()
+
+
+def test_concurrent_single_row_write_does_not_drift_the_ledger(db):
+    async def run():
+        await _seed(db)
+        await bulk_writes.execute(_RacingDB(db), "shipments", [], [("a", {"quantity": 3})], [])
+        return await stock_ledger.verify(db), await stock_ledger.get_balances(db)
+
+    drift, balances = asyncio.run(run())
+    assert drift == {}
+    assert balances[stock_ledger.NORMAL_STOCK] == -5
@@ -0,0 +1,45 @@
+"""Sürüm sayaçlarına bağlı sonuç önbelleği"""
+import asyncio
+
+import collection_versions
+from collection_versions import VersionedCache
+
+
+def test_cache_recomputes_only_after_a_dependency_changes(db):
+    cache = VersionedCache(["productions", "materials"])
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        first = await cache.get_or_compute(db, "all", compute)
+        second = await cache.get_or_compute(db, "all", compute)
+        await collection_versions.bump(db, "shipments")
+        third = await cache.get_or_compute(db, "all", compute)
+        await collection_versions.bump(db, "materials")
+        fourth = await cache.get_or_compute(db, "all", compute)
+        return first, second, third, fourth
+
+    assert asyncio.run(run()) == (1, 1, 1, 2)
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 2
+
+
+def test_cache_evicts_least_recently_used(db):
+    cache = VersionedCache(["productions"], max_entries=2)
+
+    async def run():
+        for key in ("a", "b", "a", "c"):
+            await cache.get_or_compute(db, key, lambda key=key: asyncio.sleep(0, result=key))
+
+    asyncio.run(run())
+    assert list(cache.entries) == ["a", "c"]
+
+
+def test_versions_default_to_zero_and_bump_once_per_call(db):
+    async def run():
+        await collection_versions.bump(db, "productions", "productions", "materials")
+        return await collection_versions.get_versions(db, ["materials", "users", "productions"])
+
+    assert asyncio.run(run()) == (1, 0, 1)
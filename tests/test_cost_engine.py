@@ -0,0 +1,169 @@
+"""cost_engine.compute_cost_analysis, eski satır satır maliyet döngüsüyle aynı sonucu vermeli"""
+import json
+import random
+
+import pytest
+
+import cost_engine
+
+
+def reference_cost_analysis(productions, consumptions, materials, exchange_rates):
+    """server.py'deki eski /cost-analysis döngüsünün veritabanı okumaları çıkarılmış hali"""
+    usd_rate = float(exchange_rates.get('usd', 1)) if exchange_rates else 1
+    eur_rate = float(exchange_rates.get('eur', 1)) if exchange_rates else 1
+
+    material_prices = {'petkim': 0, 'estol': 0, 'talk': 0, 'gaz': 0}
+    masura_prices = {}
+    for mat in materials:
+        name = mat.get('material', '').upper()
+        price = float(mat.get('unitPrice', 0))
+        currency = mat.get('currency', 'TL')
+        if currency == 'USD':
+            price_tl = price * usd_rate
+        elif currency == 'EUR':
+            price_tl = price * eur_rate
+        else:
+            price_tl = price
+        if 'PETK' in name or 'PETKİM' in name:
+            material_prices['petkim'] = price_tl
+        elif 'ESTOL' in name:
+            material_prices['estol'] = price_tl
+        elif 'TALK' in name:
+            material_prices['talk'] = price_tl
+        elif 'GAZ' in name:
+            material_prices['gaz'] = price_tl
+        elif 'MASURA' in name:
+            masura_prices[mat.get('material', '')] = price_tl
+
+    consumption_by_date_machine = {}
+    total_gaz_by_date = {}
+    for cons in consumptions:
+        date = cons.get('date')
+        key = f"{date}_{cons.get('machine')}"
+        totals = consumption_by_date_machine.setdefault(key, {'petkim': 0, 'estol': 0, 'talk': 0, 'gaz': 0})
+        totals['petkim'] += float(cons.get('petkim', 0))
+        totals['estol'] += float(cons.get('estol', 0))
+        totals['talk'] += float(cons.get('talk', 0))
+        total_gaz_by_date[date] = total_gaz_by_date.get(date, 0) + float(cons.get('gaz', 0))
+
+    total_m2_by_date_machine = {}
+    total_m2_by_date = {}
+    for prod in productions:
+        date = prod.get('date')
+        key = f"{date}_{prod.get('machine')}"
+        m2 = float(prod.get('m2', 0))
+        total_m2_by_date_machine[key] = total_m2_by_date_machine.get(key, 0) + m2
+        total_m2_by_date[date] = total_m2_by_date.get(date, 0) + m2
+
+    cost_analysis = []
+    for prod in productions:
+        date = prod.get('date')
+        machine = prod.get('machine')
+        m2 = float(prod.get('m2', 0))
+        quantity = int(prod.get('quantity', 0))
+        key = f"{date}_{machine}"
+
+        daily_cons = consumption_by_date_machine.get(key, {'petkim': 0, 'estol': 0, 'talk': 0, 'gaz': 0})
+        total_m2_machine = total_m2_by_date_machine.get(key, 1)
+        ratio = m2 / total_m2_machine if total_m2_machine > 0 else 0
+        prod_petkim = daily_cons.get('petkim', 0) * ratio
+        prod_estol = daily_cons.get('estol', 0) * ratio
+        prod_talk = daily_cons.get('talk', 0) * ratio
+
+        total_gaz_day = total_gaz_by_date.get(date, 0)
+        total_m2_day = total_m2_by_date.get(date, 1)
+        gaz_ratio = m2 / total_m2_day if total_m2_day > 0 else 0
+        prod_gaz = total_gaz_day * gaz_ratio
+
+        material_cost = (
+            prod_petkim * material_prices['petkim'] +
+            prod_estol * material_prices['estol'] +
+            prod_talk * material_prices['talk'] +
+            prod_gaz * material_prices['gaz']
+        )
+
+        masura_type = prod.get('masuraType', '').upper().strip()
+        masura_unit_price = 0
+        for masura_name, masura_price in masura_prices.items():
+            if masura_name.upper().strip() == masura_type:
+                masura_unit_price = masura_price
+                break
+        masura_cost = quantity * masura_unit_price
+
+        total_cost = material_cost + masura_cost
+        unit_cost = total_cost / quantity if quantity > 0 else 0
+        m2_cost = total_cost / m2 if m2 > 0 else 0
+
+        cost_analysis.append({
+            'id': prod.get('id', ''),
+            'date': date,
+            'machine': machine,
+            'thickness': prod.get('thickness', ''),
+            'width': int(prod.get('width', 0)),
+            'length': int(prod.get('length', 0)),
+            'm2': round(m2, 2),
+            'quantity': quantity,
+            'masuraType': prod.get('masuraType', ''),
+            'color': prod.get('color', ''),
+            'petkim': round(prod_petkim, 2),
+            'estol': round(prod_estol, 2),
+            'talk': round(prod_talk, 2),
+            'gaz': round(prod_gaz, 2),
+            'materialCost': round(material_cost, 2),
+            'masuraCost': round(masura_cost, 2),
+            'totalCost': round(total_cost, 2),
+            'unitCost': round(unit_cost, 2),
+            'm2Cost': round(m2_cost, 2),
+        })
+
+    cost_analysis.sort(key=lambda x: x['date'], reverse=True)
+    return cost_analysis
+
+
+MATERIAL_NAMES = ['PETKİM LDPE', 'ESTOL', 'TALK', 'GAZ', 'MASURA 100', 'masura 120',
+                  'Masura 120 ', 'MASURA 150', 'SARI']
+
+
+def generate(rng):
+    """Sıfır/negatif m², negatif adet, farklı yazılmış masura adları ve dövizler içeren veri"""
+    dates = [f"2025-0{rng.randint(1, 3)}-{rng.randint(10, 14)}" for _ in range(20)]
+    machines = ['Makine 1', 'Makine 2', 'Makine 3']
+    productions = [{
+        'id': f'p{i}',
+        'date': rng.choice(dates),
+        'machine': rng.choice(machines),
+        'thickness': '2 mm',
+        'width': str(rng.choice([100, 120])),
+        'length': '300',
+        'm2': rng.choice([0.0, 300.0, 123.45, rng.random() * 500, -5.0]),
+        'quantity': rng.choice([0, 10, 33, -2, rng.randint(1, 200)]),
+        'masuraType': rng.choice(['Masura 100', 'masura 120 ', 'Masura 150', 'MASURA 200', 'Yok']),
+        'color': 'Doğal',
+    } for i in range(rng.randint(0, 200))]
+    consumptions = [{
+        'date': rng.choice(dates),
+        'machine': rng.choice(machines),
+        'petkim': rng.random() * 100,
+        'estol': rng.choice([0, 1.5, -0.0, rng.random()]),
+        'talk': rng.random(),
+        'gaz': rng.choice([0, rng.random() * 30]),
+    } for _ in range(rng.randint(0, 60))]
+    materials = [{
+        'material': name,
+        'unitPrice': round(rng.random() * 10, 3),
+        'currency': rng.choice(['TL', 'USD', 'EUR']),
+    } for name in rng.sample(MATERIAL_NAMES, rng.randint(0, len(MATERIAL_NAMES)))]
+    exchange_rates = rng.choice([None, {'usd': 42.1, 'eur': 48.3}])
+    return productions, consumptions, materials, exchange_rates
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_matches_reference_loop(seed):
+    productions, consumptions, materials, exchange_rates = generate(random.Random(seed))
+    expected = reference_cost_analysis(productions, consumptions, materials, exchange_rates)
+    actual = cost_engine.compute_cost_analysis(productions, consumptions, materials, exchange_rates)
+    assert json.dumps(actual) == json.dumps(expected)
+
+
+def test_empty_inputs():
+    assert cost_engine.compute_cost_analysis([], [], [], None) == []
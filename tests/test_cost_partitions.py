@@ -0,0 +1,93 @@
+"""Maliyet bölümleri ve özetleri: artımlı güncellemeler baştan hesaplamayla aynı kalmalı"""
+import asyncio
+
+import cost_engine
+import cost_partitions
+import exchange_rate_history
+from derived_state import record_change
+
+RATES = {"usd": 40.0, "eur": 45.0}
+PRODUCTIONS = [
+    {"id": "p1", "date": "2025-09-23", "machine": "Makine 1", "thickness": "2 mm", "width": "100", "length": "300",
+     "m2": 300.0, "quantity": 33, "masuraType": "Masura 100", "color": "Doğal"},
+    {"id": "p2", "date": "2025-09-23", "machine": "Makine 2", "thickness": "1 mm", "width": "120", "length": "300",
+     "m2": 360.0, "quantity": 20, "masuraType": "Masura 120", "color": "Doğal"},
+    {"id": "p3", "date": "2025-09-24", "machine": "Makine 1", "thickness": "2 mm", "width": "100", "length": "300",
+     "m2": 150.0, "quantity": 10, "masuraType": "Masura 100", "color": "Sarı"},
+]
+CONSUMPTIONS = [
+    {"id": "d1", "date": "2025-09-23", "machine": "Makine 1", "petkim": 100.5, "estol": 5, "talk": 2, "gaz": 30},
+    {"id": "d2", "date": "2025-09-23", "machine": "Makine 2", "petkim": 50, "estol": 2.5, "talk": 1, "gaz": 10},
+    {"id": "d3", "date": "2025-09-24", "machine": "Makine 1", "petkim": 80, "estol": 4, "talk": 2, "gaz": 20},
+]
+MATERIALS = [
+    {"id": "m1", "date": "2025-09-01", "material": "PETKİM LDPE", "quantity": 1000, "unitPrice": 2.85, "currency": "USD"},
+    {"id": "m2", "date": "2025-09-01", "material": "MASURA 100", "quantity": 500, "unitPrice": 10, "currency": "TL"},
+    {"id": "m3", "date": "2025-09-01", "material": "GAZ", "quantity": 300, "unitPrice": 5, "currency": "TL"},
+]
+
+
+async def _seed(db):
+    for name, docs in (("productions", PRODUCTIONS), ("daily_consumption", CONSUMPTIONS), ("materials", MATERIALS)):
+        await db[name].insert_many([dict(doc) for doc in docs])
+    before, after = await exchange_rate_history.append(db, RATES["usd"], RATES["eur"], "2025-01-01")
+    await record_change(db, "exchange_rates", before=before, after=after)
+
+
+async def _expected(db):
+    """Tüm koleksiyonlardan baştan hesaplanan maliyet analizi"""
+    productions = await db.productions.find({}, {"_id": 0}).to_list(None)
+    consumptions = await db.daily_consumption.find({}, {"_id": 0}).to_list(None)
+    materials = await db.materials.find({}, {"_id": 0}).to_list(None)
+    return cost_engine.compute_cost_analysis(productions, consumptions, materials, RATES)
+
+
+def _by_id(rows):
+    return {row["id"]: row for row in rows}
+
+
+def test_built_partitions_match_full_computation(db):
+    async def run():
+        await _seed(db)
+        return await cost_partitions.read_rows(db), await _expected(db)
+
+    rows, expected = asyncio.run(run())
+    assert rows == expected
+
+
+def test_allocation_and_price_changes_recompute_partitions(db):
+    async def run():
+        await _seed(db)
+        await cost_partitions.ensure_built(db)
+
+        before = await db.daily_consumption.find_one_and_update(
+            {"id": "d1"}, {"$set": {"gaz": 90}}, projection={"_id": 0})
+        await record_change(db, "daily_consumption", before, {**before, "gaz": 90})
+        added = {**PRODUCTIONS[0], "id": "p4", "quantity": 5, "m2": 50.0}
+        await db.productions.insert_one(dict(added))
+        await record_change(db, "productions", after=added)
+        after_allocation = (await cost_partitions.read_rows(db), await _expected(db))
+
+        before = await db.materials.find_one_and_update(
+            {"id": "m2"}, {"$set": {"unitPrice": 12}}, projection={"_id": 0})
+        await record_change(db, "materials", before, {**before, "unitPrice": 12})
+        return after_allocation, (await cost_partitions.read_rows(db), await _expected(db))
+
+    (rows, expected), (repriced, expected_repriced) = asyncio.run(run())
+    assert _by_id(rows) == _by_id(expected)
+    assert _by_id(repriced) == _by_id(expected_repriced)
+    assert repriced != rows
+
+
+def test_query_rows_filters_sorts_and_pages(db):
+    async def run():
+        await _seed(db)
+        first, cursor = await cost_partitions.query_rows(db, sort="-totalCost", limit=2)
+        rest, end = await cost_partitions.query_rows(db, sort="-totalCost", limit=2, cursor=cursor)
+        machine, _ = await cost_partitions.query_rows(db, machine="Makine 1", date_from="2025-09-24")
+        return first + rest, end, machine, await _expected(db)
+
+    rows, end, machine, expected = asyncio.run(run())
+    assert [row["id"] for row in rows] == [row["id"] for row in sorted(expected, key=lambda row: -row["totalCost"])]
+    assert end is None
+    assert [row["id"] for row in machine] == ["p3"]
@@ -0,0 +1,50 @@
+"""Maliyet özetleri: gruplanmış toplamlar bölüm satırlarının toplamına eşit olmalı"""
+import asyncio
+from collections import defaultdict
+
+import pytest
+
+import cost_partitions
+import cost_rollups
+from derived_state import record_change
+from tests.test_cost_partitions import _seed
+
+
+def _sums(rows, key):
+    sums = defaultdict(lambda: dict.fromkeys(cost_rollups.MEASURES, 0))
+    for row in rows:
+        group = sums[key(row)]
+        for measure in cost_rollups.MEASURES:
+            group[measure] += 1 if measure == "count" else row[measure]
+    return {group: {measure: value if measure in ("quantity", "count") else round(value, 2)
+                    for measure, value in measures.items()} for group, measures in sums.items()}
+
+
+def _grouped(result, dimensions):
+    return {tuple(row[dimension] for dimension in dimensions): {measure: row[measure] for measure in cost_rollups.MEASURES}
+            for row in result}
+
+
+def test_rollups_match_partition_rows(db):
+    async def run():
+        await _seed(db)
+        await cost_partitions.ensure_built(db)
+        before = await db.daily_consumption.find_one_and_update(
+            {"id": "d2"}, {"$set": {"petkim": 75}}, projection={"_id": 0})
+        await record_change(db, "daily_consumption", before, {**before, "petkim": 75})
+        return (await cost_partitions.read_rows(db),
+                await cost_rollups.query(db, ("month", "machine")),
+                await cost_rollups.query(db, ("color",), date_from="2025-09-24"),
+                await cost_rollups.query(db, ()))
+
+    rows, by_machine, by_color, total = asyncio.run(run())
+    assert _grouped(by_machine, ("month", "machine")) == _sums(rows, lambda row: (row["date"][:7], row["machine"]))
+    assert _grouped(by_color, ("color",)) == _sums(
+        [row for row in rows if row["date"] >= "2025-09-24"], lambda row: (row["color"],))
+    assert _grouped(total, ()) == _sums(rows, lambda row: ())
+
+
+def test_parse_group_by_rejects_unknown_dimensions():
+    assert cost_rollups.parse_group_by("month, machine,month") == ("month", "machine")
+    with pytest.raises(ValueError):
+        cost_rollups.parse_group_by("month,password")
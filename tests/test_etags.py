@@ -0,0 +1,43 @@
+"""ETag hesaplama ve If-None-Match eşleştirme"""
+from types import SimpleNamespace
+
+import pytest
+
+import etags
+
+ETAG = 'W/"0123456789abcdef0123"'
+
+
+@pytest.mark.parametrize("header", [
+    ETAG,
+    '"0123456789abcdef0123"',
+    f'"other", {ETAG}',
+    f'W/"other",{ETAG} ',
+    "*",
+])
+def test_matches(header):
+    assert etags._matches(header, ETAG)
+
+
+@pytest.mark.parametrize("header", [None, "", '"other"', 'W/"0123456789abcdef012"', '"0123456789abcdef01"'])
+def test_does_not_match(header):
+    assert not etags._matches(header, ETAG)
+
+
+def _request(path="/api/productions", query="", accept="application/json"):
+    return SimpleNamespace(url=SimpleNamespace(path=path, query=query), headers={"accept": accept})
+
+
+def test_etag_is_weak_and_stable():
+    etag = etags.compute_etag(_request(), [1, 2])
+    assert etag.startswith('W/"') and etag == etags.compute_etag(_request(), [1, 2])
+
+
+@pytest.mark.parametrize("request_, versions", [
+    (_request(), [1, 3]),
+    (_request(path="/api/shipments"), [1, 2]),
+    (_request(query="limit=10"), [1, 2]),
+    (_request(accept="text/csv"), [1, 2]),
+])
+def test_etag_changes_with_request_and_versions(request_, versions):
+    assert etags.compute_etag(request_, versions) != etags.compute_etag(_request(), [1, 2])
@@ -0,0 +1,43 @@
+"""Excel görüntüleyici: arama ve satır pencereleri"""
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+import excel_viewer
+
+
+def _workbook():
+    frame = pd.DataFrame({
+        "Tarih": ["2025-09-23", "2025-09-24", None, "2025-09-25"],
+        "Müşteri": ["ACME", "Beta Ltd", "acme depo", None],
+        "Adet": [10, 20, 30, 40],
+    })
+    return excel_viewer.Workbook("digest", [{"name": "Sevkiyat", "types": {}, "frame": frame}])
+
+
+def test_search_is_case_insensitive_and_caches_text():
+    workbook = _workbook()
+    sheet = workbook.sheet("Sevkiyat")
+
+    async def run():
+        return await workbook.search(sheet, "AcMe"), await workbook.search(sheet, "40")
+
+    acme, forty = asyncio.run(run())
+    assert acme.tolist() == [0, 2] and forty.tolist() == [3]
+    assert "Sevkiyat" in workbook._search_text
+
+
+def test_window_keeps_original_row_numbers():
+    workbook = _workbook()
+    sheet = workbook.sheet("Sevkiyat")
+    window = workbook.window(sheet, offset=1, limit=5, positions=np.array([0, 2, 3]))
+    assert window["total"] == 3
+    assert window["rowNumbers"] == [3, 4]
+    assert window["rows"] == [[None, "acme depo", 30], ["2025-09-25", None, 40]]
+
+
+def test_window_without_search():
+    workbook = _workbook()
+    window = workbook.window(workbook.sheet("Sevkiyat"), offset=0, limit=2)
+    assert window["total"] == 4 and window["rowNumbers"] == [1, 2]
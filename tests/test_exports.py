@@ -0,0 +1,63 @@
+"""Dışa aktarım: CSV / XLSX çıktıları veritabanındaki satırlarla aynı olmalı"""
+import asyncio
+import csv
+import io
+
+import openpyxl
+
+import exports
+
+SHIPMENTS = [
+    {"id": f"s{i:04d}", "date": f"2025-09-{1 + i % 28:02d}", "type": "Normal", "quantity": i,
+     "size": {"width": 100}} for i in range(exports.CHUNK_SIZE + 7)
+]
+
+
+def _columns(resource):
+    return [header for header, _ in exports.EXPORTS[resource]["columns"]]
+
+
+async def _collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+def test_csv_export_streams_every_row_in_date_order(db):
+    async def run():
+        await db.shipments.insert_many([dict(doc) for doc in reversed(SHIPMENTS)])
+        return await _collect(exports.chunks(db, "shipments", "csv"))
+
+    parts = asyncio.run(run())
+    assert len(parts) == 2
+    text = b"".join(parts).decode("utf-8")
+    assert text.startswith("\ufeff")
+    rows = list(csv.reader(io.StringIO(text[1:])))
+    assert rows[0] == _columns("shipments")
+    assert len(rows) == len(SHIPMENTS) + 1
+    dates = [row[0] for row in rows[1:]]
+    assert dates == sorted(dates)
+    assert rows[1][_columns("shipments").index("Boyut")] == '{"width": 100}'
+    assert exports.filename("shipments", "csv") == "sevkiyatlar.csv"
+
+
+def test_csv_export_applies_the_date_range(db):
+    async def run():
+        await db.shipments.insert_many([dict(doc) for doc in SHIPMENTS])
+        return await _collect(exports.chunks(db, "shipments", "csv", "2025-09-02", "2025-09-03"))
+
+    rows = list(csv.reader(io.StringIO(b"".join(asyncio.run(run())).decode("utf-8")[1:])))
+    expected = [doc for doc in SHIPMENTS if "2025-09-02" <= doc["date"] <= "2025-09-03"]
+    assert len(rows) == len(expected) + 1
+    assert {row[0] for row in rows[1:]} == {"2025-09-02", "2025-09-03"}
+
+
+def test_xlsx_export_is_a_readable_workbook(db):
+    async def run():
+        await db.shipments.insert_many([dict(doc) for doc in SHIPMENTS])
+        return await _collect(exports.chunks(db, "shipments", "xlsx"))
+
+    workbook = openpyxl.load_workbook(io.BytesIO(b"".join(asyncio.run(run()))), read_only=True)
+    sheet = workbook[exports.EXPORTS["shipments"]["sheet"]]
+    rows = list(sheet.iter_rows(values_only=True))
+    assert list(rows[0]) == _columns("shipments")
+    assert len(rows) == len(SHIPMENTS) + 1
+    assert exports.filename("shipments", "xlsx") == "sevkiyatlar.xlsx"
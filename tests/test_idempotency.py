@@ -0,0 +1,111 @@
+"""Idempotency-Key ara katmanı: tekrar istekler yazmayı yeniden çalıştırmamalı"""
+import asyncio
+import json
+
+from starlette.responses import JSONResponse
+
+import idempotency
+
+
+class _App:
+    """Her yazmada sayacı artıran, istenen durum kodunu dönen uygulama"""
+
+    def __init__(self, status=200):
+        self.status = status
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        body = json.loads((await receive())["body"] or b"{}")
+        self.calls += 1
+        await JSONResponse({"call": self.calls, "body": body}, status_code=self.status)(scope, receive, send)
+
+
+async def _request(app, path="/api/productions", key="k1", token="a", body=b'{"quantity": 1}', method="POST"):
+    """ASGI isteği; (durum, başlıklar, gövde) döner"""
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+    if key is not None:
+        headers.append((idempotency.HEADER.lower().encode(), key.encode()))
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"", "headers": headers}
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    start = sent[0]
+    headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    return start["status"], headers, json.loads(b"".join(m.get("body", b"") for m in sent[1:]))
+
+
+def test_retry_replays_the_stored_response(db):
+    inner = _App()
+    app = idempotency.IdempotencyMiddleware(inner, db)
+
+    async def run():
+        return await _request(app), await _request(app), await _request(app, key="k2")
+
+    first, retry, other = asyncio.run(run())
+    assert first[0] == retry[0] == 200
+    assert retry[2] == first[2] == {"call": 1, "body": {"quantity": 1}}
+    assert retry[1][idempotency.REPLAYED_HEADER.lower()] == "true"
+    assert idempotency.REPLAYED_HEADER.lower() not in first[1]
+    assert other[2]["call"] == 2
+    assert inner.calls == 2
+
+
+def test_same_key_with_different_body_is_rejected(db):
+    inner = _App()
+    app = idempotency.IdempotencyMiddleware(inner, db)
+
+    async def run():
+        return await _request(app), await _request(app, body=b'{"quantity": 2}')
+
+    _, (status, _, _) = asyncio.run(run())
+    assert status == 422
+    assert inner.calls == 1
+
+
+def test_keys_are_scoped_to_the_caller(db):
+    inner = _App()
+    app = idempotency.IdempotencyMiddleware(inner, db)
+
+    async def run():
+        return await _request(app, token="a"), await _request(app, token="b")
+
+    first, second = asyncio.run(run())
+    assert (first[2]["call"], second[2]["call"]) == (1, 2)
+    assert idempotency.REPLAYED_HEADER.lower() not in second[1]
+
+
+def test_unauthorized_responses_are_not_stored(db):
+    inner = _App(status=401)
+    app = idempotency.IdempotencyMiddleware(inner, db)
+
+    async def run():
+        first = await _request(app)
+        inner.status = 200
+        return first, await _request(app), await db[idempotency.KEYS_COLLECTION].count_documents({})
+
+    first, retry, stored = asyncio.run(run())
+    assert (first[0], retry[0]) == (401, 200)
+    assert inner.calls == 2
+    assert stored == 1
+
+
+def test_login_and_reads_are_not_stored(db):
+    inner = _App()
+    app = idempotency.IdempotencyMiddleware(inner, db)
+
+    async def run():
+        for path in idempotency.SKIPPED_PATHS:
+            await _request(app, path=path)
+            await _request(app, path=path)
+        await _request(app, method="GET")
+        return await db[idempotency.KEYS_COLLECTION].count_documents({})
+
+    assert asyncio.run(run()) == 0
+    assert inner.calls == 2 * len(idempotency.SKIPPED_PATHS) + 1
@@ -0,0 +1,57 @@
+"""Excel içe aktarımı: sütun dönüşümleri ve atlanan satırlar"""
+import uuid
+
+import pandas as pd
+
+import import_excel_data
+
+
+def _productions():
+    return pd.DataFrame({
+        "Tarih": [pd.Timestamp("2025-09-23"), "2025-09-24", "2025-09-25", None, "2025-09-26"],
+        "Makine": ["Makine 1", None, "Makine 2", "Makine 1", "Makine 2"],
+        "Kalınlık": ["2 mm"] * 5,
+        "En": [100, 120, 100, 100, "yüz"],
+        "Uzunluk": [300, 300, 300, 300, 300],
+        "M²": [300.0, None, 300.0, 300.0, 300.0],
+        "Adet": [33, 20, 5.5, 10, 7],
+        "Masura Tipi": ["Masura 100"] * 5,
+        "Renk": ["Doğal"] * 5,
+        "Renk Kategorisi": ["Doğal"] * 5,
+    })
+
+
+def test_production_frame_converts_columns_and_defaults():
+    frame, _ = import_excel_data.production_frame(_productions())
+    docs = frame.to_dict("records")
+    assert [doc["date"] for doc in docs] == ["2025-09-23", "2025-09-24"]
+    assert docs[1]["machine"] == "Makine 1" and docs[1]["m2"] == 0.0
+    assert [doc["width"] for doc in docs] == ["100", "120"]
+    assert [doc["quantity"] for doc in docs] == [33, 20]
+
+
+def test_fractional_and_non_numeric_rows_are_skipped():
+    """Kesirli adet (5.5) kesilip saklanmaz; satır atlanır ve raporlanır"""
+    _, skipped = import_excel_data.production_frame(_productions())
+    assert skipped == [2, 4]
+
+
+def test_ids_are_unique_uuid4():
+    frame, _ = import_excel_data.production_frame(_productions())
+    ids = frame["id"].tolist()
+    assert len(set(ids)) == len(ids)
+    assert all(uuid.UUID(value).version == 4 for value in ids)
+
+
+def test_cut_product_color_category():
+    df = pd.DataFrame({
+        "Tarih": ["2025-09-24", "2025-09-25"],
+        "Malzeme": ["x", "y"],
+        "Kesim Boyutu": ["50cm", "60cm"],
+        "Adet": [10, 20],
+        "Kullanılan Malzeme": ["", ""],
+        "Renk": ["Doğal", "Sarı"],
+    })
+    frame, skipped = import_excel_data.cut_product_frame(df)
+    assert skipped == []
+    assert frame["colorCategory"].tolist() == ["Doğal", "Renkli"]
@@ -0,0 +1,49 @@
+"""Yükleme betikleri türetilmiş durumları (stok defteri, sürüm sayaçları) güncel bırakmalı"""
+import asyncio
+
+import pytest
+
+import collection_versions
+import load_additional_data
+import load_correct_consumption
+import stock_ledger
+
+
+@pytest.fixture
+def loader_db(db, monkeypatch):
+    for module in (load_additional_data, load_correct_consumption):
+        monkeypatch.setattr(module, "db", db)
+        monkeypatch.setattr(module, "client", db.client)
+    return db
+
+
+def test_consumption_loader_keeps_ledger_and_versions_current(loader_db):
+    db = loader_db
+
+    async def run():
+        await db.daily_consumption.insert_one({"id": "old", "date": "2025-01-01", "machine": "Makine 1", "petkim": 5.0})
+        await stock_ledger.ensure_built(db)
+        (before,) = await collection_versions.get_versions(db, ["daily_consumption"])
+        await load_correct_consumption.load_correct_consumption_data()
+        (after,) = await collection_versions.get_versions(db, ["daily_consumption"])
+        return before, after, await stock_ledger.verify(db), await db.daily_consumption.count_documents({"id": "old"})
+
+    before, after, drift, old = asyncio.run(run())
+    assert after != before
+    assert drift == {}
+    assert old == 0
+
+
+def test_additional_data_loader_bumps_users_and_materials(loader_db):
+    db = loader_db
+
+    async def run():
+        await stock_ledger.ensure_built(db)
+        before = await collection_versions.get_versions(db, ["materials", "users", "exchange_rates"])
+        await load_additional_data.load_additional_data()
+        after = await collection_versions.get_versions(db, ["materials", "users", "exchange_rates"])
+        return before, after, await stock_ledger.verify(db)
+
+    before, after, drift = asyncio.run(run())
+    assert all(new != old for old, new in zip(before, after))
+    assert drift == {}
@@ -0,0 +1,129 @@
+"""İmleç sayfalaması: _after sorguları ve imleçle sayfa sayfa dolaşma"""
+import asyncio
+import random
+
+import pytest
+from pymongo import ASCENDING, DESCENDING
+
+import pagination
+from tests.fake_db import FakeDB, matches, sort_key
+
+
+def _documents(seed, count=40):
+    """Tekrarlanan ve boş tarihli belgeler"""
+    rng = random.Random(seed)
+    dates = [None, "2025-01-01", "2025-01-02", "2025-01-03"]
+    return [{"id": f"{rng.randrange(10**6):06d}-{i}", "date": rng.choice(dates), "machine": rng.choice("ABC")}
+            for i in range(count)]
+
+
+def _sorted(docs, field, direction):
+    docs = sorted(docs, key=lambda doc: sort_key(doc["id"]), reverse=direction == DESCENDING)
+    return sorted(docs, key=lambda doc: sort_key(doc.get(field)), reverse=direction == DESCENDING)
+
+
+def test_after_ascending_query():
+    assert pagination._after("date", ASCENDING, "2025-01-02", "b") == {
+        "$or": [{"date": {"$gt": "2025-01-02"}}, {"date": "2025-01-02", "id": {"$gt": "b"}}]}
+
+
+def test_after_descending_query_includes_nulls():
+    assert pagination._after("date", DESCENDING, "2025-01-02", "b") == {
+        "$or": [{"date": {"$lt": "2025-01-02"}}, {"date": "2025-01-02", "id": {"$lt": "b"}}, {"date": None}]}
+
+
+@pytest.mark.parametrize("direction", [ASCENDING, DESCENDING])
+@pytest.mark.parametrize("seed", range(5))
+def test_after_returns_exactly_the_following_documents(seed, direction):
+    ordered = _sorted(_documents(seed), "date", direction)
+    for position, doc in enumerate(ordered):
+        query = pagination._after("date", direction, doc["date"], doc["id"])
+        following = [other for other in ordered if matches(other, query)]
+        assert following == ordered[position + 1:]
+
+
+def test_cursor_round_trip():
+    for key in (["2025-01-02", "abc"], [None, "abc"], ["Makine 1", "x" * 40]):
+        assert pagination.decode_cursor(pagination.encode_cursor(key)) == key
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", pagination.encode_cursor({"date": 1})[:-2], pagination.encode_cursor("x")])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        pagination.decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("sort", ["-date", "created_at", "machine"])
+@pytest.mark.parametrize("limit", [1, 3, 7, 100])
+def test_pages_cover_every_document_once(sort, limit):
+    docs = _documents(1)
+    db = FakeDB(productions=docs)
+    field, direction = pagination.parse_sort("productions", sort)
+
+    async def walk():
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = await pagination.paginate(
+                db, "productions", projection={"_id": 0, "machine": 1}, sort=sort, limit=limit, cursor=cursor)
+            assert len(page) <= limit
+            seen.extend(page)
+            if cursor is None:
+                return seen
+
+    expected = [{"machine": doc["machine"]} for doc in _sorted(docs, field, direction)]
+    assert asyncio.run(walk()) == expected
+
+
+def test_page_with_filter_and_cursor():
+    docs = _documents(2)
+    db = FakeDB(productions=docs)
+    query = {"machine": "A"}
+
+    async def walk():
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = await pagination.paginate(db, "productions", query=query, limit=2, cursor=cursor)
+            seen.extend(page)
+            if cursor is None:
+                return seen
+
+    assert [doc["id"] for doc in asyncio.run(walk())] == [
+        doc["id"] for doc in _sorted(docs, "date", DESCENDING) if doc["machine"] == "A"]
+
+
+def test_invalid_sort_field():
+    with pytest.raises(ValueError):
+        pagination.parse_sort("productions", "-password")
+
+
+def test_field_projection_hides_secret_fields(db):
+    users = [{"id": "u1", "username": "admin", "password": "hash", "tokenVersion": 2, "role": "admin"}]
+
+    async def read(fields):
+        await db.users.delete_many({})
+        await db.users.insert_many([dict(user) for user in users])
+        return await db.users.find({}, pagination.field_projection("users", fields)).to_list(None)
+
+    assert asyncio.run(read(None)) == [{"id": "u1", "username": "admin", "role": "admin"}]
+    assert asyncio.run(read("username, role")) == [{"username": "admin", "role": "admin"}]
+
+
+@pytest.mark.parametrize("fields", ["username,password", "tokenVersion", "$where", "a.b", ","])
+def test_field_projection_rejects_hidden_and_invalid_fields(fields):
+    with pytest.raises(ValueError):
+        pagination.field_projection("users", fields)
+
+
+def test_paginate_with_sparse_fields_keeps_cursor_fields_out_of_the_response():
+    docs = _documents(3)
+    db = FakeDB(productions=docs)
+    projection = pagination.field_projection("productions", "machine")
+
+    async def first_page():
+        return await pagination.paginate(db, "productions", projection=projection, sort="-date", limit=5)
+
+    page, cursor = asyncio.run(first_page())
+    assert all(set(doc) == {"machine"} for doc in page)
+    assert cursor is not None
@@ -0,0 +1,58 @@
+"""Hazırlık koleksiyonu ile canlı koleksiyon arasındaki fark (_diff)"""
+import asyncio
+
+from pymongo import DeleteOne, InsertOne, ReplaceOne
+
+import staged_import
+from tests.fake_db import FakeDB
+
+
+def _row(_id, quantity, **extra):
+    return {"_id": _id, "id": f"id-{_id}", "date": "2025-01-01", "machine": "Makine 1", "thickness": "1 mm",
+            "width": "100", "length": "300", "color": "Doğal", "quantity": quantity, **extra}
+
+
+def _diff(live, staged):
+    db = FakeDB(productions=live, productions_staging=staged)
+    return asyncio.run(staged_import._diff(db, "productions"))
+
+
+def test_unchanged_rows_are_not_touched():
+    live = [_row(1, 5), _row(2, 5)]
+    staged = [_row(10, 5, id="new-1"), _row(11, 5, id="new-2")]
+    operations, changes, unchanged = _diff(live, staged)
+    assert (operations, changes, unchanged) == ([], [], 2)
+
+
+def test_duplicate_keys_match_exact_content_first():
+    """Aynı anahtarlı satırlarda birebir aynı olan eşleşir, kalan satır id korunarak değişir"""
+    live = [_row(1, 5), _row(2, 7, created_at="dün")]
+    staged = [_row(10, 9, id="new-1"), _row(11, 5, id="new-2")]
+    operations, changes, unchanged = _diff(live, staged)
+    assert unchanged == 1
+    replacement = {**_row(10, 9), "id": "id-2", "created_at": "dün"}
+    del replacement["_id"]
+    assert len(operations) == 1 and isinstance(operations[0], ReplaceOne)
+    assert operations[0]._filter == {"_id": 2} and operations[0]._doc == replacement
+    assert changes == [(live[1], replacement)]
+
+
+def test_extra_duplicates_are_inserted_or_deleted():
+    live = [_row(1, 5), _row(2, 5), _row(3, 5)]
+    operations, changes, unchanged = _diff(live, [_row(10, 5)])
+    assert unchanged == 1
+    assert [type(operation) for operation in operations] == [DeleteOne, DeleteOne]
+    assert [after for _, after in changes] == [None, None]
+
+    operations, changes, unchanged = _diff([_row(1, 5)], [_row(10, 5), _row(11, 5), _row(12, 6)])
+    assert unchanged == 1
+    assert [type(operation) for operation in operations] == [InsertOne, InsertOne]
+    assert [before for before, _ in changes] == [None, None]
+
+
+def test_field_missing_from_import_is_a_change():
+    """Karşılaştırma iki yönlüdür; canlıda fazladan olan alan da değişiklik sayılır ve kaldırılır"""
+    live = [_row(1, 5, note="eski")]
+    operations, changes, unchanged = _diff(live, [_row(10, 5)])
+    assert unchanged == 0
+    assert "note" not in operations[0]._doc and operations[0]._doc["id"] == "id-1"
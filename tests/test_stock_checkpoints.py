@@ -0,0 +1,102 @@
+"""Geçmiş tarihli stok: kontrol noktalı sonuçlar baştan hesaplananla aynı olmalı"""
+import asyncio
+
+import stock_checkpoints
+import stock_ledger
+from derived_state import record_change
+from stock_pipeline import stock_pipeline
+
+PRODUCTIONS = [
+    {"id": "p1", "date": "2025-09-23", "thickness": "2 mm", "width": "100", "length": "300", "color": "Doğal",
+     "m2": 300.0, "quantity": 33, "masuraType": "Masura 100"},
+    {"id": "p2", "date": "2025-09-25", "thickness": "2 mm", "width": "100", "length": "300", "color": "Doğal",
+     "m2": 300.0, "quantity": 7, "masuraType": "Masura 100"},
+    {"id": "p3", "date": "2025-09-27", "thickness": "1 mm", "width": "120", "length": "300", "color": "Doğal",
+     "m2": 360.0, "quantity": 12, "masuraType": "Masura 120"},
+    # Tarihi olmayan eski kayıt en başta sayılır
+    {"id": "p4", "thickness": "1 mm", "width": "120", "length": "300", "color": "Doğal", "m2": 360.0,
+     "quantity": 2, "masuraType": "Masura 120"},
+]
+SHIPMENTS = [
+    {"id": "s1", "date": "2025-09-24", "type": "Normal", "size": "2mm x 100cm x 300m", "color": "Doğal", "quantity": 3},
+    {"id": "s2", "date": "2025-09-26", "type": "Normal", "size": "2mm x 100cm x 300m", "color": "Doğal", "quantity": 5},
+]
+
+
+def _on_or_before(docs, day):
+    return [dict(doc) for doc in docs if not isinstance(doc.get("date"), str) or doc["date"] <= day]
+
+
+async def _expected(client, day, productions=PRODUCTIONS):
+    """day gün sonuna kadarki kayıtlarla ayrı bir veritabanında baştan hesaplanan sonuç"""
+    reference = client["reference"]
+    await reference.productions.delete_many({})
+    await reference.shipments.delete_many({})
+    for name, docs in (("productions", productions), ("shipments", SHIPMENTS)):
+        selected = _on_or_before(docs, day)
+        if selected:
+            await reference[name].insert_many(selected)
+    rows = await reference.productions.aggregate(stock_pipeline()).to_list(None)
+    return rows, stock_ledger.stats_from_balances(await stock_ledger.compute_balances(reference))
+
+
+async def _actual(db, day):
+    return await stock_checkpoints.stock_as_of(db, day), await stock_checkpoints.stats_as_of(db, day)
+
+
+async def _seed(db):
+    await db.productions.insert_many([dict(doc) for doc in PRODUCTIONS])
+    await db.shipments.insert_many([dict(doc) for doc in SHIPMENTS])
+
+
+def test_as_of_with_and_without_checkpoint_matches_full_recompute(db):
+    async def run():
+        await _seed(db)
+        assert await stock_checkpoints.build_checkpoint(db, "2025-09-24") == "2025-09-24"
+        for day in ("2025-09-22", "2025-09-24", "2025-09-25", "2025-09-26", "2025-09-30"):
+            assert await _actual(db, day) == await _expected(db.client, day), day
+
+    asyncio.run(run())
+
+
+def test_backdated_write_invalidates_later_checkpoints(db):
+    async def run():
+        await _seed(db)
+        await stock_checkpoints.build_checkpoint(db, "2025-09-24")
+        await stock_checkpoints.build_checkpoint(db, "2025-09-26")
+        change = {"id": "p5", "date": "2025-09-25", "thickness": "2 mm", "width": "100", "length": "300",
+                  "color": "Doğal", "m2": 300.0, "quantity": 50, "masuraType": "Masura 100"}
+        await db.productions.insert_one(dict(change))
+        await record_change(db, "productions", after=change)
+        assert await db[stock_checkpoints.CHECKPOINT_COLLECTION].distinct("_id") == ["2025-09-24"]
+        assert await _actual(db, "2025-09-26") == await _expected(db.client, "2025-09-26", PRODUCTIONS + [change])
+
+    asyncio.run(run())
+
+
+def test_dateless_write_invalidates_every_checkpoint(db):
+    async def run():
+        await _seed(db)
+        await stock_checkpoints.build_checkpoint(db, "2025-09-24")
+        await stock_checkpoints.apply_changes(db, "productions", [(None, {"quantity": 1})])
+        return await db[stock_checkpoints.CHECKPOINT_COLLECTION].count_documents({})
+
+    assert asyncio.run(run()) == 0
+
+
+def test_build_discards_checkpoint_invalidated_while_computing(db, monkeypatch):
+    compute_state = stock_checkpoints.compute_state
+
+    async def racing_compute_state(db, day):
+        result = await compute_state(db, day)
+        await stock_checkpoints.invalidate_from(db, "2025-09-23")
+        return result
+
+    monkeypatch.setattr(stock_checkpoints, "compute_state", racing_compute_state)
+
+    async def run():
+        await _seed(db)
+        return (await stock_checkpoints.build_checkpoint(db, "2025-09-24"),
+                await db[stock_checkpoints.CHECKPOINT_COLLECTION].count_documents({}))
+
+    assert asyncio.run(run()) == (None, 0)
@@ -0,0 +1,44 @@
+"""Stok defteri: artımlı güncellemeler sıfırdan hesaplanan bakiyelerle aynı kalmalı"""
+import asyncio
+
+import stock_ledger
+
+PRODUCTION = {"id": "p1", "date": "2025-09-23", "quantity": 100, "masuraType": "Masura 100"}
+SHIPMENT = {"id": "s1", "date": "2025-09-24", "type": "Normal", "quantity": 10}
+
+
+def test_first_write_on_existing_database_builds_the_ledger(db):
+    """Defter oluşmadan gelen ilk yazma yalnızca kendi anahtarlarını eklememeli"""
+    async def run():
+        await db.productions.insert_one(dict(PRODUCTION))
+        await db.shipments.insert_one(dict(SHIPMENT))
+        await stock_ledger.apply_changes(db, "shipments", [(None, dict(SHIPMENT))])
+        return await stock_ledger.get_balances(db), await stock_ledger.verify(db)
+
+    balances, drift = asyncio.run(run())
+    assert drift == {}
+    stats = stock_ledger.stats_from_balances(balances)
+    assert stats["totalStock"] == 90 and stats["productions"] == 1
+    assert stats["materials"]["masura100"] == -100
+
+
+def test_changes_after_build_are_incremental(db):
+    async def run():
+        await db.productions.insert_one(dict(PRODUCTION))
+        await stock_ledger.ensure_built(db)
+        updated = {**PRODUCTION, "quantity": 70}
+        await db.productions.replace_one({"id": "p1"}, dict(updated))
+        await stock_ledger.apply_changes(db, "productions", [(dict(PRODUCTION), updated)])
+        await db.shipments.insert_one(dict(SHIPMENT))
+        await stock_ledger.apply_changes(db, "shipments", [(None, dict(SHIPMENT))])
+        return await stock_ledger.get_balances(db), await stock_ledger.verify(db)
+
+    balances, drift = asyncio.run(run())
+    assert drift == {}
+    assert balances[stock_ledger.NORMAL_STOCK] == 60
+
+
+def test_legacy_text_quantities_count_as_numbers_or_zero():
+    assert stock_ledger.change_deltas("productions", after={"quantity": "5", "masuraType": "Masura 120"}) == {
+        stock_ledger.PRODUCTION_COUNT: 1, stock_ledger.NORMAL_STOCK: 5, "masura120": -5}
+    assert stock_ledger.change_deltas("shipments", after={"type": "Normal", "quantity": "abc"}) == {}
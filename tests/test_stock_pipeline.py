@@ -0,0 +1,45 @@
+"""/api/stock SKU pipeline'ı: eski Python gruplama kurallarıyla aynı satırlar"""
+import asyncio
+
+from stock_pipeline import stock_pipeline
+
+PRODUCTIONS = [
+    {"date": "2025-09-23", "thickness": "2 mm", "width": "100", "length": "300", "color": "Doğal",
+     "colorCategory": "Doğal", "m2": 300.0, "quantity": 33},
+    {"date": "2025-09-24", "thickness": "2 mm", "width": "100", "length": "300", "color": "Doğal",
+     "colorCategory": "Doğal", "m2": 300.0, "quantity": 7},
+    {"date": "2025-09-24", "thickness": "1.8 mm", "width": "120", "length": "300", "color": "Sarı",
+     "colorCategory": "Renkli", "m2": 360.0, "quantity": "5"},
+    # Sevkiyatla tamamen kapanan grup listelenmez
+    {"date": "2025-09-24", "thickness": "3 mm", "width": "100", "length": "100", "color": "Doğal",
+     "m2": 100.0, "quantity": 4},
+]
+SHIPMENTS = [
+    {"date": "2025-09-25", "type": "Normal", "size": "2mm x 100cm x 300m", "color": "Doğal", "quantity": 10},
+    {"date": "2025-09-25", "type": "Normal", "size": "3mm x 100cm x 100m", "color": "Doğal", "quantity": 4},
+    # Üretimi olmayan grup ve bozuk boyut yok sayılır
+    {"date": "2025-09-25", "type": "Normal", "size": "5mm x 100cm x 50m", "color": "Doğal", "quantity": 1},
+    {"date": "2025-09-25", "type": "Normal", "size": "bozuk", "color": "Doğal", "quantity": 1},
+    {"date": "2025-09-26", "type": "Kesilmiş", "size": "1.8mm x 50cm x 137.5cm", "color": "Doğal", "quantity": 100},
+]
+CUT_PRODUCTS = [
+    {"date": "2025-09-24", "cutSize": "1.8mm x 50cm x 137.5cm", "color": "Doğal", "quantity": 1744},
+]
+
+
+def test_stock_rows_group_produced_minus_shipped(db):
+    async def run():
+        await db.productions.insert_many([dict(doc) for doc in PRODUCTIONS])
+        await db.shipments.insert_many([dict(doc) for doc in SHIPMENTS])
+        await db.cut_products.insert_many([dict(doc) for doc in CUT_PRODUCTS])
+        return await db.productions.aggregate(stock_pipeline()).to_list(None)
+
+    rows = asyncio.run(run())
+    assert rows == [
+        {"type": "Normal", "thickness": "1.8 mm", "width": "120", "length": "300", "color": "Sarı",
+         "colorCategory": "Renkli", "m2": 360.0, "quantity": 5},
+        {"type": "Normal", "thickness": "2 mm", "width": "100", "length": "300", "color": "Doğal",
+         "colorCategory": "Doğal", "m2": 300.0, "quantity": 30},
+        {"type": "Kesilmiş", "thickness": "1.8", "width": "50", "length": "137.5cm", "color": "Doğal",
+         "colorCategory": "Doğal", "m2": 0.69, "quantity": 1644},
+    ]